@@ -1,6 +1,7 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class QARequest(BaseModel):
@@ -9,6 +10,22 @@ class QARequest(BaseModel):
     top_k: int = Field(default=5, ge=1, le=20, description="Number of context chunks to retrieve")
     refresh: bool = Field(default=False, description="If true, ingest new messages before answering")
     force_full_refresh: bool = Field(default=False, description="If true with refresh, re-ingest entire channel")
+    refresh_mode: Literal["wait", "background"] = Field(
+        default="wait",
+        description="With refresh: 'wait' for the ingest job (up to refresh_timeout) or answer now and ingest in the background",
+    )
+    refresh_timeout: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Seconds to wait for the ingest job before answering from current data (default QA_REFRESH_TIMEOUT_SECONDS)",
+    )
+    use_cache: bool = Field(default=True, description="Serve repeated (or near-duplicate) questions from the answer cache")
+    retrieval: Literal["dense", "hybrid"] = Field(
+        default="dense", description="'hybrid' fuses dense hits with BM25 keyword hits (RRF)"
+    )
+    rerank: Literal["none", "mmr", "cross_encoder"] = Field(
+        default="none", description="Rerank a wider candidate set down to top_k"
+    )
 
 
 class SourceDoc(BaseModel):
@@ -19,6 +36,57 @@ class SourceDoc(BaseModel):
 class QAResponse(BaseModel):
     answer: str
     sources: List[SourceDoc]
+    timings: Dict[str, float] = Field(default_factory=dict, description="Per-stage latency in milliseconds")
+    ingest_job_id: Optional[str] = None
+    ingest_status: Optional[str] = None
+    cache: Optional[Literal["hit", "semantic_hit", "miss", "bypass"]] = Field(
+        default=None, description="Answer cache outcome for this request"
+    )
+    usage: Dict[str, int] = Field(
+        default_factory=dict, description="LLM tokens spent: prompt_tokens, completion_tokens, total_tokens"
+    )
+    context: Dict[str, int] = Field(
+        default_factory=dict, description="Context assembly: context_tokens, dropped_duplicates, truncated, dropped_over_budget"
+    )
+
+
+class MultiChannelQARequest(BaseModel):
+    channels: Optional[List[str]] = Field(default=None, description="Channels to search; omit to search every ingested channel")
+    query: str = Field(..., description="User question")
+    top_k: int = Field(default=5, ge=1, le=50, description="Number of context chunks to retrieve across all channels")
+    use_cache: bool = Field(default=True, description="Serve repeated (or near-duplicate) questions from the answer cache")
+
+
+class MultiChannelQAResponse(QAResponse):
+    channels: List[str] = Field(default_factory=list, description="Channels that were searched")
+    missing_channels: List[str] = Field(default_factory=list, description="Requested channels that have not been ingested")
+
+
+class SearchRequest(BaseModel):
+    query: str = Field(..., description="Search text")
+    channels: Optional[List[str]] = Field(default=None, description="Channels to search; omit to search every ingested channel")
+    top_k: int = Field(default=10, ge=1, le=100, description="Hits per page")
+    offset: int = Field(default=0, ge=0, description="Number of hits to skip (use next_offset from the previous page)")
+    score_threshold: Optional[float] = Field(default=None, description="Drop hits scoring below this cosine similarity")
+    user: Optional[str] = Field(default=None, description="Slack user ID that wrote the message (or took part in the chunk)")
+    since: Optional[datetime] = Field(default=None, description="Only messages at or after this time")
+    until: Optional[datetime] = Field(default=None, description="Only messages at or before this time")
+    ts: Optional[str] = Field(default=None, description="Exact Slack message ts")
+    thread_ts: Optional[str] = Field(default=None, description="Only messages in this thread")
+
+
+class SearchHit(BaseModel):
+    text: str
+    score: Optional[float] = None
+    metadata: dict
+
+
+class SearchResponse(BaseModel):
+    hits: List[SearchHit]
+    next_offset: Optional[int] = None
+    timings: Dict[str, float] = Field(default_factory=dict, description="Per-stage latency in milliseconds")
+    channels: List[str] = Field(default_factory=list, description="Channels that were searched")
+    missing_channels: List[str] = Field(default_factory=list, description="Requested channels that have not been ingested")
 
 
 class ChannelStatsResponse(BaseModel):
@@ -26,3 +94,35 @@ class ChannelStatsResponse(BaseModel):
     last_timestamp: Optional[str] = None
     total_messages: int = 0
     last_updated: Optional[str] = None
+    recent_jobs: List[Dict[str, Any]] = Field(default_factory=list, description="Latest ingest jobs for the channel, newest first")
+
+
+class IngestRequest(BaseModel):
+    channels: Optional[List[str]] = Field(default=None, description="Slack channel names to ingest")
+    all_channels: bool = Field(default=False, description="Ingest every non-archived channel the bot can see")
+    force_full_refresh: bool = Field(default=False, description="Re-ingest the entire channel history")
+
+    @model_validator(mode="after")
+    def _check_targets(self) -> "IngestRequest":
+        if not self.all_channels and not self.channels:
+            raise ValueError("Provide at least one channel or set all_channels")
+        return self
+
+
+class IngestJobResponse(BaseModel):
+    job_id: str
+    channel: str
+    status: str
+    force_full_refresh: bool = False
+    fetched: int = 0
+    embedded: int = 0
+    upserted: int = 0
+    documents: Optional[int] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+class IngestResponse(BaseModel):
+    jobs: List[IngestJobResponse]
@@ -0,0 +1,196 @@
+import argparse
+import json
+import logging
+import sys
+from typing import List, Optional
+
+from app.logging_config import setup_logging
+from app.config import get_settings
+from app.pipelines.export_import import DEFAULT_TASK_MB, import_export
+from app.pipelines.ingest import list_ingestible_channels
+from app.pipelines.scheduler import IngestionScheduler, JobStatus
+from app.resources import close_pool, init_pool
+from app.vectorstore.storage_profiles import StorageProfiles
+
+logger = logging.getLogger(__name__)
+
+
+def _ingest(args: argparse.Namespace) -> int:
+    settings = get_settings()
+    pool = init_pool(settings)
+    try:
+        channels: List[str] = list(args.channels)
+        if args.all:
+            channels = list_ingestible_channels(pool, include_archived=args.include_archived)
+        if not channels:
+            logger.error("No channels to ingest: pass channel names or --all")
+            return 2
+
+        scheduler = IngestionScheduler(max_workers=args.workers or settings.ingest_max_workers)
+        logger.info(f"Bulk ingesting {len(channels)} channels with {args.workers or settings.ingest_max_workers} workers")
+        jobs = scheduler.submit_many(channels, force_full_refresh=args.force)
+        for job in jobs:
+            scheduler.wait(job)
+        scheduler.shutdown(wait=True)
+
+        for job in jobs:
+            print(json.dumps(job.to_dict()))
+        print(json.dumps({"slack_rate_limits": pool.slack_rate_limiter().stats()}))
+        failed = [job for job in jobs if job.status == JobStatus.FAILED]
+        logger.info(f"Bulk ingest finished: {len(jobs) - len(failed)} succeeded, {len(failed)} failed")
+        return 1 if failed else 0
+    finally:
+        close_pool()
+
+
+def _import_export(args: argparse.Namespace) -> int:
+    settings = get_settings()
+    pool = init_pool(settings)
+    try:
+        try:
+            results = import_export(
+                args.export, channels=args.channels, workers=args.workers, task_mb=args.task_mb, pool=pool
+            )
+        except ValueError as e:
+            logger.error(str(e))
+            return 2
+        for result in results:
+            print(json.dumps(result.to_dict()))
+        failed = [r for r in results if r.errors]
+        logger.info(f"Export import finished: {len(results) - len(failed)} channels succeeded, {len(failed)} failed")
+        return 1 if failed else 0
+    finally:
+        close_pool()
+
+
+def _storage_summary(info) -> dict:
+    """The profile-relevant parts of a collection's current configuration."""
+    vectors = info.config.params.vectors
+    hnsw = info.config.hnsw_config
+    vector_hnsw = getattr(vectors, "hnsw_config", None)
+    quantization = getattr(vectors, "quantization_config", None) or info.config.quantization_config
+    return {
+        "quantization": type(quantization).__name__ if quantization else None,
+        "vectors_on_disk": getattr(vectors, "on_disk", None),
+        "payload_on_disk": info.config.params.on_disk_payload,
+        "hnsw_m": (vector_hnsw and vector_hnsw.m) or hnsw.m,
+        "hnsw_ef_construct": (vector_hnsw and vector_hnsw.ef_construct) or hnsw.ef_construct,
+        "hnsw_on_disk": (vector_hnsw and vector_hnsw.on_disk) or hnsw.on_disk,
+        "points": info.points_count,
+    }
+
+
+def _reprofile(args: argparse.Namespace) -> int:
+    settings = get_settings()
+    profiles = StorageProfiles(settings)
+    pool = init_pool(settings)
+    try:
+        client = pool.qdrant_client()
+        collections: List[str] = list(args.collections)
+        if args.all:
+            collections = sorted(c.name for c in client.get_collections().collections)
+        if not collections:
+            logger.error("No collections to re-profile: pass collection names or --all")
+            return 2
+
+        failed = 0
+        for name in collections:
+            profile = profiles.get(args.profile) if args.profile else profiles.for_collection(name)
+            if args.profile and profile != profiles.for_collection(name):
+                # Searches use the configured profile's parameters, so keep settings in step
+                logger.warning(
+                    f"'{name}' is configured for profile '{profiles.for_collection(name).name}'; "
+                    f"set COLLECTION_STORAGE_PROFILES so searches use '{profile.name}'"
+                )
+            result = {"collection": name, "profile": profile.name}
+            try:
+                result["before"] = _storage_summary(client.get_collection(name))
+                if not args.dry_run:
+                    result["updated"] = client.update_collection(collection_name=name, **profile.update_kwargs())
+            except Exception as e:
+                failed += 1
+                result["error"] = str(e)
+                logger.error(f"Failed to re-profile '{name}': {e}")
+            print(json.dumps(result))
+        if not args.dry_run:
+            logger.info(f"Re-profiled {len(collections) - failed} collections; Qdrant rebuilds indexes in the background")
+        return 1 if failed else 0
+    finally:
+        close_pool()
+
+
+def _reindex_keywords(args: argparse.Namespace) -> int:
+    settings = get_settings()
+    if not settings.hybrid_index_enabled:
+        logger.error("The keyword index is disabled: set HYBRID_INDEX_ENABLED=true")
+        return 2
+    pool = init_pool(settings)
+    try:
+        channels: List[str] = list(args.channels)
+        if args.all:
+            channels = pool.metadata().list_channels()
+        if not channels:
+            logger.error("No channels to re-index: pass channel names or --all")
+            return 2
+
+        store = pool.store()
+        failed = 0
+        for channel in channels:
+            result = {"channel": channel}
+            try:
+                result["points"] = store.rebuild_lexical(channel)
+            except Exception as e:
+                failed += 1
+                result["error"] = str(e)
+                logger.error(f"Failed to re-index channel '{channel}': {e}")
+            print(json.dumps(result))
+        logger.info(f"Rebuilt the keyword index of {len(channels) - failed} channels from Qdrant")
+        return 1 if failed else 0
+    finally:
+        close_pool()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Slack Q&A maintenance commands")
+    parser.add_argument("--log-level", default="INFO")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest = subparsers.add_parser("ingest", help="Ingest one, several or all channels concurrently")
+    ingest.add_argument("channels", nargs="*", help="Channel names to ingest")
+    ingest.add_argument("--all", action="store_true", help="Ingest every channel the bot can see")
+    ingest.add_argument("--include-archived", action="store_true", help="With --all, include archived channels")
+    ingest.add_argument("--force", action="store_true", help="Re-ingest the entire channel history")
+    ingest.add_argument("--workers", type=int, default=None, help="Concurrent channels (default INGEST_MAX_WORKERS)")
+    ingest.set_defaults(handler=_ingest)
+
+    export = subparsers.add_parser("import-export", help="Backfill channels from a Slack workspace export ZIP")
+    export.add_argument("export", help="Path to the export .zip")
+    export.add_argument("channels", nargs="*", help="Channel names to import (default: every channel in the export)")
+    export.add_argument("--workers", type=int, default=None, help="Worker processes (default INGEST_MAX_WORKERS)")
+    export.add_argument(
+        "--task-mb", type=float, default=DEFAULT_TASK_MB, help="Uncompressed JSON per task, in MB of daily files"
+    )
+    export.set_defaults(handler=_import_export)
+
+    reprofile = subparsers.add_parser("reprofile", help="Apply storage profiles to existing collections")
+    reprofile.add_argument("collections", nargs="*", help="Collection names to re-profile")
+    reprofile.add_argument("--all", action="store_true", help="Re-profile every collection in Qdrant")
+    reprofile.add_argument("--profile", default=None, help="Profile to apply (default: the one configured per collection)")
+    reprofile.add_argument("--dry-run", action="store_true", help="Only print each collection's current storage settings")
+    reprofile.set_defaults(handler=_reprofile)
+
+    reindex = subparsers.add_parser("reindex-keywords", help="Rebuild the hybrid keyword index from Qdrant payloads")
+    reindex.add_argument("channels", nargs="*", help="Channel names to re-index")
+    reindex.add_argument("--all", action="store_true", help="Re-index every ingested channel")
+    reindex.set_defaults(handler=_reindex_keywords)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    setup_logging(args.log_level)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -24,9 +24,109 @@ class Settings(BaseSettings):
     # Qdrant
     qdrant_url: str = Field(default="http://localhost", alias="QDRANT_URL")
     qdrant_port: int = Field(default=6333, alias="QDRANT_PORT")
+    # Embedded Qdrant instead of a server: a local directory, or ":memory:"
+    qdrant_path: Optional[str] = Field(default=None, alias="QDRANT_PATH")
+
+    # Embedding cache
+    embedding_cache_enabled: bool = Field(default=True, alias="EMBEDDING_CACHE_ENABLED")
+    embedding_cache_path: str = Field(default="embedding_cache.db", alias="EMBEDDING_CACHE_PATH")
+    embedding_cache_memory_size: int = Field(default=10000, alias="EMBEDDING_CACHE_MEMORY_SIZE")
+
+    # Embedding executor: token-bounded batches sent concurrently under provider rate limits
+    embedding_executor_enabled: bool = Field(default=True, alias="EMBEDDING_EXECUTOR_ENABLED")
+    embedding_batch_size: int = Field(default=64, alias="EMBEDDING_BATCH_SIZE")
+    embedding_batch_max_tokens: int = Field(default=60000, alias="EMBEDDING_BATCH_MAX_TOKENS")
+    embedding_batch_concurrency: int = Field(default=4, alias="EMBEDDING_BATCH_CONCURRENCY")
+    embedding_requests_per_minute: float = Field(default=3000, alias="EMBEDDING_REQUESTS_PER_MINUTE")
+    embedding_tokens_per_minute: float = Field(default=1000000, alias="EMBEDDING_TOKENS_PER_MINUTE")
+    embedding_max_retries: int = Field(default=5, alias="EMBEDDING_MAX_RETRIES")
+
+    # Resource pool
+    pool_warm_up: bool = Field(default=False, alias="POOL_WARM_UP")
+
+    # Async concurrency limits (per process)
+    llm_max_concurrency: int = Field(default=16, alias="LLM_MAX_CONCURRENCY")
+    embedding_max_concurrency: int = Field(default=32, alias="EMBEDDING_MAX_CONCURRENCY")
+    qdrant_max_concurrency: int = Field(default=64, alias="QDRANT_MAX_CONCURRENCY")
+    slack_max_concurrency: int = Field(default=4, alias="SLACK_MAX_CONCURRENCY")
+
+    # Per-method Slack rate limits (requests/minute), e.g. {"conversations.history": 50}
+    slack_rate_limits: Dict[str, float] = Field(default_factory=dict, alias="SLACK_RATE_LIMITS")
+
+    # Qdrant layout: one collection per channel, or one shared collection filtered on an indexed channel field
+    collection_layout: Literal["per_channel", "shared"] = Field(default="per_channel", alias="COLLECTION_LAYOUT")
+    shared_collection_name: str = Field(default="slack_messages", alias="SHARED_COLLECTION_NAME")
+
+    # Collection storage profiles: quantization, on-disk storage, HNSW build and search parameters.
+    # Built-ins: default, small-hot, large-cold, archive; STORAGE_PROFILES overrides or adds profiles
+    # as JSON, e.g. {"archive": {"oversampling": 4.0}}, and COLLECTION_STORAGE_PROFILES maps collections
+    # to profiles, e.g. {"general": "small-hot"}. Applied on creation; use `app.cli reprofile` afterwards.
+    storage_profile: str = Field(default="default", alias="STORAGE_PROFILE")
+    storage_profiles: Dict[str, Dict[str, Any]] = Field(default_factory=dict, alias="STORAGE_PROFILES")
+    collection_storage_profiles: Dict[str, str] = Field(default_factory=dict, alias="COLLECTION_STORAGE_PROFILES")
+
+    # Hybrid retrieval: local BM25 keyword index (SQLite FTS5) maintained alongside Qdrant
+    hybrid_index_enabled: bool = Field(default=True, alias="HYBRID_INDEX_ENABLED")
+    hybrid_index_path: str = Field(default="lexical_index.db", alias="HYBRID_INDEX_PATH")
+    hybrid_candidates: int = Field(default=20, alias="HYBRID_CANDIDATES")
+    rrf_k: int = Field(default=60, alias="RRF_K")
+    mmr_lambda: float = Field(default=0.7, alias="MMR_LAMBDA")
+    rerank_model: str = Field(default="cross-encoder/ms-marco-MiniLM-L-6-v2", alias="RERANK_MODEL")
+
+    # LLM context assembly: token budget (per LLM_MODEL override), dedupe and passage order
+    context_max_tokens: int = Field(default=3000, alias="CONTEXT_MAX_TOKENS")
+    context_token_budgets: Dict[str, int] = Field(default_factory=dict, alias="CONTEXT_TOKEN_BUDGETS")
+    context_max_doc_tokens: int = Field(default=600, alias="CONTEXT_MAX_DOC_TOKENS")
+    context_dedupe_threshold: float = Field(default=0.85, alias="CONTEXT_DEDUPE_THRESHOLD")
+    context_order: Literal["score", "time"] = Field(default="score", alias="CONTEXT_ORDER")
+
+    # QA answer cache: exact (normalized query) plus near-duplicate query embeddings
+    answer_cache_enabled: bool = Field(default=True, alias="ANSWER_CACHE_ENABLED")
+    answer_cache_size: int = Field(default=1024, alias="ANSWER_CACHE_SIZE")
+    answer_cache_ttl_seconds: int = Field(default=3600, alias="ANSWER_CACHE_TTL_SECONDS")
+    answer_cache_similarity_threshold: float = Field(default=0.95, alias="ANSWER_CACHE_SIMILARITY_THRESHOLD")
+    # Most recent answers per channel and top_k that a semantic lookup compares against
+    answer_cache_max_similar: int = Field(default=256, alias="ANSWER_CACHE_MAX_SIMILAR")
+
+    # Logging and tracing
+    log_level: str = Field(default="INFO", alias="LOG_LEVEL")
+    tracing_enabled: bool = Field(default=False, alias="TRACING_ENABLED")
+    # Fraction of ingested messages logged at INFO (all of them at DEBUG)
+    log_message_sample_rate: float = Field(default=0.0, alias="LOG_MESSAGE_SAMPLE_RATE")
+
+    # Ingestion metadata store (SQLite); the legacy JSON file is imported once if present
+    metadata_db_path: str = Field(default="ingestion_metadata.db", alias="METADATA_DB_PATH")
+    metadata_legacy_json_path: Optional[str] = Field(default="ingestion_metadata.json", alias="METADATA_LEGACY_JSON_PATH")
+
+    # Slack channel name -> ID index
+    channel_index_path: str = Field(default="channel_index.json", alias="CHANNEL_INDEX_PATH")
+    channel_index_ttl_seconds: int = Field(default=3600, alias="CHANNEL_INDEX_TTL_SECONDS")
+    # How long an unknown channel name is answered from memory instead of re-listing channels
+    channel_index_miss_ttl_seconds: int = Field(default=300, alias="CHANNEL_INDEX_MISS_TTL_SECONDS")
+
+    # Slack user ID -> display name directory for mention resolution
+    user_directory_path: str = Field(default="user_directory.json", alias="USER_DIRECTORY_PATH")
+    user_directory_ttl_seconds: int = Field(default=86400, alias="USER_DIRECTORY_TTL_SECONDS")
 
     # Ingestion limits
     max_messages_per_channel: Optional[int] = Field(default=None, alias="MAX_MESSAGES_PER_CHANNEL")
+    ingest_max_workers: int = Field(default=2, alias="INGEST_MAX_WORKERS")
+    ingest_queue_size: int = Field(default=4, alias="INGEST_QUEUE_SIZE")
+    # Longest a /qa refresh waits for its ingest job before answering from current data
+    qa_refresh_timeout_seconds: float = Field(default=30.0, alias="QA_REFRESH_TIMEOUT_SECONDS")
+
+    # Conversation chunking
+    chunking_enabled: bool = Field(default=True, alias="CHUNKING_ENABLED")
+    chunk_max_tokens: int = Field(default=512, alias="CHUNK_MAX_TOKENS")
+    chunk_overlap_messages: int = Field(default=1, alias="CHUNK_OVERLAP_MESSAGES")
+    chunk_max_gap_seconds: float = Field(default=1800, alias="CHUNK_MAX_GAP_SECONDS")
+    chunk_min_chars: int = Field(default=3, alias="CHUNK_MIN_CHARS")
+    # JSON list of regexes for messages to drop; unset uses the built-in acknowledgement rules
+    chunk_drop_patterns: Optional[List[str]] = Field(default=None, alias="CHUNK_DROP_PATTERNS")
+
+    # Thread replies
+    thread_fetch_concurrency: int = Field(default=4, alias="THREAD_FETCH_CONCURRENCY")
+    thread_lookback_days: float = Field(default=7, alias="THREAD_LOOKBACK_DAYS")
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
 
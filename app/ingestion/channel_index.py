@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _channel_record(channel: Dict) -> Dict:
+    return {
+        "id": channel.get("id"),
+        "name": channel.get("name"),
+        "is_private": bool(channel.get("is_private")),
+        "is_archived": bool(channel.get("is_archived")),
+    }
+
+
+class ChannelIndex:
+    """Channel name -> ID index persisted as JSON with a time-to-live.
+
+    A full build replaces the index; lookups that miss on a fresh index merge
+    pages in incrementally instead of rebuilding. Names that a complete walk
+    did not find are remembered (in memory) for ``miss_ttl_seconds``.
+    """
+
+    def __init__(self, path: str = "channel_index.json", ttl_seconds: int = 3600, miss_ttl_seconds: int = 300) -> None:
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.miss_ttl_seconds = miss_ttl_seconds
+        self._lock = threading.Lock()
+        self.built_at: float = 0.0
+        self.channels: Dict[str, Dict] = {}
+        self._misses: Dict[str, float] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self.built_at = float(data.get("built_at", 0))
+            self.channels = data.get("channels", {})
+            logger.info(f"Loaded channel index with {len(self.channels)} channels from {self.path}")
+        except Exception as e:
+            logger.error(f"Error loading channel index, it will be rebuilt: {e}")
+
+    def _save(self) -> None:
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"built_at": self.built_at, "channels": self.channels}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving channel index: {e}")
+
+    def is_fresh(self) -> bool:
+        return bool(self.channels) and time.time() - self.built_at < self.ttl_seconds
+
+    def lookup(self, channel_name: str) -> Optional[str]:
+        record = self.channels.get(channel_name)
+        return record.get("id") if record else None
+
+    def recently_missed(self, channel_name: str) -> bool:
+        missed_at = self._misses.get(channel_name)
+        return missed_at is not None and time.time() - missed_at < self.miss_ttl_seconds
+
+    def record_miss(self, channel_name: str) -> None:
+        with self._lock:
+            self._misses[channel_name] = time.time()
+
+    def records(self, include_private: bool = True) -> List[Dict]:
+        return [r for r in self.channels.values() if include_private or not r.get("is_private")]
+
+    def replace(self, channels: Iterable[Dict]) -> None:
+        """Full rebuild from a complete conversations.list walk."""
+        with self._lock:
+            self.channels = {c["name"]: _channel_record(c) for c in channels if c.get("name")}
+            self.built_at = time.time()
+            self._misses = {name: at for name, at in self._misses.items() if name not in self.channels}
+            self._save()
+        logger.info(f"Rebuilt channel index with {len(self.channels)} channels")
+
+    def merge(self, channels: Iterable[Dict]) -> None:
+        """Incremental update from a partial walk; keeps the build time."""
+        with self._lock:
+            for c in channels:
+                if c.get("name"):
+                    self.channels[c["name"]] = _channel_record(c)
+                    self._misses.pop(c["name"], None)
+            self._save()
@@ -1,99 +1,346 @@
-import time
 import logging
-from typing import Dict, Iterable, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
 
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
 
 from app.config import Settings
+from app.ingestion.channel_index import ChannelIndex
+from app.ingestion.user_directory import UserDirectory
+from app.metrics import SLACK_RATE_LIMIT_WAIT_SECONDS, SLACK_RATE_LIMITED, SLACK_REQUEST_SECONDS, observe
+from app.ratelimit import TokenBucket
 
 logger = logging.getLogger(__name__)
 
 
+# The channel index always covers both types; callers filter on is_private
+_ALL_CHANNEL_TYPES = "public_channel,private_channel"
+
+# Slack Web API rate-limit tiers (requests per minute) and the methods we call
+SLACK_TIER_RATES: Dict[int, float] = {1: 1, 2: 20, 3: 50, 4: 100}
+SLACK_METHOD_TIERS: Dict[str, int] = {
+    "conversations.history": 3,
+    "conversations.replies": 3,
+    "conversations.list": 2,
+    "users.list": 2,
+}
+
+
+class SlackRateLimiter:
+    """One token bucket per Slack method, shared by every channel being ingested."""
+
+    def __init__(self, overrides: Optional[Dict[str, float]] = None) -> None:
+        overrides = overrides or {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        for method, tier in SLACK_METHOD_TIERS.items():
+            rate = overrides.get(method, SLACK_TIER_RATES[tier])
+            # Slack tolerates short bursts above the per-minute rate
+            self.buckets[method] = TokenBucket(rate, capacity=max(1.0, rate / 10))
+
+    def bucket(self, method: str) -> TokenBucket:
+        if method not in self.buckets:
+            self.buckets[method] = TokenBucket(SLACK_TIER_RATES[3], capacity=5)
+        return self.buckets[method]
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            method: {"waited_seconds": round(b.waited_seconds, 3), "rate_limited": b.pauses}
+            for method, b in self.buckets.items()
+        }
+
+
+def _retry_after(error: SlackApiError) -> Optional[int]:
+    if error.response["error"] != "ratelimited":
+        return None
+    return int(error.response.headers.get("Retry-After", 5))
+
+
+def get_channel_index(settings: Settings) -> ChannelIndex:
+    return ChannelIndex(
+        settings.channel_index_path,
+        ttl_seconds=settings.channel_index_ttl_seconds,
+        miss_ttl_seconds=settings.channel_index_miss_ttl_seconds,
+    )
+
+
+def get_user_directory(settings: Settings) -> UserDirectory:
+    return UserDirectory(settings.user_directory_path, ttl_seconds=settings.user_directory_ttl_seconds)
+
+
 class SlackIngestionClient:
-    def __init__(self, settings: Settings) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        channel_index: Optional[ChannelIndex] = None,
+        rate_limiter: Optional[SlackRateLimiter] = None,
+        user_directory: Optional[UserDirectory] = None,
+        web_client: Optional[WebClient] = None,
+    ) -> None:
         logger.info("Initializing SlackIngestionClient")
         if not settings.slack_bot_token:
             logger.error("SLACK_BOT_TOKEN is missing")
             raise ValueError("SLACK_BOT_TOKEN is required for Slack ingestion")
-        self.client = WebClient(token=settings.slack_bot_token)
+        self.client = web_client or WebClient(token=settings.slack_bot_token)
         self.max_messages = settings.max_messages_per_channel
+        self.channel_index = channel_index or get_channel_index(settings)
+        self.rate_limiter = rate_limiter or SlackRateLimiter(settings.slack_rate_limits)
+        self.user_directory = user_directory or get_user_directory(settings)
+        self._missing_users_scope_logged = False
         logger.info(f"SlackIngestionClient initialized with max_messages: {self.max_messages}")
 
-    def get_channel_id(self, channel_name: str) -> Optional[str]:
-        logger.info(f"Looking up channel ID for: {channel_name}")
+    def _call(self, method: str, fn: Callable[..., Any], **params) -> Any:
+        """Call a Slack method under its tier bucket, retrying after rate limits.
+
+        A 429 pauses the method's shared bucket, so every channel backs off
+        together while the other pipeline stages keep running.
+        """
+        bucket = self.rate_limiter.bucket(method)
+        while True:
+            waited = bucket.acquire()
+            if waited:
+                SLACK_RATE_LIMIT_WAIT_SECONDS.inc(waited, method=method)
+            try:
+                with observe(SLACK_REQUEST_SECONDS, method=method):
+                    return fn(**params)
+            except SlackApiError as e:
+                retry_after = _retry_after(e)
+                if retry_after is None:
+                    logger.error(f"Slack API error: {e}")
+                    raise
+                logger.warning(f"Rate limited on {method}, backing off for {retry_after} seconds")
+                SLACK_RATE_LIMITED.inc(method=method)
+                bucket.pause(retry_after)
+
+    def _iter_channel_pages(self) -> Iterator[List[Dict]]:
         cursor: Optional[str] = None
         while True:
-            response = self.client.conversations_list(limit=1000, cursor=cursor)
-            for ch in response["channels"]:
-                if ch.get("name") == channel_name:
-                    channel_id = ch.get("id")
-                    logger.info(f"Found channel ID '{channel_id}' for channel '{channel_name}'")
-                    return channel_id
+            response = self._call(
+                "conversations.list",
+                self.client.conversations_list,
+                limit=1000,
+                cursor=cursor,
+                types=_ALL_CHANNEL_TYPES,
+            )
+            batch = response.get("channels", [])
+            logger.debug(f"Retrieved {len(batch)} channels in this batch")
+            yield batch
             cursor = response.get("response_metadata", {}).get("next_cursor") or None
             if not cursor:
                 break
+
+    def refresh_channel_index(self) -> None:
+        channels: List[Dict] = []
+        for batch in self._iter_channel_pages():
+            channels.extend(batch)
+        self.channel_index.replace(channels)
+
+    def get_channel_id(self, channel_name: str) -> Optional[str]:
+        logger.info(f"Looking up channel ID for: {channel_name}")
+        rebuilt = not self.channel_index.is_fresh()
+        if rebuilt:
+            self.refresh_channel_index()
+        channel_id = self.channel_index.lookup(channel_name)
+        if channel_id:
+            return channel_id
+        if self.channel_index.recently_missed(channel_name):
+            # conversations.list is tier 2: do not walk it again for a name that was just missing
+            logger.warning(f"Channel '{channel_name}' not found (cached miss)")
+            return None
+
+        if not rebuilt:
+            # Fresh index but unknown name: merge pages until it shows up
+            for batch in self._iter_channel_pages():
+                self.channel_index.merge(batch)
+                channel_id = self.channel_index.lookup(channel_name)
+                if channel_id:
+                    logger.info(f"Found channel ID '{channel_id}' for channel '{channel_name}'")
+                    return channel_id
+        self.channel_index.record_miss(channel_name)
         logger.warning(f"Channel '{channel_name}' not found")
         return None
 
     def list_channels(self, include_private: bool = True) -> List[Dict]:
         logger.info(f"Listing channels, include_private={include_private}")
-        channels: List[Dict] = []
-        cursor: Optional[str] = None
-        types = "public_channel,private_channel" if include_private else "public_channel"
-        while True:
-            response = self.client.conversations_list(limit=1000, cursor=cursor, types=types)
-            batch = response.get("channels", [])
-            channels.extend(batch)
-            logger.debug(f"Retrieved {len(batch)} channels in this batch")
-            cursor = response.get("response_metadata", {}).get("next_cursor") or None
-            if not cursor:
-                break
+        if not self.channel_index.is_fresh():
+            self.refresh_channel_index()
+        channels = self.channel_index.records(include_private=include_private)
         logger.info(f"Total channels found: {len(channels)}")
         return channels
 
+    def user_names(self) -> Dict[str, str]:
+        """User ID -> display name, refreshed from users.list when stale.
+
+        Resolution is best effort: without the users:read scope mentions stay
+        unresolved instead of failing ingestion. A failed or empty refresh is
+        not retried before the directory's TTL runs out.
+        """
+        if not self.user_directory.is_fresh():
+            try:
+                members: List[Dict] = []
+                cursor: Optional[str] = None
+                while True:
+                    response = self._call("users.list", self.client.users_list, limit=1000, cursor=cursor)
+                    members.extend(response.get("members", []))
+                    cursor = response.get("response_metadata", {}).get("next_cursor") or None
+                    if not cursor:
+                        break
+                self.user_directory.replace(members)
+                if not self.user_directory.users:
+                    logger.warning("users.list returned no members; mentions stay unresolved")
+            except SlackApiError as e:
+                self.user_directory.mark_failed()
+                if e.response.get("error") != "missing_scope":
+                    logger.warning(f"Could not refresh user directory, mentions stay unresolved: {e}")
+                elif not self._missing_users_scope_logged:
+                    self._missing_users_scope_logged = True
+                    logger.warning("The Slack token lacks the users:read scope; mentions stay unresolved")
+        return self.user_directory.users
+
+    def channel_names(self) -> Dict[str, str]:
+        """Channel ID -> name, from the channel index."""
+        if not self.channel_index.is_fresh():
+            self.refresh_channel_index()
+        return {r["id"]: r["name"] for r in self.channel_index.records() if r.get("id")}
+
     def list_channel_names(self, include_private: bool = True) -> List[str]:
         channels = self.list_channels(include_private=include_private)
         names = [c.get("name", "") for c in channels if c.get("name")]
         logger.info(f"Channel names: {names}")
         return names
 
-    def fetch_messages(self, channel_id: str, oldest: Optional[str] = None) -> List[Dict]:
-        logger.info(f"Fetching messages for channel ID: {channel_id}, oldest: {oldest}")
-        messages: List[Dict] = []
+    def iter_message_pages(
+        self,
+        channel_id: str,
+        oldest: Optional[str] = None,
+        latest: Optional[str] = None,
+    ) -> Iterator[List[Dict]]:
+        """Yield conversations.history pages as they arrive, newest messages first.
+
+        ``oldest`` and ``latest`` bound the range exclusively, as in the Slack API.
+        """
+        logger.info(f"Fetching message pages for channel ID: {channel_id}, oldest: {oldest}, latest: {latest}")
         cursor: Optional[str] = None
         remaining = self.max_messages if self.max_messages else float("inf")
         logger.info(f"Max messages to fetch: {remaining}")
-        
+
         while remaining > 0:
-            try:
-                limit = 200 if remaining == float("inf") else min(200, int(remaining))
-                logger.debug(f"Fetching batch with limit: {limit}, cursor: {cursor}")
-                
-                # Build request parameters
-                params = {"channel": channel_id, "limit": limit}
-                if cursor:
-                    params["cursor"] = cursor
-                if oldest:
-                    params["oldest"] = oldest
-                
-                response = self.client.conversations_history(**params)
-                batch = response.get("messages", [])
-                messages.extend(batch)
-                remaining -= len(batch)
-                logger.debug(f"Fetched {len(batch)} messages, {len(messages)} total, {remaining} remaining")
-                cursor = response.get("response_metadata", {}).get("next_cursor") or None
-                if not cursor or not batch:
-                    break
-            except SlackApiError as e:
-                if e.response["error"] == "ratelimited":
-                    retry_after = int(e.response.headers.get("Retry-After", 5))
-                    logger.warning(f"Rate limited, sleeping for {retry_after} seconds")
-                    time.sleep(retry_after)
-                    continue
-                logger.error(f"Slack API error: {e}")
-                raise
+            limit = 200 if remaining == float("inf") else min(200, int(remaining))
+            logger.debug(f"Fetching batch with limit: {limit}, cursor: {cursor}")
+
+            # Build request parameters
+            params = {"channel": channel_id, "limit": limit}
+            if cursor:
+                params["cursor"] = cursor
+            if oldest:
+                params["oldest"] = oldest
+            if latest:
+                params["latest"] = latest
+
+            response = self._call("conversations.history", self.client.conversations_history, **params)
+            batch = response.get("messages", [])
+            remaining -= len(batch)
+            logger.debug(f"Fetched {len(batch)} messages, {remaining} remaining")
+            cursor = response.get("response_metadata", {}).get("next_cursor") or None
+            if batch:
+                yield batch
+            if not cursor or not batch:
+                break
+
+    def fetch_replies(self, channel_id: str, thread_ts: str, oldest: Optional[str] = None) -> List[Dict]:
+        """Fetch the replies of one thread (without its parent), optionally only after ``oldest``."""
+        replies: List[Dict] = []
+        cursor: Optional[str] = None
+        while True:
+            params = {"channel": channel_id, "ts": thread_ts, "limit": 200}
+            if cursor:
+                params["cursor"] = cursor
+            if oldest:
+                params["oldest"] = oldest
+            response = self._call("conversations.replies", self.client.conversations_replies, **params)
+            # The parent is always returned first; it is ingested from history
+            replies.extend(m for m in response.get("messages", []) if m.get("ts") != thread_ts)
+            cursor = response.get("response_metadata", {}).get("next_cursor") or None
+            if not cursor:
+                break
+        logger.debug(f"Fetched {len(replies)} replies for thread {thread_ts} in channel {channel_id}")
+        return replies
+
+    def fetch_messages(self, channel_id: str, oldest: Optional[str] = None) -> List[Dict]:
+        messages: List[Dict] = []
+        for page in self.iter_message_pages(channel_id, oldest=oldest):
+            messages.extend(page)
         # oldest first
         messages.reverse()
         logger.info(f"Fetched total of {len(messages)} messages for channel {channel_id}")
         return messages
+
+
+class AsyncSlackIngestionClient:
+    """Async channel listing for the API, built on AsyncWebClient; ingestion uses SlackIngestionClient."""
+
+    def __init__(
+        self,
+        settings: Settings,
+        channel_index: Optional[ChannelIndex] = None,
+        rate_limiter: Optional[SlackRateLimiter] = None,
+        web_client: Optional[AsyncWebClient] = None,
+    ) -> None:
+        logger.info("Initializing AsyncSlackIngestionClient")
+        if not settings.slack_bot_token:
+            logger.error("SLACK_BOT_TOKEN is missing")
+            raise ValueError("SLACK_BOT_TOKEN is required for Slack ingestion")
+        self.client = web_client or AsyncWebClient(token=settings.slack_bot_token)
+        self.channel_index = channel_index or get_channel_index(settings)
+        self.rate_limiter = rate_limiter or SlackRateLimiter(settings.slack_rate_limits)
+
+    async def _call(self, method: str, fn: Callable[..., Any], **params) -> Any:
+        bucket = self.rate_limiter.bucket(method)
+        while True:
+            waited = await bucket.acquire_async()
+            if waited:
+                SLACK_RATE_LIMIT_WAIT_SECONDS.inc(waited, method=method)
+            try:
+                with observe(SLACK_REQUEST_SECONDS, method=method):
+                    return await fn(**params)
+            except SlackApiError as e:
+                retry_after = _retry_after(e)
+                if retry_after is None:
+                    logger.error(f"Slack API error: {e}")
+                    raise
+                logger.warning(f"Rate limited on {method}, backing off for {retry_after} seconds")
+                SLACK_RATE_LIMITED.inc(method=method)
+                bucket.pause(retry_after)
+
+    async def _channel_pages(self) -> AsyncIterator[List[Dict]]:
+        cursor: Optional[str] = None
+        while True:
+            response = await self._call(
+                "conversations.list",
+                self.client.conversations_list,
+                limit=1000,
+                cursor=cursor,
+                types=_ALL_CHANNEL_TYPES,
+            )
+            yield response.get("channels", [])
+            cursor = response.get("response_metadata", {}).get("next_cursor") or None
+            if not cursor:
+                break
+
+    async def refresh_channel_index(self) -> None:
+        channels: List[Dict] = []
+        async for batch in self._channel_pages():
+            channels.extend(batch)
+        self.channel_index.replace(channels)
+
+    async def list_channels(self, include_private: bool = True) -> List[Dict]:
+        logger.info(f"Listing channels, include_private={include_private}")
+        if not self.channel_index.is_fresh():
+            await self.refresh_channel_index()
+        channels = self.channel_index.records(include_private=include_private)
+        logger.info(f"Total channels found: {len(channels)}")
+        return channels
+
+    async def list_channel_names(self, include_private: bool = True) -> List[str]:
+        channels = await self.list_channels(include_private=include_private)
+        return [c.get("name", "") for c in channels if c.get("name")]
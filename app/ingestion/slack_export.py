@@ -0,0 +1,91 @@
+import json
+import logging
+import posixpath
+import zipfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.ingestion.user_directory import _display_name
+
+logger = logging.getLogger(__name__)
+
+# Workspace-level files listing public and private channels; DMs are not imported
+_CHANNEL_FILES = ("channels.json", "groups.json")
+
+
+class SlackExport:
+    """Read-only view of a Slack workspace export ZIP.
+
+    The export holds ``channels.json``/``groups.json`` and ``users.json`` at
+    the top level and one directory per channel of daily ``YYYY-MM-DD.json``
+    message lists. Members are read straight out of the archive, one file at
+    a time, without extracting it.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._zip = zipfile.ZipFile(path)
+        self._root = self._find_root()
+        self._days = self._index_days()
+
+    def _find_root(self) -> str:
+        # Some tools zip the export folder itself, nesting everything one level down
+        for name in self._zip.namelist():
+            if posixpath.basename(name) in _CHANNEL_FILES:
+                return posixpath.dirname(name)
+        raise ValueError(f"{self.path} is not a Slack export: no channels.json found")
+
+    def _index_days(self) -> Dict[str, List[zipfile.ZipInfo]]:
+        days: Dict[str, List[zipfile.ZipInfo]] = {}
+        for info in self._zip.infolist():
+            rel = posixpath.relpath(info.filename, self._root) if self._root else info.filename
+            directory, filename = posixpath.split(rel)
+            if directory and "/" not in directory and filename.endswith(".json"):
+                days.setdefault(directory, []).append(info)
+        for files in days.values():
+            # Daily file names sort chronologically
+            files.sort(key=lambda info: info.filename)
+        return days
+
+    def _read(self, name: str) -> Optional[list]:
+        member = posixpath.join(self._root, name) if self._root else name
+        try:
+            with self._zip.open(member) as f:
+                return json.load(f)
+        except KeyError:
+            return None
+
+    def channels(self) -> List[Dict]:
+        """Channel records (id, name, is_private, is_archived) for channels with messages in the export."""
+        records: List[Dict] = []
+        for name, is_private in zip(_CHANNEL_FILES, (False, True)):
+            for channel in self._read(name) or []:
+                if channel.get("name") in self._days:
+                    records.append({
+                        "id": channel.get("id"),
+                        "name": channel["name"],
+                        "is_private": is_private,
+                        "is_archived": bool(channel.get("is_archived")),
+                    })
+        return records
+
+    def user_names(self) -> Dict[str, str]:
+        """User ID -> display name from ``users.json``, for mention resolution."""
+        return {m["id"]: _display_name(m) for m in self._read("users.json") or [] if m.get("id") and _display_name(m)}
+
+    def day_files(self, channel: str) -> List[Tuple[str, int]]:
+        """(member name, uncompressed size) of each daily file of a channel, oldest first."""
+        return [(info.filename, info.file_size) for info in self._days.get(channel, [])]
+
+    def iter_messages(self, files: List[str]) -> Iterator[Dict]:
+        """Messages of the given daily files, in file order."""
+        for name in files:
+            with self._zip.open(name) as f:
+                try:
+                    messages = json.load(f)
+                except ValueError as e:
+                    logger.warning(f"Skipping unreadable export file {name}: {e}")
+                    continue
+            yield from (m for m in messages if isinstance(m, dict) and m.get("ts"))
+
+    def close(self) -> None:
+        self._zip.close()
@@ -0,0 +1,67 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+def _display_name(member: Dict) -> str:
+    profile = member.get("profile") or {}
+    return profile.get("display_name") or profile.get("real_name") or member.get("real_name") or member.get("name") or ""
+
+
+class UserDirectory:
+    """User ID -> display name table persisted as JSON with a time-to-live.
+
+    Failed and empty refreshes are timestamped too, so a workspace where
+    users.list is unavailable is asked again only once the TTL has passed.
+    """
+
+    def __init__(self, path: str = "user_directory.json", ttl_seconds: int = 86400) -> None:
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.built_at: float = 0.0
+        self.users: Dict[str, str] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self.built_at = float(data.get("built_at", 0))
+            self.users = data.get("users", {})
+            logger.info(f"Loaded user directory with {len(self.users)} users from {self.path}")
+        except Exception as e:
+            logger.error(f"Error loading user directory, it will be rebuilt: {e}")
+
+    def _save(self) -> None:
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"built_at": self.built_at, "users": self.users}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving user directory: {e}")
+
+    def is_fresh(self) -> bool:
+        return time.time() - self.built_at < self.ttl_seconds
+
+    def replace(self, members: Iterable[Dict]) -> None:
+        with self._lock:
+            self.users = {m["id"]: _display_name(m) for m in members if m.get("id") and _display_name(m)}
+            self.built_at = time.time()
+            self._save()
+        logger.info(f"Rebuilt user directory with {len(self.users)} users")
+
+    def mark_failed(self) -> None:
+        """Keep the current names and wait a full TTL before the next refresh."""
+        with self._lock:
+            self.built_at = time.time()
+            self._save()
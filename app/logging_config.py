@@ -1,9 +1,19 @@
 import logging
 import sys
-from typing import Optional
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Tuple
 
+# Finished spans are logged here at INFO; the logger is silenced unless tracing is on
+TRACE_LOGGER = "app.trace"
 
-def setup_logging(level: str = "INFO", log_file: Optional[str] = None) -> None:
+# (trace_id, span_id) of the innermost open span in this task or thread
+_current_span: ContextVar[Optional[Tuple[str, str]]] = ContextVar("current_span", default=None)
+
+
+def setup_logging(level: str = "INFO", log_file: Optional[str] = None, tracing: bool = False) -> None:
     """Setup logging configuration with line numbers and timestamps."""
     
     # Create formatter with line numbers
@@ -34,6 +44,39 @@ def setup_logging(level: str = "INFO", log_file: Optional[str] = None) -> None:
     logging.getLogger("app").setLevel(getattr(logging, level.upper()))
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
     logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger(TRACE_LOGGER).setLevel(logging.INFO if tracing else logging.WARNING)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[None]:
+    """Log the duration of the enclosed block as a trace span.
+
+    Spans opened inside another span (in the same task or thread) share its
+    trace ID and record it as parent. A no-op unless tracing is enabled.
+    """
+    trace_logger = logging.getLogger(TRACE_LOGGER)
+    if not trace_logger.isEnabledFor(logging.INFO):
+        yield
+        return
+    parent = _current_span.get()
+    trace_id = parent[0] if parent else uuid.uuid4().hex[:16]
+    span_id = uuid.uuid4().hex[:8]
+    token = _current_span.set((trace_id, span_id))
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException as e:
+        status = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        duration_ms = round((time.perf_counter() - start) * 1000, 2)
+        fields = " ".join(f"{k}={v}" for k, v in attributes.items())
+        trace_logger.info(
+            f"span={name} trace={trace_id} id={span_id} parent={parent[1] if parent else '-'} "
+            f"duration_ms={duration_ms} status={status} {fields}".rstrip()
+        )
 
 
 # Initialize logging on import
@@ -0,0 +1,189 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from app.logging_config import span
+
+# Seconds; covers sub-millisecond cache lookups up to slow LLM calls
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> _LabelValues:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"Metric '{self.name}' expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:  # pragma: no cover - interface
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic total, one series per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: Dict[_LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket latency histogram in seconds."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per-bucket (not cumulative) counts, the last one for +Inf
+        self._counts: Dict[_LabelValues, List[int]] = {}
+        self._sums: Dict[_LabelValues, float] = {}
+
+    def observe(self, seconds: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + seconds
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        lines = self.header()
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@contextmanager
+def observe(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """Time the block into ``histogram`` and, when tracing is on, log it as a span."""
+    start = time.perf_counter()
+    try:
+        with span(histogram.name, **labels):
+            yield
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+# API
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "API request latency (streamed responses until headers are sent)", ["method", "route", "status"]
+)
+
+# Ingestion
+SLACK_REQUEST_SECONDS = Histogram(
+    "slack_request_seconds", "Slack Web API call latency (one page per call)", ["method"]
+)
+SLACK_RATE_LIMIT_WAIT_SECONDS = Counter(
+    "slack_rate_limit_wait_seconds_total", "Time spent waiting on the Slack rate limiter", ["method"]
+)
+SLACK_RATE_LIMITED = Counter(
+    "slack_rate_limited_total", "Slack calls rejected with ratelimited (HTTP 429)", ["method"]
+)
+INGEST_CLEAN_SECONDS = Histogram(
+    "ingest_clean_seconds", "Cleaning, filtering and chunking of one fetched batch"
+)
+INGEST_MESSAGES = Counter("ingest_messages_total", "Slack messages fetched for ingestion (including replies)")
+INGEST_DOCUMENTS = Counter("ingest_documents_total", "Documents (messages or chunks) upserted")
+
+# Providers and storage
+EMBEDDING_SECONDS = Histogram(
+    "embedding_request_seconds", "Embedding provider call latency (cache misses only)", ["kind"]
+)
+EMBEDDING_TEXTS = Counter("embedding_texts_total", "Texts sent to the embedding provider", ["kind"])
+EMBEDDING_RETRIES = Counter("embedding_retries_total", "Embedding batches retried", ["reason"])
+EMBEDDING_RATE_LIMIT_WAIT_SECONDS = Counter(
+    "embedding_rate_limit_wait_seconds_total", "Time spent waiting on the embedding request/token limiter"
+)
+QDRANT_SECONDS = Histogram("qdrant_request_seconds", "Qdrant call latency", ["operation"])
+LLM_SECONDS = Histogram("llm_request_seconds", "Chat model call latency, first request to last token")
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by the chat model", ["type"])
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and outcome", ["cache", "result"])
@@ -0,0 +1,219 @@
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import Settings
+from app.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+_CacheKey = Tuple[str, str, int]
+# (channel, top_k): the entries a semantic lookup compares against
+_Scope = Tuple[str, int]
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a question, ignoring trailing punctuation."""
+    return " ".join(query.casefold().split()).rstrip("?!. ")
+
+
+def _unit(vector: Sequence[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array)) or 1.0
+    return array / norm
+
+
+@dataclass
+class AnswerCacheStats:
+    """Counted per lookup: every get_exact/get_similar call is a hit or a miss."""
+
+    exact_hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    stale: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+@dataclass
+class _Entry:
+    result: Dict
+    generation: int
+    created_at: float
+
+
+class _VectorIndex:
+    """Unit query vectors of one scope, oldest first, stacked into a matrix on demand."""
+
+    def __init__(self) -> None:
+        self.keys: List[_CacheKey] = []
+        self._vectors: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def add(self, key: _CacheKey, unit: np.ndarray) -> None:
+        self.remove(key)
+        self.keys.append(key)
+        self._vectors.append(unit)
+        self._matrix = None
+
+    def remove(self, key: _CacheKey) -> None:
+        try:
+            i = self.keys.index(key)
+        except ValueError:
+            return
+        del self.keys[i]
+        del self._vectors[i]
+        self._matrix = None
+
+    def scores(self, unit: np.ndarray) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix = np.vstack(self._vectors)
+        return self._matrix @ unit
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class AnswerCache:
+    """LRU/TTL cache of QA results keyed by (channel, normalized query, top_k).
+
+    Entries carry the channel's metadata generation at answer time; a lookup
+    against a newer generation (i.e. after an ingest committed anything)
+    treats the entry as stale. Questions that differ in wording fall back to
+    a cosine match of their query embeddings against the ``max_similar``
+    most recent entries for the same channel and top_k, scored in one
+    matrix product.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600,
+        similarity_threshold: float = 0.95,
+        max_similar: int = 256,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.max_similar = max(1, max_similar)
+        self.stats = AnswerCacheStats()
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[_CacheKey, _Entry]" = OrderedDict()
+        self._vectors: Dict[_Scope, _VectorIndex] = {}
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "AnswerCache":
+        return cls(
+            max_entries=settings.answer_cache_size,
+            ttl_seconds=settings.answer_cache_ttl_seconds,
+            similarity_threshold=settings.answer_cache_similarity_threshold,
+            max_similar=settings.answer_cache_max_similar,
+        )
+
+    def _usable(self, entry: _Entry, generation: int, now: float) -> bool:
+        return entry.generation == generation and now - entry.created_at < self.ttl_seconds
+
+    def _remove(self, key: _CacheKey) -> None:
+        """Drop an entry and its query vector; the caller holds the lock."""
+        self._entries.pop(key, None)
+        index = self._vectors.get((key[0], key[2]))
+        if index is not None:
+            index.remove(key)
+            if not index:
+                del self._vectors[(key[0], key[2])]
+
+    def _miss(self) -> None:
+        """Count a lookup that returns None; the caller holds the lock."""
+        self.stats.misses += 1
+        CACHE_LOOKUPS.inc(cache="answer", result="miss")
+
+    def get_exact(self, channel: str, query: str, k: int, generation: int) -> Optional[Dict]:
+        key = (channel, normalize_query(query), k)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._miss()
+                return None
+            if not self._usable(entry, generation, now):
+                self._remove(key)
+                self.stats.stale += 1
+                self._miss()
+                return None
+            self._entries.move_to_end(key)
+            self.stats.exact_hits += 1
+            CACHE_LOOKUPS.inc(cache="answer", result="hit")
+            return copy.deepcopy(entry.result)
+
+    def get_similar(self, channel: str, k: int, query_vector: Sequence[float], generation: int) -> Optional[Dict]:
+        if self.similarity_threshold >= 1:
+            with self._lock:
+                self._miss()
+            return None
+        unit = _unit(query_vector)
+        now = time.time()
+        with self._lock:
+            best_key, best_score = None, 0.0
+            index = self._vectors.get((channel, k))
+            if index is not None:
+                scores = index.scores(unit)
+                candidates = [
+                    (index.keys[i], float(scores[i])) for i in np.argsort(-scores) if scores[i] >= self.similarity_threshold
+                ]
+                for key, score in candidates:
+                    if self._usable(self._entries[key], generation, now):
+                        best_key, best_score = key, score
+                        break
+                    self._remove(key)
+                    self.stats.stale += 1
+            if best_key is None:
+                self._miss()
+                return None
+            self._entries.move_to_end(best_key)
+            self.stats.semantic_hits += 1
+            CACHE_LOOKUPS.inc(cache="answer", result="semantic_hit")
+            logger.debug(f"Semantic answer cache hit for channel '{channel}' (similarity {best_score:.4f})")
+            return copy.deepcopy(self._entries[best_key].result)
+
+    def put(
+        self,
+        channel: str,
+        query: str,
+        k: int,
+        result: Dict,
+        query_vector: Optional[Sequence[float]],
+        generation: int,
+    ) -> None:
+        key = (channel, normalize_query(query), k)
+        entry = _Entry(result=copy.deepcopy(result), generation=generation, created_at=time.time())
+        unit = _unit(query_vector) if query_vector is not None else None
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            if unit is not None:
+                index = self._vectors.setdefault((channel, k), _VectorIndex())
+                index.add(key, unit)
+                if len(index) > self.max_similar:
+                    # The oldest answer stays reachable by exact match only
+                    index.remove(index.keys[0])
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, channel: Optional[str] = None) -> None:
+        with self._lock:
+            if channel is None:
+                self._entries.clear()
+                self._vectors.clear()
+                return
+            for key in [key for key in self._entries if key[0] == channel]:
+                self._remove(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,164 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Literal, Sequence, Set, Tuple
+
+from langchain_core.documents import Document
+
+from app.config import Settings
+from app.processing.tokens import count_tokens, encode, encoding_for_model
+
+_WORD_RE = re.compile(r"\w+")
+
+# Per-passage overhead of the "[n] " label and separating blank line
+_PASSAGE_OVERHEAD_TOKENS = 4
+
+
+@dataclass
+class ContextConfig:
+    max_tokens: int = 3000
+    max_doc_tokens: int = 600
+    min_doc_tokens: int = 48
+    dedupe_threshold: float = 0.85
+    order: Literal["score", "time"] = "score"
+    model: str = "gpt-4o-mini"
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "ContextConfig":
+        return cls(
+            max_tokens=settings.context_token_budgets.get(settings.llm_model, settings.context_max_tokens),
+            max_doc_tokens=settings.context_max_doc_tokens,
+            dedupe_threshold=settings.context_dedupe_threshold,
+            order=settings.context_order,
+            model=settings.llm_model,
+        )
+
+
+@dataclass
+class BuiltContext:
+    text: str
+    docs: List[Document]
+    tokens: int
+    dropped_duplicates: int = 0
+    truncated: int = 0
+    dropped_over_budget: int = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "context_tokens": self.tokens,
+            "dropped_duplicates": self.dropped_duplicates,
+            "truncated": self.truncated,
+            "dropped_over_budget": self.dropped_over_budget,
+        }
+
+
+def _shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _dedupe(docs: Sequence[Document], threshold: float) -> List[Document]:
+    """Drop passages whose word shingles mostly overlap a better-ranked passage."""
+    kept: List[Document] = []
+    kept_shingles: List[Set[Tuple[str, ...]]] = []
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        duplicate = any(
+            len(shingles & other) / (len(shingles | other) or 1) >= threshold for other in kept_shingles
+        )
+        if not duplicate:
+            kept.append(doc)
+            kept_shingles.append(shingles)
+    return kept
+
+
+def _truncate(text: str, question: str, max_tokens: int, encoding) -> str:
+    """Keep the ``max_tokens`` window of lines around the line most relevant to the question."""
+    lines = text.split("\n")
+    terms = set(_WORD_RE.findall(question.lower()))
+    line_tokens = [count_tokens(line, encoding) + 1 for line in lines]
+    best = max(range(len(lines)), key=lambda i: len(terms & set(_WORD_RE.findall(lines[i].lower()))))
+
+    if line_tokens[best] >= max_tokens:
+        # One huge line (e.g. a pasted log): cut tokens around the first query term
+        tokens = encode(lines[best], encoding)
+        lowered = lines[best].lower()
+        hits = [lowered.find(t) for t in terms if t in lowered]
+        center = count_tokens(lines[best][:min(hits)], encoding) if hits else 0
+        start = max(0, min(center - max_tokens // 2, len(tokens) - max_tokens))
+        window = encoding.decode(tokens[start:start + max_tokens])
+        return ("…" if start > 0 else "") + window + ("…" if start + max_tokens < len(tokens) else "")
+
+    lo = hi = best
+    used = line_tokens[best]
+    # Grow the window alternately below and above the best line
+    while True:
+        grew = False
+        if hi + 1 < len(lines) and used + line_tokens[hi + 1] <= max_tokens:
+            hi += 1
+            used += line_tokens[hi]
+            grew = True
+        if lo > 0 and used + line_tokens[lo - 1] <= max_tokens:
+            lo -= 1
+            used += line_tokens[lo]
+            grew = True
+        if not grew:
+            break
+    window = "\n".join(lines[lo:hi + 1])
+    return ("…\n" if lo > 0 else "") + window + ("\n…" if hi < len(lines) - 1 else "")
+
+
+def _sort_key_time(doc: Document) -> float:
+    try:
+        return float(doc.metadata.get("ts") or 0)
+    except ValueError:
+        return 0.0
+
+
+def format_passages(docs: Sequence[Document], with_channel: bool = False) -> str:
+    if with_channel:
+        return "\n\n".join(f"[{i+1}] (#{d.metadata.get('channel', '')}) {d.page_content}" for i, d in enumerate(docs))
+    return "\n\n".join(f"[{i+1}] {d.page_content}" for i, d in enumerate(docs))
+
+
+def build_context(
+    question: str,
+    docs: Sequence[Document],
+    config: ContextConfig,
+    with_channel: bool = False,
+) -> BuiltContext:
+    """Fit retrieved passages into the model's context budget.
+
+    Passages are taken best-first: near-duplicates are dropped, long
+    passages are cut down to the part around the question's terms, and the
+    last passage that does not fit is truncated to the remaining budget (or
+    dropped if too little is left). The survivors are then ordered by score
+    or by time and numbered for the prompt; the returned docs are exactly
+    what the LLM saw.
+    """
+    encoding = encoding_for_model(config.model)
+    unique = _dedupe(docs, config.dedupe_threshold)
+    built = BuiltContext(text="", docs=[], tokens=0, dropped_duplicates=len(docs) - len(unique))
+
+    remaining = config.max_tokens
+    for doc in unique:
+        budget = min(config.max_doc_tokens, remaining - _PASSAGE_OVERHEAD_TOKENS)
+        if budget < config.min_doc_tokens:
+            built.dropped_over_budget += 1
+            continue
+        text = doc.page_content
+        tokens = count_tokens(text, encoding)
+        if tokens > budget:
+            text = _truncate(text, question, budget, encoding)
+            tokens = count_tokens(text, encoding)
+            built.truncated += 1
+            doc = Document(page_content=text, metadata=dict(doc.metadata, _truncated=True))
+        built.docs.append(doc)
+        remaining -= tokens + _PASSAGE_OVERHEAD_TOKENS
+
+    if config.order == "time":
+        built.docs.sort(key=_sort_key_time)
+    built.text = format_passages(built.docs, with_channel=with_channel)
+    built.tokens = count_tokens(built.text, encoding)
+    return built
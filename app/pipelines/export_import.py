@@ -0,0 +1,249 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.config import get_settings
+from app.ingestion.slack_export import SlackExport
+from app.logging_config import setup_logging
+from app.metrics import INGEST_DOCUMENTS, INGEST_MESSAGES
+from app.processing.chunking import ChunkingConfig, chunk_documents, drop_low_information
+from app.processing.clean import apply_message_events, messages_to_documents, point_id
+from app.processing.normalize import SlackNormalizer
+from app.resources import ResourcePool, get_pool
+
+logger = logging.getLogger(__name__)
+
+# Daily files are grouped into tasks of about this much uncompressed JSON
+DEFAULT_TASK_MB = 8
+# Documents embedded and upserted per call inside a task
+_UPSERT_BATCH = 500
+
+
+@dataclass
+class _ImportTask:
+    channel: str
+    channel_id: str
+    files: List[str]
+
+
+@dataclass
+class _TaskResult:
+    channel: str
+    messages: int
+    documents: int
+    # Newest message ts in the task, and thread_ts -> newest reply ts
+    high: Optional[str]
+    thread_watermarks: Dict[str, str]
+
+
+@dataclass
+class ChannelImport:
+    """Outcome of importing one channel from an export."""
+
+    channel: str
+    tasks: int
+    messages: int = 0
+    documents: int = 0
+    last_timestamp: Optional[str] = None
+    thread_watermarks: Dict[str, str] = field(default_factory=dict, repr=False)
+    errors: List[str] = field(default_factory=list)
+
+    def merge(self, result: _TaskResult) -> None:
+        self.messages += result.messages
+        self.documents += result.documents
+        if result.high and (self.last_timestamp is None or float(result.high) > float(self.last_timestamp)):
+            self.last_timestamp = result.high
+        for thread_ts, latest in result.thread_watermarks.items():
+            if float(latest) > float(self.thread_watermarks.get(thread_ts, 0)):
+                self.thread_watermarks[thread_ts] = latest
+
+    def to_dict(self) -> Dict:
+        return {
+            "channel": self.channel,
+            "status": "failed" if self.errors else "succeeded",
+            "tasks": self.tasks,
+            "messages": self.messages,
+            "documents": self.documents,
+            "last_timestamp": self.last_timestamp,
+            "threads": len(self.thread_watermarks),
+            "errors": self.errors,
+        }
+
+
+# Per worker process: the open export and a normalizer built from its users and channels
+_worker_export: Optional[Tuple[SlackExport, SlackNormalizer]] = None
+
+
+def _init_worker(export_path: str, log_level: Optional[str] = None) -> None:
+    global _worker_export
+    if log_level:
+        # Spawned workers start without the parent's logging setup
+        setup_logging(log_level)
+    export = SlackExport(export_path)
+    channels = {c["id"]: c["name"] for c in export.channels() if c.get("id")}
+    _worker_export = (export, SlackNormalizer(users=export.user_names(), channels=channels))
+
+
+def _close_worker() -> None:
+    global _worker_export
+    if _worker_export is not None:
+        _worker_export[0].close()
+        _worker_export = None
+
+
+def _thread_watermarks(messages: Sequence[Dict]) -> Dict[str, str]:
+    """thread_ts -> newest reply ts among the given messages."""
+    marks: Dict[str, str] = {}
+    for m in messages:
+        thread_ts, ts = m.get("thread_ts"), m["ts"]
+        if thread_ts and thread_ts != ts and float(ts) > float(marks.get(thread_ts, 0)):
+            marks[thread_ts] = ts
+    return marks
+
+
+def _run_task(task: _ImportTask, pool: Optional[ResourcePool] = None) -> _TaskResult:
+    """Clean, chunk, embed and upsert one run of daily files (normally in a worker process)."""
+    assert _worker_export is not None, "worker not initialised"
+    export, normalizer = _worker_export
+    settings = get_settings()
+    pool = pool or get_pool()
+    embeddings = pool.embeddings()
+    store = pool.store()
+    chunking = ChunkingConfig.from_settings(settings)
+    channel = task.channel
+
+    messages = list(export.iter_messages(task.files))
+    INGEST_MESSAGES.inc(len(messages))
+    upserts, deleted = apply_message_events(messages)
+    docs = drop_low_information(messages_to_documents(channel, upserts, normalizer), chunking)
+    if settings.chunking_enabled:
+        docs = chunk_documents(channel, docs, chunking)
+    if deleted:
+        store.delete_messages(channel, deleted)
+
+    for i in range(0, len(docs), _UPSERT_BATCH):
+        batch = docs[i:i + _UPSERT_BATCH]
+        vectors = embeddings.embed_documents([d.page_content for d in batch])
+        ids = [point_id(task.channel_id, d.metadata["ts"]) for d in batch]
+        store.upsert_documents(channel, batch, vectors, ids=ids)
+        INGEST_DOCUMENTS.inc(len(batch))
+
+    high = max((m["ts"] for m in messages), key=float, default=None)
+    logger.info(f"Imported {len(messages)} messages ({len(docs)} documents) of '{channel}' from {len(task.files)} files")
+    return _TaskResult(channel, len(messages), len(docs), high, _thread_watermarks(messages))
+
+
+def _run_channel(tasks: Sequence[_ImportTask]) -> List[_TaskResult]:
+    """Run one channel's tasks in order in this worker; the first failure stops the channel."""
+    return [_run_task(task) for task in tasks]
+
+
+def _plan(export: SlackExport, channels: Sequence[Dict], task_bytes: int) -> List[_ImportTask]:
+    """Split each channel's daily files, in order, into tasks of about ``task_bytes``."""
+    tasks: List[_ImportTask] = []
+    for channel in channels:
+        files: List[str] = []
+        size = 0
+        for name, file_size in export.day_files(channel["name"]):
+            files.append(name)
+            size += file_size
+            if size >= task_bytes:
+                tasks.append(_ImportTask(channel["name"], channel["id"], files))
+                files, size = [], 0
+        if files:
+            tasks.append(_ImportTask(channel["name"], channel["id"], files))
+    return tasks
+
+
+def import_export(
+    export_path: str,
+    channels: Optional[Sequence[str]] = None,
+    workers: Optional[int] = None,
+    task_mb: float = DEFAULT_TASK_MB,
+    pool: Optional[ResourcePool] = None,
+) -> List[ChannelImport]:
+    """Backfill channels from a Slack workspace export ZIP without calling the Slack API.
+
+    Daily files are read straight from the archive and grouped into tasks
+    that run through the regular clean -> chunk -> embed -> upsert path.
+    Channels are spread over ``workers`` processes; a channel's tasks run in
+    order in one of them. Point IDs are deterministic, so re-importing with
+    the same ``task_mb`` overwrites instead of duplicating. With chunking
+    on, a chunk's ID is its first message's, and chunks formed at task
+    boundaries differ from those of API ingestion: re-ingesting the same
+    messages through the API can leave overlapping chunks until a full
+    refresh prunes them. Once every task of a channel succeeded, its watermarks
+    (newest message and newest reply per thread) are seeded into the
+    ingestion metadata and the next incremental ingest continues from where
+    the export ends. Threads spanning two tasks are chunked per task.
+    """
+    settings = get_settings()
+    pool = pool or get_pool()
+    workers = workers or settings.ingest_max_workers
+    if workers > 1 and settings.qdrant_path:
+        logger.warning("Embedded Qdrant (QDRANT_PATH) cannot be shared between processes; importing with one worker")
+        workers = 1
+
+    export = SlackExport(export_path)
+    try:
+        available = export.channels()
+        if channels:
+            by_name = {c["name"]: c for c in available}
+            missing = [name for name in channels if name not in by_name]
+            if missing:
+                raise ValueError(f"Channels not in export: {', '.join(missing)}")
+            available = [by_name[name] for name in channels]
+        tasks = _plan(export, available, int(task_mb * 1024 * 1024))
+    finally:
+        export.close()
+
+    results = {c["name"]: ChannelImport(c["name"], tasks=sum(t.channel == c["name"] for t in tasks)) for c in available}
+    logger.info(f"Importing {len(results)} channels from {export_path} as {len(tasks)} tasks with {workers} workers")
+    # Create collections up front so workers never race to create the same one
+    store = pool.store()
+    for name, result in results.items():
+        if result.tasks:
+            store.ensure_collection(name)
+
+    if workers == 1:
+        _init_worker(export_path)
+        try:
+            for task in tasks:
+                try:
+                    results[task.channel].merge(_run_task(task, pool))
+                except Exception as e:
+                    logger.error(f"Import task for channel '{task.channel}' failed: {e}")
+                    results[task.channel].errors.append(str(e))
+        finally:
+            _close_worker()
+    else:
+        # Spawned, not forked: workers must not inherit the parent's open clients and SQLite connections
+        context = multiprocessing.get_context("spawn")
+        log_level = logging.getLevelName(logging.getLogger("app").getEffectiveLevel())
+        initargs = (export_path, log_level)
+        # All tasks of a channel go to one worker, so the channel's writes never race each other
+        by_channel: Dict[str, List[_ImportTask]] = {}
+        for task in tasks:
+            by_channel.setdefault(task.channel, []).append(task)
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=initargs) as executor:
+            futures = {executor.submit(_run_channel, channel_tasks): channel for channel, channel_tasks in by_channel.items()}
+            for future in as_completed(futures):
+                channel = futures[future]
+                try:
+                    for task_result in future.result():
+                        results[channel].merge(task_result)
+                except Exception as e:
+                    logger.error(f"Import of channel '{channel}' failed: {e}")
+                    results[channel].errors.append(str(e))
+
+    metadata = pool.metadata()
+    for result in results.values():
+        if result.errors:
+            # Nothing is seeded; re-running the import overwrites what was stored
+            logger.error(f"Import of channel '{result.channel}' failed in {len(result.errors)} tasks; watermarks not seeded")
+            continue
+        if result.messages:
+            metadata.seed_watermarks(result.channel, result.last_timestamp, result.messages, result.thread_watermarks)
+    return list(results.values())
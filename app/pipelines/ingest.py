@@ -1,98 +1,332 @@
 import logging
-from typing import List, Optional
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
 
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 
 from app.config import get_settings
 from app.ingestion.slack_client import SlackIngestionClient
-from app.processing.clean import messages_to_documents
-from app.providers.registry import get_embeddings
+from app.metrics import INGEST_CLEAN_SECONDS, INGEST_DOCUMENTS, INGEST_MESSAGES, observe
+from app.pipelines.scheduler import IngestionProgress
+from app.pipelines.streaming import staged
+from app.processing.chunking import ChunkingConfig, chunk_documents, drop_low_information, unpack_chunk
+from app.processing.clean import apply_message_events, messages_to_documents, point_id
+from app.processing.normalize import SlackNormalizer
+from app.resources import ResourcePool, get_pool
 from app.storage.metadata import IngestionMetadata
 from app.vectorstore.qdrant_store import QdrantStore
 
 logger = logging.getLogger(__name__)
 
 
-def ingest_channel(channel: str, force_full_refresh: bool = False) -> int:
+# A history page with the thread replies fetched for it:
+# (page messages, replies, thread_ts -> latest_reply to record)
+_FetchedBatch = Tuple[List[Dict], List[Dict], Dict[str, str]]
+
+# A batch after cleaning and embedding: (page messages, documents, point ids, vectors,
+# edited or deleted message ts, new versions of edited messages, thread watermarks)
+_EmbeddedBatch = Tuple[
+    List[Dict], List[Document], List[str], List[List[float]], List[str], List[Document], Dict[str, str]
+]
+
+
+@dataclass
+class _IngestContext:
+    channel: str
+    channel_id: str
+    slack: SlackIngestionClient
+    pool: ResourcePool
+    metadata: IngestionMetadata
+    progress: IngestionProgress
+    normalizer: SlackNormalizer
+    # thread_ts -> latest_reply already stored; empty on a full refresh
+    thread_marks: Dict[str, str] = field(default_factory=dict)
+
+
+def _log_messages(messages: List[Dict], sample_rate: float = 0.0) -> None:
+    """Per-message detail: every message at DEBUG, else a ``sample_rate`` fraction at INFO."""
+    if logger.isEnabledFor(logging.DEBUG):
+        level, sampled = logging.DEBUG, messages
+    elif sample_rate > 0 and logger.isEnabledFor(logging.INFO):
+        level, sampled = logging.INFO, [m for m in messages if random.random() < sample_rate]
+    else:
+        return
+    for msg in sampled:
+        ts = msg.get("ts", "unknown")
+        text = msg.get("text", "")
+        text_preview = text[:100] + "..." if len(text) > 100 else text
+        user = msg.get("user", "unknown")
+        logger.log(level, f"  ts={ts}, user={user}, text='{text_preview}'")
+
+
+def _changed_threads(page: List[Dict], thread_marks: Dict[str, str]) -> List[Tuple[str, Optional[str], str]]:
+    """Parents whose latest reply is newer than what is stored: (thread_ts, stored, latest_reply)."""
+    changed = []
+    for msg in page:
+        latest_reply = msg.get("latest_reply")
+        if not msg.get("reply_count") or not latest_reply:
+            continue
+        stored = thread_marks.get(msg["ts"])
+        if stored is None or float(latest_reply) > float(stored):
+            changed.append((msg["ts"], stored, latest_reply))
+    return changed
+
+
+def replace_messages(
+    store: QdrantStore,
+    embeddings: Embeddings,
+    channel: str,
+    channel_id: str,
+    message_ts: Sequence[str],
+    replacements: Sequence[Document],
+    config: ChunkingConfig,
+) -> List[str]:
+    """Remove edited or deleted messages from the chunks holding them without losing their neighbours.
+
+    Every stored chunk containing one of ``message_ts`` is split back into its
+    messages, the changed ones are dropped, and the rest are re-packed
+    together with ``replacements`` (the new versions of edited messages) and
+    stored in place of the old chunks. Returns the IDs of the stored points.
+    """
+    changed = set(message_ts)
+    neighbours: Dict[str, Document] = {}
+    legacy = 0
+    for chunk in store.find_messages(channel, message_ts):
+        messages = unpack_chunk(chunk)
+        if messages is None:
+            if chunk.metadata.get("message_count", 1) > 1:
+                legacy += 1
+            continue
+        for doc in messages:
+            if doc.metadata["ts"] not in changed:
+                neighbours.setdefault(doc.metadata["ts"], doc)
+    if legacy:
+        logger.warning(
+            f"{legacy} chunks of channel '{channel}' predate per-message offsets; "
+            f"their unchanged messages return on the next full refresh"
+        )
+
+    docs = chunk_documents(channel, list(neighbours.values()) + list(replacements), config)
+    ids = [point_id(channel_id, d.metadata["ts"]) for d in docs]
+    vectors = embeddings.embed_documents([d.page_content for d in docs]) if docs else []
+    # Re-packed chunks may start at a different message, so the old points go first
+    store.delete_messages(channel, message_ts)
+    if docs:
+        store.ensure_collection(channel)
+        store.upsert_documents(channel, docs, vectors, ids=ids)
+    logger.info(
+        f"Replaced {len(changed)} edited or deleted messages in channel '{channel}': "
+        f"re-packed {len(neighbours)} neighbours into {len(docs)} documents"
+    )
+    return ids
+
+
+def _ingest_range(
+    ctx: _IngestContext,
+    oldest: Optional[str],
+    latest: Optional[str],
+    seen_ids: Optional[Set[str]] = None,
+    threads_only: bool = False,
+) -> Tuple[int, Optional[str]]:
+    """Stream one history range through fetch -> replies -> clean/embed -> upsert.
+
+    Point IDs are derived from (channel_id, ts), so re-ingesting a message
+    overwrites its point. Replies are fetched only for threads whose
+    ``latest_reply`` moved past the stored per-thread watermark. Each committed
+    batch is checkpointed so an interrupted run resumes from the oldest stored
+    message. With ``threads_only`` the history pages are only scanned for
+    changed threads and not stored again. Upserted IDs are added to
+    ``seen_ids`` when given. Returns (documents stored, newest ts seen).
+    """
+    settings = get_settings()
+    embeddings = ctx.pool.embeddings()
+    store = ctx.pool.store()
+    channel, channel_id, progress = ctx.channel, ctx.channel_id, ctx.progress
+    chunking = ChunkingConfig.from_settings(settings)
+
+    def fetch_pages() -> Iterator[List[Dict]]:
+        for page in ctx.slack.iter_message_pages(channel_id, oldest=oldest, latest=latest):
+            if oldest:
+                # Filter out messages we've already processed (same timestamp as last processed)
+                page = [msg for msg in page if msg.get("ts", "0") > oldest]
+            if not threads_only:
+                progress.fetched += len(page)
+                INGEST_MESSAGES.inc(len(page))
+                _log_messages(page, settings.log_message_sample_rate)
+            if page:
+                yield page
+
+    def fetch_threads(page: List[Dict]) -> _FetchedBatch:
+        changed = _changed_threads(page, ctx.thread_marks)
+        futures = [
+            replies_pool.submit(ctx.slack.fetch_replies, channel_id, thread_ts, stored)
+            for thread_ts, stored, _ in changed
+        ]
+        replies = [reply for future in futures for reply in future.result()]
+        progress.fetched += len(replies)
+        INGEST_MESSAGES.inc(len(replies))
+        _log_messages(replies, settings.log_message_sample_rate)
+        return page, replies, {thread_ts: latest_reply for thread_ts, _, latest_reply in changed}
+
+    def clean_and_embed(batch: _FetchedBatch) -> _EmbeddedBatch:
+        page, replies, thread_updates = batch
+        messages = replies if threads_only else page + replies
+        with observe(INGEST_CLEAN_SECONDS):
+            upserts, changed = apply_message_events(messages)
+            edited = {
+                m["message"]["ts"]
+                for m in messages
+                if m.get("subtype") == "message_changed" and (m.get("message") or {}).get("ts")
+            }
+            changed += sorted(edited)
+            docs = drop_low_information(messages_to_documents(channel, upserts, ctx.normalizer), chunking)
+            replacements: List[Document] = []
+            if settings.chunking_enabled:
+                # Edited messages are re-packed with the neighbours they were stored with
+                replacements = [d for d in docs if d.metadata["ts"] in edited]
+                docs = chunk_documents(channel, [d for d in docs if d.metadata["ts"] not in edited], chunking)
+        ids = [point_id(channel_id, d.metadata["ts"]) for d in docs]
+        vectors = embeddings.embed_documents([d.page_content for d in docs]) if docs else []
+        progress.embedded += len(docs)
+        return page, docs, ids, vectors, changed, replacements, thread_updates
+
+    run_high: Optional[str] = None
+    stored = 0
+    stages = [fetch_threads, clean_and_embed]
+    with ThreadPoolExecutor(max_workers=settings.thread_fetch_concurrency, thread_name_prefix="replies") as replies_pool:
+        batches = staged(fetch_pages(), stages, queue_size=settings.ingest_queue_size)
+        for page, docs, ids, vectors, changed_ts, replacements, thread_updates in batches:
+            if changed_ts and settings.chunking_enabled:
+                repacked = replace_messages(store, embeddings, channel, channel_id, changed_ts, replacements, chunking)
+                if seen_ids is not None:
+                    seen_ids.update(repacked)
+                stored += len(repacked)
+                progress.embedded += len(repacked)
+                progress.upserted += len(repacked)
+                INGEST_DOCUMENTS.inc(len(repacked))
+            elif changed_ts:
+                # One point per message: edits overwrite theirs below
+                logger.info(f"Removing {len(changed_ts)} edited or deleted messages from channel '{channel}'")
+                store.delete_messages(channel, changed_ts)
+            if docs:
+                store.ensure_collection(channel)
+                store.upsert_documents(channel, docs, vectors, ids=ids)
+                if seen_ids is not None:
+                    seen_ids.update(ids)
+            stored += len(docs)
+            progress.upserted += len(docs)
+            INGEST_DOCUMENTS.inc(len(docs))
+
+            ctx.thread_marks.update(thread_updates)
+            if threads_only:
+                ctx.metadata.update_thread_watermarks(channel, thread_updates)
+                continue
+            timestamps = [msg.get("ts", "0") for msg in page]
+            page_high = max(timestamps, key=float)
+            if run_high is None or float(page_high) > float(run_high):
+                run_high = page_high
+            # Run checkpoint and thread watermarks land in one transaction
+            ctx.metadata.commit_batch(
+                channel,
+                floor=oldest,
+                high=run_high,
+                low=min(timestamps, key=float),
+                message_count=len(page),
+                thread_watermarks=thread_updates,
+            )
+            logger.info(f"Committed batch of {len(docs)} documents for channel '{channel}' ({stored} so far)")
+    return stored, run_high
+
+
+def list_ingestible_channels(pool: Optional[ResourcePool] = None, include_archived: bool = False) -> List[str]:
+    """Names of every channel the bot can see, for bulk ingestion."""
+    pool = pool or get_pool()
+    channels = pool.slack_client().list_channels(include_private=True)
+    return [c["name"] for c in channels if include_archived or not c.get("is_archived")]
+
+
+def ingest_channel(
+    channel: str,
+    force_full_refresh: bool = False,
+    pool: Optional[ResourcePool] = None,
+    progress: Optional[IngestionProgress] = None,
+) -> int:
     logger.info(f"Starting ingestion pipeline for channel: {channel}, force_full_refresh: {force_full_refresh}")
     settings = get_settings()
-    slack = SlackIngestionClient(settings)
-    metadata = IngestionMetadata()
-    
+    pool = pool or get_pool()
+    progress = progress or IngestionProgress()
+    slack = pool.slack_client()
+    metadata = pool.metadata()
+
     channel_id = slack.get_channel_id(channel)
     if not channel_id:
         logger.error(f"Channel '{channel}' not found")
         raise ValueError(f"Channel not found: {channel}")
 
-    # Determine oldest timestamp for incremental updates
+    ctx = _IngestContext(
+        channel=channel,
+        channel_id=channel_id,
+        slack=slack,
+        pool=pool,
+        metadata=metadata,
+        progress=progress,
+        normalizer=SlackNormalizer(users=slack.user_names(), channels=slack.channel_names()),
+        thread_marks={} if force_full_refresh else metadata.get_thread_watermarks(channel),
+    )
+
+    stored = 0
     oldest_timestamp: Optional[str] = None
-    if not force_full_refresh:
-        last_timestamp = metadata.get_last_timestamp(channel)
-        if last_timestamp:
-            # Use the exact last timestamp - Slack API will return messages AFTER this timestamp
-            oldest_timestamp = last_timestamp
+    if force_full_refresh:
+        metadata.clear_pending_run(channel)
+        logger.info(f"Full refresh of channel '{channel}': re-ingesting the entire history")
+    else:
+        pending = metadata.get_pending_run(channel)
+        if pending:
+            # Finish the interrupted run first: everything newer than its oldest
+            # committed message is already stored.
+            logger.info(f"Resuming interrupted ingest for channel '{channel}': {pending}")
+            count, _ = _ingest_range(ctx, pending.get("floor"), pending.get("low"))
+            stored += count
+            metadata.complete_run(channel, pending.get("high"))
+
+        # Use the exact last timestamp - Slack API will return messages AFTER this timestamp
+        oldest_timestamp = metadata.get_last_timestamp(channel)
+        if oldest_timestamp:
             stats = metadata.get_channel_stats(channel)
-            logger.info(f"========== INCREMENTAL UPDATE MODE ==========")
-            logger.info(f"  Last processed timestamp: {oldest_timestamp}")
-            logger.info(f"  Total messages processed so far: {stats.get('total_messages', 0)}")
-            logger.info(f"  Fetching only NEW messages after this timestamp...")
-            logger.info(f"=============================================")
+            logger.info(
+                f"Incremental update of channel '{channel}': fetching messages after {oldest_timestamp} "
+                f"({stats.get('total_messages', 0)} processed so far)"
+            )
         else:
-            logger.info("========== FIRST-TIME FULL INGESTION ==========")
-            logger.info("  No previous ingestion found")
-            logger.info("  Fetching ALL messages from channel history...")
-            logger.info("===============================================")
-    else:
-        logger.info("========== FORCE FULL REFRESH MODE ==========")
-        logger.info("  Re-ingesting ENTIRE channel (ignoring previous state)")
-        logger.info("=============================================")
-
-    logger.info(f"Fetching messages for channel '{channel}' (ID: {channel_id})")
-    messages = slack.fetch_messages(channel_id, oldest=oldest_timestamp)
-    logger.info(f"Fetched {len(messages)} raw messages from Slack API")
-    
-    # Filter out messages we've already processed (same timestamp as last processed)
-    if oldest_timestamp and messages:
-        original_count = len(messages)
-        messages = [msg for msg in messages if msg.get("ts", "0") > oldest_timestamp]
-        filtered_count = len(messages)
-        logger.info(f"Filtered messages: {original_count} -> {filtered_count} (removed {original_count - filtered_count} already processed)")
-    
-    # Log details of each message being ingested
-    if messages:
-        logger.info(f"========== INGESTING {len(messages)} NEW MESSAGES ==========")
-        for idx, msg in enumerate(messages, 1):
-            ts = msg.get("ts", "unknown")
-            text = msg.get("text", "")
-            text_preview = text[:100] + "..." if len(text) > 100 else text
-            user = msg.get("user", "unknown")
-            logger.info(f"  [{idx}] ts={ts}, user={user}, text='{text_preview}'")
-        logger.info(f"========== END OF NEW MESSAGES ==========")
-    
-    logger.info(f"Processing {len(messages)} new messages into documents")
-    
-    if not messages:
+            logger.info(f"First ingestion of channel '{channel}': fetching the entire history")
+
+    # A complete full refresh is a re-sync: points it did not write belong to
+    # deleted messages (or to duplicates from older random-ID ingests).
+    seen_ids: Optional[Set[str]] = set() if force_full_refresh and not settings.max_messages_per_channel else None
+
+    logger.info(f"Streaming messages for channel '{channel}' (ID: {channel_id})")
+    count, run_high = _ingest_range(ctx, oldest_timestamp, None, seen_ids=seen_ids)
+    stored += count
+    metadata.complete_run(channel, run_high)
+
+    if oldest_timestamp and settings.thread_lookback_days > 0:
+        # New replies on parents older than the watermark: rescan recent parents
+        # only and fetch replies for threads whose latest_reply moved.
+        lookback_start = time.time() - settings.thread_lookback_days * 86400
+        if lookback_start < float(oldest_timestamp):
+            logger.info(f"Checking threads with parents in the last {settings.thread_lookback_days} days for new replies")
+            count, _ = _ingest_range(ctx, f"{lookback_start:.6f}", oldest_timestamp, threads_only=True)
+            stored += count
+
+    if seen_ids is not None:
+        removed = pool.store().prune_points(channel, seen_ids)
+        logger.info(f"Full refresh removed {removed} stale points from channel '{channel}'")
+
+    if not stored:
         logger.info(f"No new messages found for channel '{channel}'")
-        return 0
-    
-    docs: List[Document] = messages_to_documents(channel, messages)
-    logger.info(f"Created {len(docs)} documents from messages")
-
-    if not docs:
-        logger.warning(f"No documents created for channel '{channel}'")
-        return 0
-
-    logger.info(f"Setting up embeddings and vector store for channel '{channel}'")
-    embeddings = get_embeddings(settings)
-    store = QdrantStore(settings, embeddings)
-    vectorstore = store.as_vectorstore(collection_name=channel)
-
-    logger.info(f"Adding {len(docs)} new documents to vector store")
-    vectorstore.add_documents(docs)
-    
-    # Update metadata with the latest message timestamp
-    latest_timestamp = max(msg.get("ts", "0") for msg in messages)
-    metadata.update_last_timestamp(channel, latest_timestamp, len(messages))
-    
-    logger.info(f"Successfully ingested {len(docs)} documents for channel '{channel}'")
-    return len(docs)
+    logger.info(f"Successfully ingested {stored} documents for channel '{channel}'")
+    return stored
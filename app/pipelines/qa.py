@@ -1,13 +1,16 @@
 import logging
-from typing import Dict
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
-from langchain_core.output_parsers import StrOutputParser
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
 
-from app.config import get_settings
-from app.providers.registry import get_embeddings, get_llm
-from app.vectorstore.qdrant_store import QdrantStore
+from app.pipelines.answer_cache import AnswerCache
+from app.pipelines.context import BuiltContext, ContextConfig, build_context
+from app.pipelines.retrieval import RerankMode, RetrievalMode, aretrieve
+from app.pipelines.search import resolve_channels
+from app.processing.tokens import count_tokens, encoding_for_model
+from app.resources import ResourcePool, get_pool
 
 logger = logging.getLogger(__name__)
 
@@ -18,40 +21,286 @@ RAG_PROMPT = ChatPromptTemplate.from_messages([
 ])
 
 
-def _format_docs(docs):
-    return "\n\n".join(f"[{i+1}] {d.page_content}" for i, d in enumerate(docs))
+def _build_chain(llm):
+    # No output parser: the returned message carries token usage
+    return RAG_PROMPT | llm
 
 
-def answer_question(channel: str, question: str, k: int = 5) -> Dict:
-    logger.info(f"Starting QA for channel '{channel}', question: '{question}', k={k}")
-    settings = get_settings()
-    
-    logger.info("Setting up embeddings and vector store")
-    embeddings = get_embeddings(settings)
-    store = QdrantStore(settings, embeddings)
-    retriever = store.as_retriever(collection_name=channel, k=k)
+def _build_context(pool: ResourcePool, question: str, docs: List[Document], with_channel: bool = False) -> BuiltContext:
+    context = build_context(question, docs, ContextConfig.from_settings(pool.settings), with_channel=with_channel)
+    logger.info(f"Context for LLM: {len(context.docs)} of {len(docs)} passages, {context.stats()}")
+    return context
 
-    logger.info("Setting up LLM")
-    llm = get_llm(settings)
 
-    logger.info("Building RAG chain")
-    chain = (
-        {"context": retriever | _format_docs, "question": RunnablePassthrough()}
-        | RAG_PROMPT
-        | llm
-        | StrOutputParser()
-    )
+def _token_usage(usage: Optional[Dict[str, Any]], question: str, context: BuiltContext, answer: str, model: str) -> Dict[str, int]:
+    """Prompt/completion token counts, as reported by the model or counted locally."""
+    if usage and usage.get("input_tokens"):
+        prompt_tokens = int(usage["input_tokens"])
+        completion_tokens = int(usage.get("output_tokens") or 0)
+    else:
+        encoding = encoding_for_model(model)
+        prompt = RAG_PROMPT.format(question=question, context=context.text)
+        prompt_tokens = count_tokens(prompt, encoding)
+        completion_tokens = count_tokens(answer, encoding)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
 
-    logger.info("Invoking RAG chain to generate answer")
-    answer = chain.invoke(question)
-    logger.info(f"Generated answer: {answer[:100]}...")
 
-    # also return top documents for transparency
-    logger.info("Retrieving source documents")
-    docs = retriever.get_relevant_documents(question)
+_NO_USAGE = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def _answer_cache(pool: ResourcePool, use_cache: bool) -> Optional[AnswerCache]:
+    return pool.answer_cache() if use_cache and pool.settings.answer_cache_enabled else None
+
+
+def _cache_scope(channel: str, retrieval: str, rerank: str) -> str:
+    """Answer cache namespace: answers retrieved differently are cached separately."""
+    if retrieval == "dense" and rerank == "none":
+        return channel
+    return f"{channel}|{retrieval}|{rerank}"
+
+
+def _cached_result(result: Dict, status: str, timings: Dict[str, float], total_start: float) -> Dict:
+    timings["total_ms"] = _elapsed_ms(total_start)
+    result["timings"] = timings
+    result["cache"] = status
+    # Nothing was sent to the LLM for this request
+    result["usage"] = dict(_NO_USAGE)
+    return result
+
+
+async def aanswer_question(
+    channel: str,
+    question: str,
+    k: int = 5,
+    pool: Optional[ResourcePool] = None,
+    use_cache: bool = True,
+    retrieval: RetrievalMode = "dense",
+    rerank: RerankMode = "none",
+) -> Dict:
+    """Answer a question from one channel; each remote call is bounded by a pool semaphore."""
+    logger.info(f"Starting async QA for channel '{channel}', k={k}")
+    logger.debug(f"Question: '{question}'")
+    pool = pool or get_pool()
+    total_start = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    embeddings = pool.embeddings()
+    store = pool.async_store()
+    await store.require_collection(channel)
+
+    cache = _answer_cache(pool, use_cache)
+    cache_scope = _cache_scope(channel, retrieval, rerank)
+    if cache is not None:
+        generation = pool.metadata().get_channel_generation(channel)
+        cached = cache.get_exact(cache_scope, question, k, generation)
+        if cached is not None:
+            logger.info(f"Answer cache hit for channel '{channel}'")
+            return _cached_result(cached, "hit", timings, total_start)
+
+    chain = pool.chain(channel, _build_chain)
+
+    start = time.perf_counter()
+    async with pool.semaphore("embedding"):
+        query_vector = await embeddings.aembed_query(question)
+    timings["embed_ms"] = _elapsed_ms(start)
+
+    if cache is not None:
+        cached = cache.get_similar(cache_scope, k, query_vector, generation)
+        if cached is not None:
+            logger.info(f"Semantic answer cache hit for channel '{channel}'")
+            return _cached_result(cached, "semantic_hit", timings, total_start)
+
+    docs = await aretrieve(pool, channel, question, query_vector, k=k, mode=retrieval, rerank=rerank, timings=timings)
+    logger.info(f"Retrieved {len(docs)} source documents ({retrieval}, rerank={rerank})")
+
+    context = _build_context(pool, question, docs)
+    start = time.perf_counter()
+    async with pool.semaphore("llm"):
+        message = await chain.ainvoke({"question": question, "context": context.text})
+    timings["llm_ms"] = _elapsed_ms(start)
+    answer = message.content
+    logger.debug(f"Generated answer: {answer[:100]}...")
+
+    timings["total_ms"] = _elapsed_ms(total_start)
+    logger.info(f"QA timings for channel '{channel}': {timings}")
+    usage = _token_usage(message.usage_metadata, question, context, answer, pool.settings.llm_model)
+    result = _build_result(answer, context, timings, usage)
+    if cache is not None:
+        cache.put(cache_scope, question, k, result, query_vector, generation)
+    result["cache"] = "miss" if cache is not None else "bypass"
+    return result
+
+
+async def aanswer_across_channels(
+    channels: Optional[Sequence[str]],
+    question: str,
+    k: int = 5,
+    pool: Optional[ResourcePool] = None,
+    use_cache: bool = True,
+) -> Dict:
+    """Answer from several channels at once: one embedding, parallel searches, one LLM call."""
+    pool = pool or get_pool()
+    total_start = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    channels, missing = await resolve_channels(pool, channels)
+    logger.info(f"Starting cross-channel QA over {len(channels)} channels, k={k}")
+    logger.debug(f"Question: '{question}'")
+    if missing:
+        logger.warning(f"Skipping channels that have not been ingested: {missing}")
+    scope = {"channels": channels, "missing_channels": missing}
+
+    cache = _answer_cache(pool, use_cache)
+    # A sum of generations moves whenever any selected channel is ingested
+    cache_key = "*:" + ",".join(sorted(channels))
+    if cache is not None:
+        metadata = pool.metadata()
+        generation = sum(metadata.get_channel_generation(channel) for channel in channels)
+        cached = cache.get_exact(cache_key, question, k, generation)
+        if cached is not None:
+            logger.info("Answer cache hit for cross-channel question")
+            return dict(_cached_result(cached, "hit", timings, total_start), **scope)
+
+    embeddings = pool.embeddings()
+    store = pool.async_store()
+    chain = pool.chain("*", _build_chain)
+
+    start = time.perf_counter()
+    async with pool.semaphore("embedding"):
+        query_vector = await embeddings.aembed_query(question)
+    timings["embed_ms"] = _elapsed_ms(start)
+
+    if cache is not None:
+        cached = cache.get_similar(cache_key, k, query_vector, generation)
+        if cached is not None:
+            logger.info("Semantic answer cache hit for cross-channel question")
+            return dict(_cached_result(cached, "semantic_hit", timings, total_start), **scope)
+
+    start = time.perf_counter()
+    docs = await store.search_many(channels, query_vector, k=k, semaphore=pool.semaphore("qdrant"))
+    timings["search_ms"] = _elapsed_ms(start)
+    logger.info(f"Retrieved {len(docs)} source documents from {len({d.metadata.get('channel') for d in docs})} channels")
+
+    context = _build_context(pool, question, docs, with_channel=True)
+    start = time.perf_counter()
+    async with pool.semaphore("llm"):
+        message = await chain.ainvoke({"question": question, "context": context.text})
+    timings["llm_ms"] = _elapsed_ms(start)
+    answer = message.content
+
+    timings["total_ms"] = _elapsed_ms(total_start)
+    logger.info(f"Cross-channel QA timings: {timings}")
+    usage = _token_usage(message.usage_metadata, question, context, answer, pool.settings.llm_model)
+    result = _build_result(answer, context, timings, usage)
+    if cache is not None:
+        cache.put(cache_key, question, k, result, query_vector, generation)
+    result["cache"] = "miss" if cache is not None else "bypass"
+    return dict(result, **scope)
+
+
+def _build_result(answer: str, context: BuiltContext, timings: Dict[str, float], usage: Dict[str, int]) -> Dict:
+    # Sources are the passages as the LLM saw them (deduplicated, possibly truncated)
     sources = [
         {"text": d.page_content, "metadata": d.metadata}
-        for d in docs
+        for d in context.docs
     ]
-    logger.info(f"Retrieved {len(sources)} source documents")
-    return {"answer": answer, "sources": sources}
+    return {"answer": answer, "sources": sources, "timings": timings, "usage": usage, "context": context.stats()}
+
+
+def _add_usage(total: Dict[str, int], usage: Optional[Dict[str, Any]]) -> None:
+    if not usage:
+        return
+    for key in ("input_tokens", "output_tokens", "total_tokens"):
+        total[key] = total.get(key, 0) + int(usage.get(key) or 0)
+
+
+async def astream_answer(
+    channel: str,
+    question: str,
+    k: int = 5,
+    pool: Optional[ResourcePool] = None,
+    use_cache: bool = True,
+    retrieval: RetrievalMode = "dense",
+    rerank: RerankMode = "none",
+) -> AsyncIterator[Tuple[str, Dict]]:
+    """Streaming variant of aanswer_question yielding (event, data) pairs.
+
+    Emits one "sources" event once retrieval is done, "token" events as the
+    LLM produces text, then a "done" event with timings, token usage and the
+    answer cache outcome. Cached answers arrive as a single token event.
+    """
+    logger.info(f"Starting streaming QA for channel '{channel}', k={k}")
+    logger.debug(f"Question: '{question}'")
+    pool = pool or get_pool()
+    total_start = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    embeddings = pool.embeddings()
+    store = pool.async_store()
+    await store.require_collection(channel)
+
+    cache = _answer_cache(pool, use_cache)
+    cache_scope = _cache_scope(channel, retrieval, rerank)
+    cached = None
+    query_vector = None
+    if cache is not None:
+        generation = pool.metadata().get_channel_generation(channel)
+        cached = cache.get_exact(cache_scope, question, k, generation)
+        status = "hit"
+    if cached is None:
+        start = time.perf_counter()
+        async with pool.semaphore("embedding"):
+            query_vector = await embeddings.aembed_query(question)
+        timings["embed_ms"] = _elapsed_ms(start)
+        if cache is not None:
+            cached = cache.get_similar(cache_scope, k, query_vector, generation)
+            status = "semantic_hit"
+
+    if cached is not None:
+        logger.info(f"Answer cache {status} for channel '{channel}'")
+        yield "sources", {"sources": cached["sources"]}
+        yield "token", {"text": cached["answer"]}
+        timings["total_ms"] = _elapsed_ms(total_start)
+        yield "done", {"timings": timings, "usage": dict(_NO_USAGE), "cache": status}
+        return
+
+    docs = await aretrieve(pool, channel, question, query_vector, k=k, mode=retrieval, rerank=rerank, timings=timings)
+    logger.info(f"Retrieved {len(docs)} source documents ({retrieval}, rerank={rerank})")
+    context = _build_context(pool, question, docs)
+    result = _build_result("", context, timings, dict(_NO_USAGE))
+    yield "sources", {"sources": result["sources"], "context": result["context"]}
+
+    chain = pool.chain(channel, _build_chain)
+    parts: List[str] = []
+    reported: Dict[str, int] = {}
+    start = time.perf_counter()
+    async with pool.semaphore("llm"):
+        async for chunk in chain.astream({"question": question, "context": context.text}):
+            _add_usage(reported, getattr(chunk, "usage_metadata", None))
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            if not text:
+                continue
+            if not parts:
+                timings["first_token_ms"] = _elapsed_ms(total_start)
+            parts.append(text)
+            yield "token", {"text": text}
+    timings["llm_ms"] = _elapsed_ms(start)
+
+    answer = "".join(parts)
+    logger.debug(f"Streamed answer: {answer[:100]}...")
+    timings["total_ms"] = _elapsed_ms(total_start)
+    logger.info(f"QA timings for channel '{channel}': {timings}")
+    usage = _token_usage(reported, question, context, answer, pool.settings.llm_model)
+    if cache is not None:
+        result["answer"] = answer
+        result["usage"] = usage
+        cache.put(cache_scope, question, k, result, query_vector, generation)
+    yield "done", {"timings": timings, "usage": usage, "cache": "miss" if cache is not None else "bypass"}
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import math
+import operator
+import time
+from typing import Dict, List, Literal, Optional, Sequence, Set
+
+from langchain_core.documents import Document
+
+from app.resources import ResourcePool
+
+logger = logging.getLogger(__name__)
+
+RetrievalMode = Literal["dense", "hybrid"]
+RerankMode = Literal["none", "mmr", "cross_encoder"]
+
+# Channels already reported as missing from the keyword index
+_unindexed_channels: Set[str] = set()
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def rrf_fuse(rankings: Sequence[Sequence[Document]], k: int = 60) -> List[Document]:
+    """Reciprocal rank fusion of several best-first rankings, keyed by point ID.
+
+    Each document scores ``sum(1 / (k + rank))`` over the rankings it appears
+    in (stored as ``_rrf``); earlier rankings win when the same point carries
+    different metadata.
+    """
+    fused: Dict[str, Document] = {}
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = str(doc.metadata.get("_id"))
+            fused.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    ordered = sorted(fused, key=scores.__getitem__, reverse=True)
+    for key in ordered:
+        fused[key].metadata["_rrf"] = scores[key]
+    return [fused[key] for key in ordered]
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(x * x for x in b))
+    return sum(map(operator.mul, a, b)) / norm if norm else 0.0
+
+
+def mmr(
+    docs: Sequence[Document],
+    query_vector: Sequence[float],
+    vectors: Dict[str, Sequence[float]],
+    k: int,
+    lambda_mult: float = 0.7,
+) -> List[Document]:
+    """Maximal marginal relevance: trade query similarity against redundancy with picks so far."""
+    candidates = [d for d in docs if str(d.metadata.get("_id")) in vectors]
+    relevance = {id(d): _cosine(query_vector, vectors[str(d.metadata["_id"])]) for d in candidates}
+    selected: List[Document] = []
+    while candidates and len(selected) < k:
+        def score(doc: Document) -> float:
+            vector = vectors[str(doc.metadata["_id"])]
+            redundancy = max((_cosine(vector, vectors[str(s.metadata["_id"])]) for s in selected), default=0.0)
+            return lambda_mult * relevance[id(doc)] - (1 - lambda_mult) * redundancy
+
+        best = max(candidates, key=score)
+        candidates.remove(best)
+        selected.append(best)
+    return selected
+
+
+class CrossEncoderReranker:
+    """Local cross-encoder scoring (query, passage) pairs; needs sentence-transformers."""
+
+    def __init__(self, model_name: str) -> None:
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise ValueError(
+                "Cross-encoder reranking requires the 'sentence-transformers' package"
+            ) from e
+        logger.info(f"Loading cross-encoder '{model_name}'")
+        self.model = CrossEncoder(model_name)
+
+    def rerank(self, query: str, docs: Sequence[Document], k: int) -> List[Document]:
+        if not docs:
+            return []
+        scores = self.model.predict([(query, d.page_content) for d in docs])
+        for doc, score in zip(docs, scores):
+            doc.metadata["_rerank_score"] = float(score)
+        return sorted(docs, key=lambda d: d.metadata["_rerank_score"], reverse=True)[:k]
+
+
+async def aretrieve(
+    pool: ResourcePool,
+    channel: str,
+    question: str,
+    query_vector: List[float],
+    k: int = 5,
+    mode: RetrievalMode = "dense",
+    rerank: RerankMode = "none",
+    timings: Optional[Dict[str, float]] = None,
+) -> List[Document]:
+    """Top ``k`` documents for a question in one channel.
+
+    ``hybrid`` fuses dense hits with BM25 hits from the local keyword index
+    (RRF); ``mmr`` and ``cross_encoder`` rerank a wider candidate set down to
+    ``k``. Plain dense search without reranking is a single Qdrant query.
+    """
+    settings = pool.settings
+    timings = timings if timings is not None else {}
+    store = pool.async_store()
+    candidates = k if mode == "dense" and rerank == "none" else max(k, settings.hybrid_candidates)
+
+    start = time.perf_counter()
+    async with pool.semaphore("qdrant"):
+        docs = await store.search(channel, query_vector, k=candidates)
+    timings["search_ms"] = _elapsed_ms(start)
+
+    if mode == "hybrid":
+        lexical = pool.lexical_index()
+        if lexical is None:
+            raise ValueError("Hybrid retrieval needs the keyword index (HYBRID_INDEX_ENABLED=true)")
+        start = time.perf_counter()
+        if not lexical.has_channel(channel) and channel not in _unindexed_channels:
+            _unindexed_channels.add(channel)
+            logger.warning(
+                f"Channel '{channel}' has no keyword index rows (ingested before hybrid retrieval?); "
+                f"hybrid results are dense-only until `python -m app.cli reindex-keywords {channel}`"
+            )
+        keyword_docs = await asyncio.to_thread(lexical.search, channel, question, candidates)
+        for doc in keyword_docs:
+            doc.metadata["_collection_name"] = store.layout.collection(channel)
+        timings["keyword_search_ms"] = _elapsed_ms(start)
+        docs = rrf_fuse([docs, keyword_docs], k=settings.rrf_k)
+        logger.info(f"Fused {len(keyword_docs)} keyword hits into {len(docs)} hybrid candidates")
+
+    if rerank == "mmr":
+        start = time.perf_counter()
+        async with pool.semaphore("qdrant"):
+            vectors = await store.vectors(channel, [d.metadata["_id"] for d in docs])
+        docs = mmr(docs, query_vector, vectors, k, lambda_mult=settings.mmr_lambda)
+        timings["rerank_ms"] = _elapsed_ms(start)
+    elif rerank == "cross_encoder":
+        start = time.perf_counter()
+        reranker = await asyncio.to_thread(pool.reranker)
+        docs = await asyncio.to_thread(reranker.rerank, question, docs, k)
+        timings["rerank_ms"] = _elapsed_ms(start)
+    return docs[:k]
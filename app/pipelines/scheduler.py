@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.config import Settings, get_settings
+from app.storage.metadata import IngestionMetadata
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+@dataclass
+class IngestionProgress:
+    """Counters updated by the ingest pipeline while a job runs."""
+
+    fetched: int = 0
+    embedded: int = 0
+    upserted: int = 0
+
+
+@dataclass
+class IngestionJob:
+    channel: str
+    force_full_refresh: bool = False
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: JobStatus = JobStatus.QUEUED
+    progress: IngestionProgress = field(default_factory=IngestionProgress)
+    documents: Optional[int] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    future: Optional[Future] = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "channel": self.channel,
+            "force_full_refresh": self.force_full_refresh,
+            "status": self.status.value,
+            "fetched": self.progress.fetched,
+            "embedded": self.progress.embedded,
+            "upserted": self.progress.upserted,
+            "documents": self.documents,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class IngestionScheduler:
+    """Bounded worker pool running ingest jobs, with one active job per channel."""
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        ingest_fn: Optional[Callable[..., int]] = None,
+        history_size: int = 1000,
+        metadata: Optional[IngestionMetadata] = None,
+    ) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._ingest_fn = ingest_fn
+        self._metadata = metadata
+        self._history_size = history_size
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._active: Dict[str, IngestionJob] = {}
+        # Full refreshes requested while an incremental job of the channel was running
+        self._follow_ups: Dict[str, IngestionJob] = {}
+
+    def submit(self, channel: str, force_full_refresh: bool = False) -> IngestionJob:
+        """Enqueue an ingest, merging with an active job for the same channel.
+
+        A full refresh cannot join an incremental job that is already
+        running, so it is queued to start once that job finishes.
+        """
+        with self._lock:
+            active = self._follow_ups.get(channel) or self._active.get(channel)
+            if active is not None:
+                if force_full_refresh and not active.force_full_refresh:
+                    if active.status == JobStatus.QUEUED:
+                        active.force_full_refresh = True
+                    else:
+                        job = IngestionJob(channel=channel, force_full_refresh=True, future=Future())
+                        self._jobs[job.job_id] = job
+                        self._follow_ups[channel] = job
+                        self._prune()
+                        logger.info(f"Queued full refresh job {job.job_id} for channel '{channel}' after job {active.job_id}")
+                        return job
+                logger.info(f"Merged ingest request for channel '{channel}' into job {active.job_id}")
+                return active
+
+            job = IngestionJob(channel=channel, force_full_refresh=force_full_refresh)
+            self._jobs[job.job_id] = job
+            self._active[channel] = job
+            self._prune()
+            job.future = self._executor.submit(self._run, job)
+        logger.info(f"Queued ingest job {job.job_id} for channel '{channel}'")
+        return job
+
+    def submit_many(self, channels: Iterable[str], force_full_refresh: bool = False) -> List[IngestionJob]:
+        """Enqueue several channels; they run concurrently up to the worker limit."""
+        return [self.submit(channel, force_full_refresh=force_full_refresh) for channel in channels]
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def wait(self, job: IngestionJob, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes; returns False on timeout."""
+        try:
+            job.future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return False
+        except Exception:
+            pass
+        return True
+
+    async def await_job(self, job: IngestionJob, timeout: Optional[float] = None) -> bool:
+        """Async wait that leaves the job running if the timeout expires."""
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        except Exception:
+            pass
+        return True
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            follow_ups = list(self._follow_ups.values())
+            self._follow_ups.clear()
+        for job in follow_ups:
+            job.future.cancel()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _start_follow_up(self, job: IngestionJob) -> None:
+        """Run a queued follow-up job, resolving the future its callers already hold."""
+
+        def resolve(inner: Future) -> None:
+            if inner.cancelled():
+                job.future.cancel()
+            elif inner.exception() is not None:
+                job.future.set_exception(inner.exception())
+            else:
+                job.future.set_result(inner.result())
+
+        try:
+            self._executor.submit(self._run, job).add_done_callback(resolve)
+        except RuntimeError:
+            # Shutting down
+            job.future.cancel()
+
+    def _run(self, job: IngestionJob) -> Optional[int]:
+        ingest_fn = self._ingest_fn
+        if ingest_fn is None:
+            # Imported lazily: the pipeline pulls in Slack/Qdrant clients
+            from app.pipelines.ingest import ingest_channel as ingest_fn
+
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        logger.info(f"Running ingest job {job.job_id} for channel '{job.channel}'")
+        try:
+            job.documents = ingest_fn(
+                job.channel,
+                force_full_refresh=job.force_full_refresh,
+                progress=job.progress,
+            )
+            job.status = JobStatus.SUCCEEDED
+            return job.documents
+        except Exception as e:
+            logger.error(f"Ingest job {job.job_id} for channel '{job.channel}' failed: {e}")
+            job.error = str(e)
+            job.status = JobStatus.FAILED
+            raise
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active.get(job.channel) is job:
+                    del self._active[job.channel]
+                follow_up = self._follow_ups.pop(job.channel, None)
+                if follow_up is not None:
+                    self._active[job.channel] = follow_up
+            self._record(job)
+            if follow_up is not None:
+                self._start_follow_up(follow_up)
+
+    def _record(self, job: IngestionJob) -> None:
+        """Persist the finished job to the metadata store's job history."""
+        metadata = self._metadata
+        if metadata is None:
+            if self._ingest_fn is not None:
+                return
+            from app.resources import get_pool
+
+            metadata = get_pool().metadata()
+        try:
+            metadata.record_job(
+                job.job_id,
+                job.channel,
+                job.status.value,
+                force_full_refresh=job.force_full_refresh,
+                started_at=job.started_at,
+                finished_at=job.finished_at,
+                messages=job.progress.fetched,
+                embeddings=job.progress.embedded,
+                upserted=job.progress.upserted,
+                documents=job.documents,
+                error=job.error,
+            )
+        except Exception as e:
+            logger.warning(f"Could not record history for ingest job {job.job_id}: {e}")
+
+    def _prune(self) -> None:
+        while len(self._jobs) > self._history_size:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if not oldest.done:
+                break
+            del self._jobs[oldest_id]
+
+
+_scheduler: Optional[IngestionScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(settings: Optional[Settings] = None) -> IngestionScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            settings = settings or get_settings()
+            _scheduler = IngestionScheduler(max_workers=settings.ingest_max_workers)
+        return _scheduler
+
+
+def shutdown_scheduler(wait: bool = False) -> None:
+    global _scheduler
+    with _scheduler_lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is not None:
+        scheduler.shutdown(wait=wait)
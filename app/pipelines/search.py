@@ -0,0 +1,88 @@
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.resources import ResourcePool, get_pool
+from app.vectorstore.collection_registry import CollectionNotIngestedError
+from app.vectorstore.qdrant_store import metadata_filter
+
+logger = logging.getLogger(__name__)
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+async def resolve_channels(pool: ResourcePool, channels: Optional[Sequence[str]]) -> Tuple[List[str], List[str]]:
+    """Ingested and missing channels of a selection; ``None`` selects every ingested channel."""
+    store = pool.async_store()
+    if channels is None:
+        present = pool.metadata().list_channels()
+        if not store.layout.shared_collection:
+            # Only channels whose collection still exists; other collections are not channels
+            collections = set(await store.list_channels())
+            present = [c for c in present if c in collections]
+        if not present:
+            raise ValueError("No channels have been ingested yet")
+        return present, []
+    if not channels:
+        raise ValueError("Select at least one channel, or omit channels to search all of them")
+    present, missing = await store.existing_channels(list(dict.fromkeys(channels)))
+    if not present:
+        raise CollectionNotIngestedError(", ".join(missing))
+    return present, missing
+
+
+async def asearch(
+    query: str,
+    channels: Optional[Sequence[str]] = None,
+    k: int = 10,
+    offset: int = 0,
+    score_threshold: Optional[float] = None,
+    user: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    ts: Optional[str] = None,
+    thread_ts: Optional[str] = None,
+    pool: Optional[ResourcePool] = None,
+) -> Dict:
+    """Scored hits for a query without generation: one embedding plus filtered vector search."""
+    pool = pool or get_pool()
+    total_start = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    channels, missing = await resolve_channels(pool, channels)
+    logger.info(f"Searching {len(channels)} channels, k={k}, offset={offset}")
+    logger.debug(f"Search query: '{query}'")
+
+    start = time.perf_counter()
+    async with pool.semaphore("embedding"):
+        query_vector = await pool.embeddings().aembed_query(query)
+    timings["embed_ms"] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    docs = await pool.async_store().search_many(
+        channels,
+        query_vector,
+        k=k,
+        semaphore=pool.semaphore("qdrant"),
+        query_filter=metadata_filter(user=user, since=since, until=until, ts=ts, thread_ts=thread_ts),
+        score_threshold=score_threshold,
+        offset=offset,
+    )
+    timings["search_ms"] = _elapsed_ms(start)
+    timings["total_ms"] = _elapsed_ms(total_start)
+    logger.info(f"Search returned {len(docs)} hits in {timings['total_ms']} ms")
+
+    hits = [
+        {"text": d.page_content, "score": d.metadata.get("_score"), "metadata": d.metadata}
+        for d in docs
+    ]
+    return {
+        "hits": hits,
+        "next_offset": offset + k if len(hits) == k else None,
+        "timings": timings,
+        "channels": channels,
+        "missing_channels": missing,
+    }
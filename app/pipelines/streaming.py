@@ -0,0 +1,91 @@
+import logging
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+class _StageFailure:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+def _put(q: "queue.Queue", item: Any, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _source_worker(source: Iterable, out_q: "queue.Queue", stop: threading.Event) -> None:
+    try:
+        for item in source:
+            if not _put(out_q, item, stop):
+                return
+    except BaseException as e:
+        _put(out_q, _StageFailure(e), stop)
+        return
+    _put(out_q, _DONE, stop)
+
+
+def _stage_worker(fn: Callable[[Any], Any], in_q: "queue.Queue", out_q: "queue.Queue", stop: threading.Event) -> None:
+    while not stop.is_set():
+        try:
+            item = in_q.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            continue
+        if item is _DONE or isinstance(item, _StageFailure):
+            _put(out_q, item, stop)
+            return
+        try:
+            result = fn(item)
+        except BaseException as e:
+            _put(out_q, _StageFailure(e), stop)
+            return
+        if not _put(out_q, result, stop):
+            return
+
+
+def staged(source: Iterable, stages: Sequence[Callable[[Any], Any]], queue_size: int = 4) -> Iterator:
+    """Run a source and each stage in its own thread, linked by bounded queues.
+
+    Items come out in source order. At most ``queue_size`` items wait between
+    any two stages, so memory stays bounded while the stages overlap. The first
+    error from any stage is re-raised to the consumer; closing the generator
+    early stops every worker.
+    """
+    stop = threading.Event()
+    queues: List["queue.Queue"] = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    threads = [threading.Thread(target=_source_worker, args=(source, queues[0], stop), name="stage-source", daemon=True)]
+    for idx, fn in enumerate(stages):
+        threads.append(
+            threading.Thread(
+                target=_stage_worker,
+                args=(fn, queues[idx], queues[idx + 1], stop),
+                name=f"stage-{idx + 1}",
+                daemon=True,
+            )
+        )
+    for thread in threads:
+        thread.start()
+
+    out_q = queues[-1]
+    try:
+        while True:
+            item = out_q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _StageFailure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=5)
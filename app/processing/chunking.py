@@ -0,0 +1,155 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Pattern, Sequence
+
+from langchain_core.documents import Document
+
+from app.config import Settings
+from app.processing.clean import message_metadata
+from app.processing.tokens import count_tokens, get_encoding
+
+# Acknowledgements and reactions that add nothing to retrieval
+DEFAULT_DROP_PATTERNS: List[str] = [
+    r"^(ok|okay|k|kk|sure|thanks|thank you|thx|ty|np|\+1|lol|nice|cool|great|done|yes|yep|no|nope|ack)[.!]*$",
+    r"^(:[a-z0-9_+\-']+:\s*)+$",
+]
+
+
+@dataclass
+class ChunkingConfig:
+    max_tokens: int = 512
+    overlap_messages: int = 1
+    max_gap_seconds: float = 1800
+    min_chars: int = 3
+    drop_patterns: List[str] = field(default_factory=lambda: list(DEFAULT_DROP_PATTERNS))
+    encoding_name: str = "cl100k_base"
+
+    def __post_init__(self) -> None:
+        self._compiled: List[Pattern] = [re.compile(p, re.IGNORECASE) for p in self.drop_patterns]
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "ChunkingConfig":
+        return cls(
+            max_tokens=settings.chunk_max_tokens,
+            overlap_messages=settings.chunk_overlap_messages,
+            max_gap_seconds=settings.chunk_max_gap_seconds,
+            min_chars=settings.chunk_min_chars,
+            drop_patterns=settings.chunk_drop_patterns if settings.chunk_drop_patterns is not None else list(DEFAULT_DROP_PATTERNS),
+        )
+
+    def is_low_information(self, text: str) -> bool:
+        stripped = text.strip()
+        if len(stripped) < self.min_chars:
+            return True
+        return any(p.match(stripped) for p in self._compiled)
+
+
+def drop_low_information(docs: Sequence[Document], config: ChunkingConfig) -> List[Document]:
+    return [d for d in docs if not config.is_low_information(d.page_content)]
+
+
+def _ts(doc: Document) -> float:
+    try:
+        return float(doc.metadata.get("ts") or 0)
+    except ValueError:
+        return 0.0
+
+
+def _make_chunk(channel: str, window: List[Document]) -> Document:
+    first, last = window[0].metadata, window[-1].metadata
+    users = list(dict.fromkeys(d.metadata.get("user", "") for d in window if d.metadata.get("user")))
+    offsets: List[int] = []
+    position = 0
+    for doc in window:
+        offsets.append(position)
+        position += len(doc.page_content) + 1
+    metadata = {
+        "channel": channel,
+        # Chunks are addressed by their first message, like single messages
+        "ts": first.get("ts", ""),
+        "datetime": first.get("datetime", ""),
+        "timestamp": first.get("timestamp"),
+        "timestamp_end": last.get("timestamp"),
+        "user": first.get("user", ""),
+        "users": users,
+        "thread_ts": first.get("thread_ts", ""),
+        "ts_start": first.get("ts", ""),
+        "ts_end": last.get("ts", ""),
+        "message_ts": [d.metadata.get("ts", "") for d in window],
+        "message_count": len(window),
+        # Per-message author and start offset in the text, so a chunk can be re-packed without its source
+        "message_users": [d.metadata.get("user", "") for d in window],
+        "message_offsets": offsets,
+    }
+    return Document(page_content="\n".join(d.page_content for d in window), metadata=metadata)
+
+
+def unpack_chunk(chunk: Document) -> Optional[List[Document]]:
+    """Split a stored chunk back into its single-message documents.
+
+    Returns ``None`` for points without per-message offsets (single messages,
+    or chunks written before the offsets were recorded).
+    """
+    meta = chunk.metadata
+    offsets = meta.get("message_offsets")
+    if offsets is None:
+        return None
+    text = chunk.page_content
+    # Each message but the last is followed by the joining newline
+    ends = [start - 1 for start in offsets[1:]] + [len(text)]
+    return [
+        Document(
+            page_content=text[start:end],
+            metadata=message_metadata(meta.get("channel", ""), ts, user, meta.get("thread_ts", "")),
+        )
+        for ts, user, start, end in zip(meta["message_ts"], meta["message_users"], offsets, ends)
+    ]
+
+
+def _pack(channel: str, docs: List[Document], token_counts: List[int], config: ChunkingConfig) -> List[Document]:
+    """Split one conversation (time ordered) into overlapping token-bounded windows."""
+    chunks: List[Document] = []
+    start = 0
+    while start < len(docs):
+        end = start + 1
+        tokens = token_counts[start]
+        while end < len(docs):
+            gap = _ts(docs[end]) - _ts(docs[end - 1])
+            if gap > config.max_gap_seconds or tokens + token_counts[end] > config.max_tokens:
+                break
+            tokens += token_counts[end]
+            end += 1
+        chunks.append(_make_chunk(channel, docs[start:end]))
+        if end >= len(docs):
+            break
+        # Overlap with the tail of this window unless the next window starts after a long gap
+        overlap = min(config.overlap_messages, end - start - 1)
+        if overlap and _ts(docs[end]) - _ts(docs[end - 1]) <= config.max_gap_seconds:
+            start = end - overlap
+        else:
+            start = end
+    return chunks
+
+
+def chunk_documents(channel: str, docs: Sequence[Document], config: Optional[ChunkingConfig] = None) -> List[Document]:
+    """Pack per-message documents into conversation chunks.
+
+    Messages are grouped by thread (top-level messages form one stream), then
+    consecutive messages are packed until the token budget is reached or the
+    time gap to the next message exceeds ``max_gap_seconds``. Windows overlap
+    by ``overlap_messages`` so context carries across chunk boundaries. Each
+    chunk records its message ts range and the ts of every message in it.
+    """
+    config = config or ChunkingConfig()
+    encoding = get_encoding(config.encoding_name)
+
+    conversations: Dict[str, List[Document]] = {}
+    for doc in docs:
+        conversations.setdefault(doc.metadata.get("thread_ts") or "", []).append(doc)
+
+    chunks: List[Document] = []
+    for thread_docs in conversations.values():
+        thread_docs.sort(key=_ts)
+        token_counts = [count_tokens(d.page_content, encoding) for d in thread_docs]
+        chunks.extend(_pack(channel, thread_docs, token_counts, config))
+    return chunks
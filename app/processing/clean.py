@@ -1,40 +1,86 @@
-import re
+import uuid
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from langchain_core.documents import Document
 
+from app.processing.normalize import DEFAULT_NORMALIZER, SlackNormalizer
+
+# Fixed namespace so a message always maps to the same Qdrant point ID
+_POINT_NAMESPACE = uuid.UUID("afda6635-42c9-450d-879d-e43d4c336eff")
+
+
+def point_id(channel_id: str, ts: str) -> str:
+    """Deterministic point ID for a Slack message."""
+    return str(uuid.uuid5(_POINT_NAMESPACE, f"{channel_id}:{ts}"))
+
 
 def _strip_slack_formatting(text: str) -> str:
-    # Remove user and channel mentions <@U123>, <#C123|name>, links <http://|text>
-    text = re.sub(r"<@[A-Z0-9]+>", "", text)
-    text = re.sub(r"<#([A-Z0-9]+)\|[^>]+>", r"#\1", text)
-    text = re.sub(r"<([^>|]+)\|[^>]+>", r"\1", text)
-    text = re.sub(r"<([^>]+)>", r"\1", text)
-    # Collapse multiple spaces and trim
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    # Mentions, channel refs and links in one pass; see app.processing.normalize
+    return DEFAULT_NORMALIZER.normalize(text)
 
 
-def messages_to_documents(channel: str, messages: List[Dict]) -> List[Document]:
-    docs: List[Document] = []
+def apply_message_events(messages: List[Dict]) -> Tuple[List[Dict], List[str]]:
+    """Resolve Slack edit/delete events into (messages to upsert, deleted ts values).
+
+    ``message_changed`` carries the edited message under ``message`` with the
+    original ts, so it replaces the stored point; ``message_deleted`` and
+    ``tombstone`` entries remove it.
+    """
+    upserts: List[Dict] = []
+    deleted: List[str] = []
     for m in messages:
-        text = m.get("text", "") or ""
-        cleaned = _strip_slack_formatting(text)
+        subtype = m.get("subtype")
+        if subtype == "message_changed":
+            edited: Optional[Dict] = m.get("message")
+            if edited and edited.get("ts"):
+                upserts.append(edited)
+        elif subtype == "message_deleted":
+            ts = m.get("deleted_ts") or (m.get("previous_message") or {}).get("ts")
+            if ts:
+                deleted.append(ts)
+        elif subtype == "tombstone":
+            if m.get("ts"):
+                deleted.append(m["ts"])
+        else:
+            upserts.append(m)
+    return upserts, deleted
+
+
+def message_metadata(channel: str, ts: str, user: str, thread_ts: str) -> Dict:
+    """Payload metadata of a single-message document."""
+    dt: str = ""
+    timestamp: Optional[float] = None
+    try:
+        timestamp = float(ts)
+        dt = datetime.fromtimestamp(timestamp).isoformat()
+    except Exception:
+        dt = ""
+    return {
+        "channel": channel,
+        "ts": ts,
+        "datetime": dt,
+        # Numeric copy of ts for range filters
+        "timestamp": timestamp,
+        "user": user,
+        "thread_ts": thread_ts,
+        "message_ts": [ts],
+    }
+
+
+def messages_to_documents(
+    channel: str,
+    messages: List[Dict],
+    normalizer: Optional[SlackNormalizer] = None,
+) -> List[Document]:
+    normalizer = normalizer or DEFAULT_NORMALIZER
+    texts = normalizer.normalize_many(messages)
+    docs: List[Document] = []
+    for m, cleaned in zip(messages, texts):
         if not cleaned:
             continue
         ts = m.get("ts") or m.get("thread_ts") or ""
-        dt: str = ""
-        try:
-            dt = datetime.fromtimestamp(float(ts)).isoformat()
-        except Exception:
-            dt = ""
         user = m.get("user") or m.get("username") or ""
-        metadata = {
-            "channel": channel,
-            "ts": ts,
-            "datetime": dt,
-            "user": user,
-        }
+        metadata = message_metadata(channel, ts, user, m.get("thread_ts") or "")
         docs.append(Document(page_content=cleaned, metadata=metadata))
     return docs
@@ -0,0 +1,121 @@
+import re
+from typing import Dict, Iterable, List, Mapping, Optional, Union
+
+# Every <...> construct and entity is matched by one precompiled alternation;
+# whitespace is collapsed with str.split, which is much cheaper than a regex
+# callback per run of spaces.
+_TOKEN_RE = re.compile(
+    r"<@(?P<uid>[UW][A-Z0-9]+)(?:\|(?P<uname>[^>]*))?>"
+    r"|<#(?P<cid>[CG][A-Z0-9]+)(?:\|(?P<cname>[^>]*))?>"
+    r"|<!(?P<special>[^>|]+)(?:\|(?P<slabel>[^>]*))?>"
+    r"|<(?P<link>[^>|]+)(?:\|[^>]*)?>"
+    r"|(?P<entity>&(?:amp|lt|gt);)"
+)
+
+# Fenced code keeps its whitespace; split() yields code at odd indexes
+_CODE_RE = re.compile(r"(```.*?```)", re.DOTALL)
+
+_ENTITIES = {"&amp;": "&", "&lt;": "<", "&gt;": ">"}
+
+# Block types whose text is not already mirrored in the message's ``text``
+_TEXT_BLOCK_TYPES = ("section", "header", "context")
+
+
+def _block_texts(blocks: Iterable[Mapping]) -> List[str]:
+    texts: List[str] = []
+    for block in blocks or ():
+        if block.get("type") not in _TEXT_BLOCK_TYPES:
+            continue
+        text = (block.get("text") or {}).get("text")
+        if text:
+            texts.append(text)
+        for item in block.get("fields") or block.get("elements") or ():
+            if isinstance(item, Mapping) and item.get("text"):
+                texts.append(item["text"])
+    return texts
+
+
+def _attachment_texts(attachments: Iterable[Mapping]) -> List[str]:
+    texts: List[str] = []
+    for att in attachments or ():
+        for key in ("pretext", "title", "text"):
+            if att.get(key):
+                texts.append(att[key])
+        for fld in att.get("fields") or ():
+            texts.extend(v for v in (fld.get("title"), fld.get("value")) if v)
+        if not any(att.get(k) for k in ("pretext", "title", "text")) and att.get("fallback"):
+            texts.append(att["fallback"])
+    return texts
+
+
+def message_text(message: Mapping) -> str:
+    """Raw text of a message including block and attachment text."""
+    text = message.get("text") or ""
+    parts = [text] if text else []
+    for extra in _block_texts(message.get("blocks")) + _attachment_texts(message.get("attachments")):
+        if extra not in parts and extra not in text:
+            parts.append(extra)
+    return "\n".join(parts)
+
+
+class SlackNormalizer:
+    """Precompiled Slack mrkdwn normalizer with mention resolution.
+
+    User and channel mentions resolve through the given ID -> name tables;
+    unresolved user mentions are dropped and unresolved channels keep their
+    ID. Fenced code blocks keep their whitespace; everything else collapses
+    to single spaces. Texts without ``<`` or ``&`` skip the regex entirely.
+    """
+
+    def __init__(
+        self,
+        users: Optional[Mapping[str, str]] = None,
+        channels: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        self.users: Mapping[str, str] = users or {}
+        self.channels: Mapping[str, str] = channels or {}
+
+    def _replace(self, match: "re.Match") -> str:
+        kind = match.lastgroup
+        if kind == "link":
+            return match.group("link")
+        if kind == "entity":
+            return _ENTITIES[match.group("entity")]
+        uid = match.group("uid")
+        if uid:
+            name = self.users.get(uid) or match.group("uname")
+            return f"@{name}" if name else ""
+        cid = match.group("cid")
+        if cid:
+            return f"#{self.channels.get(cid) or match.group('cname') or cid}"
+        label = match.group("slabel")
+        if label:
+            return label
+        special = match.group("special")
+        return f"@{special}" if special in ("here", "channel", "everyone") else ""
+
+    def _normalize_plain(self, text: str) -> str:
+        if "<" in text or "&" in text:
+            text = _TOKEN_RE.sub(self._replace, text)
+        return " ".join(text.split())
+
+    def normalize(self, text: str) -> str:
+        if not text:
+            return ""
+        if "```" not in text:
+            return self._normalize_plain(text)
+        parts = _CODE_RE.split(text)
+        pieces = [part if i % 2 else self._normalize_plain(part) for i, part in enumerate(parts)]
+        return " ".join(p for p in pieces if p).strip()
+
+    def normalize_message(self, message: Mapping) -> str:
+        return self.normalize(message_text(message))
+
+    def normalize_many(self, items: Iterable[Union[str, Mapping]]) -> List[str]:
+        """Normalize a batch of raw texts or message dicts."""
+        normalize, normalize_message = self.normalize, self.normalize_message
+        return [normalize(item) if isinstance(item, str) else normalize_message(item) for item in items]
+
+
+# Lookup-free instance for callers without a user/channel directory
+DEFAULT_NORMALIZER = SlackNormalizer()
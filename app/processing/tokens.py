@@ -0,0 +1,40 @@
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import tiktoken
+from tiktoken.model import encoding_name_for_model
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# Encodings used instead of tiktoken's downloadable ones, e.g. for offline runs
+_REGISTERED: Dict[str, tiktoken.Encoding] = {}
+
+
+def register_encoding(encoding: tiktoken.Encoding, name: Optional[str] = None) -> None:
+    """Serve ``encoding`` wherever ``name`` (default: its own name) is requested."""
+    _REGISTERED[name or encoding.name] = encoding
+    get_encoding.cache_clear()
+    encoding_for_model.cache_clear()
+
+
+@lru_cache(maxsize=8)
+def get_encoding(name: str = DEFAULT_ENCODING) -> tiktoken.Encoding:
+    return _REGISTERED.get(name) or tiktoken.get_encoding(name)
+
+
+@lru_cache(maxsize=8)
+def encoding_for_model(model: str) -> tiktoken.Encoding:
+    try:
+        name = encoding_name_for_model(model)
+    except KeyError:
+        name = DEFAULT_ENCODING
+    return get_encoding(name)
+
+
+def encode(text: str, encoding: tiktoken.Encoding) -> List[int]:
+    # Slack text is data: "<|endoftext|>" and friends are counted as plain text, not rejected
+    return encoding.encode(text, disallowed_special=())
+
+
+def count_tokens(text: str, encoding: tiktoken.Encoding) -> int:
+    return len(encode(text, encoding))
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from app.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Stay well below SQLite's bound-parameter limit
+_SQL_BATCH = 500
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class EmbeddingCacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class SQLiteEmbeddingStore:
+    """On-disk vector store keyed by (model, text hash)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        # Import workers write to the same file; wait for their locks instead of failing
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, key TEXT NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, key)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for i in range(0, len(keys), _SQL_BATCH):
+                chunk = keys[i:i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                    (model, *chunk),
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, model: str, items: Iterable[Tuple[str, List[float]]]) -> None:
+        rows = [(model, key, array("f", vector).tobytes()) for key, vector in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (model, key, vector) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper with an in-memory LRU tier over a persistent store.
+
+    Identical texts (after cleaning) are embedded once per model, across
+    ingests, full refreshes and repeated questions.
+    """
+
+    def __init__(
+        self,
+        inner: Embeddings,
+        model: str,
+        store: Optional[SQLiteEmbeddingStore] = None,
+        memory_size: int = 10000,
+    ) -> None:
+        self.inner = inner
+        self.model = model
+        self.store = store
+        self.memory_size = memory_size
+        self.stats = EmbeddingCacheStats()
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, texts: Sequence[str]) -> Tuple[List[str], Dict[str, List[float]], List[str]]:
+        """Return (keys, cached vectors by key, texts still to embed without duplicates)."""
+        keys = [text_key(t) for t in texts]
+        cached: Dict[str, List[float]] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    cached[key] = vector
+                    self.stats.memory_hits += 1
+                    CACHE_LOOKUPS.inc(cache="embedding", result="memory_hit")
+
+        remaining = list(dict.fromkeys(k for k in keys if k not in cached))
+        if remaining and self.store is not None:
+            from_disk = self.store.get_many(self.model, remaining)
+            for key, vector in from_disk.items():
+                cached[key] = vector
+                self._remember(key, vector)
+            disk_hits = sum(1 for k in keys if k in from_disk)
+            self.stats.disk_hits += disk_hits
+            if disk_hits:
+                CACHE_LOOKUPS.inc(disk_hits, cache="embedding", result="disk_hit")
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        self.stats.misses += len(missing)
+        if missing:
+            CACHE_LOOKUPS.inc(len(missing), cache="embedding", result="miss")
+        return keys, cached, list(missing.values())
+
+    def _store(self, texts: Sequence[str], vectors: Sequence[List[float]], cached: Dict[str, List[float]]) -> None:
+        items = []
+        for text, vector in zip(texts, vectors):
+            key = text_key(text)
+            cached[key] = vector
+            self._remember(key, vector)
+            items.append((key, vector))
+        if self.store is not None:
+            self.store.put_many(self.model, items)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = self._lookup(texts)
+        if missing:
+            self._store(missing, self.inner.embed_documents(missing), cached)
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, cached, missing = self._lookup([text])
+        if missing:
+            self._store(missing, [self.inner.embed_query(text)], cached)
+        return cached[keys[0]]
+
+    async def _alookup(self, texts: Sequence[str]) -> Tuple[List[str], Dict[str, List[float]], List[str]]:
+        if self.store is None:
+            return self._lookup(texts)
+        # SQLite reads and writes stay off the event loop
+        return await asyncio.to_thread(self._lookup, texts)
+
+    async def _astore(self, texts: Sequence[str], vectors: Sequence[List[float]], cached: Dict[str, List[float]]) -> None:
+        if self.store is None:
+            self._store(texts, vectors, cached)
+        else:
+            await asyncio.to_thread(self._store, texts, vectors, cached)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = await self._alookup(texts)
+        if missing:
+            await self._astore(missing, await self.inner.aembed_documents(missing), cached)
+        return [cached[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, cached, missing = await self._alookup([text])
+        if missing:
+            await self._astore(missing, [await self.inner.aembed_query(text)], cached)
+        return cached[keys[0]]
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+
+from app.config import Settings
+from app.metrics import EMBEDDING_RATE_LIMIT_WAIT_SECONDS, EMBEDDING_RETRIES
+from app.processing.tokens import count_tokens, get_encoding
+from app.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Client errors a retry cannot fix (bad key, no access, unknown model)
+_FATAL_STATUS = {401, 403, 404}
+
+_MIN_BACKOFF_SECONDS = 0.5
+_MAX_BACKOFF_SECONDS = 60.0
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_rate_limit(error: BaseException) -> bool:
+    return _status_code(error) == 429 or "RateLimit" in type(error).__name__
+
+
+class EmbeddingExecutor(Embeddings):
+    """Embeds large text lists as concurrent, token-bounded batches.
+
+    Texts are packed into batches of at most ``max_batch_size`` texts and
+    ``max_batch_tokens`` tokens; up to ``concurrency`` batches are in flight,
+    each reserving one request and its tokens from per-minute buckets shared
+    by every caller. A rate-limited batch waits out ``Retry-After`` (pausing
+    the shared buckets) and is resent; any other failure halves the token
+    bound used for the following batches and retries, splitting the batch if
+    it is now over the bound. The bound grows back after successes. Output
+    order always matches input order.
+    """
+
+    def __init__(
+        self,
+        inner: Embeddings,
+        max_batch_size: int = 64,
+        max_batch_tokens: int = 60_000,
+        concurrency: int = 4,
+        requests_per_minute: float = 3000,
+        tokens_per_minute: float = 1_000_000,
+        max_retries: int = 5,
+        encoding_name: str = "cl100k_base",
+    ) -> None:
+        self.inner = inner
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_batch_tokens = max(1, max_batch_tokens)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.encoding_name = encoding_name
+        self.requests = TokenBucket(requests_per_minute, capacity=max(1.0, requests_per_minute / 60))
+        self.tokens = TokenBucket(tokens_per_minute, capacity=max(1.0, tokens_per_minute / 60))
+        self._lock = threading.Lock()
+        # Adaptive token bound for new batches, between one text and max_batch_tokens
+        self._batch_tokens = self.max_batch_tokens
+
+    @classmethod
+    def from_settings(cls, inner: Embeddings, settings: Settings) -> "EmbeddingExecutor":
+        return cls(
+            inner,
+            max_batch_size=settings.embedding_batch_size,
+            max_batch_tokens=settings.embedding_batch_max_tokens,
+            concurrency=settings.embedding_batch_concurrency,
+            requests_per_minute=settings.embedding_requests_per_minute,
+            tokens_per_minute=settings.embedding_tokens_per_minute,
+            max_retries=settings.embedding_max_retries,
+        )
+
+    @property
+    def batch_tokens(self) -> int:
+        return self._batch_tokens
+
+    def _count_tokens(self, texts: Sequence[str]) -> List[int]:
+        encoding = get_encoding(self.encoding_name)
+        return [max(1, count_tokens(t, encoding)) for t in texts]
+
+    def _take_batch(self, pending: Deque[int], counts: Sequence[int]) -> List[int]:
+        """Pop the next batch of indexes off ``pending`` under the current bounds."""
+        limit = self._batch_tokens
+        batch: List[int] = []
+        used = 0
+        while pending and len(batch) < self.max_batch_size:
+            cost = counts[pending[0]]
+            if batch and used + cost > limit:
+                break
+            batch.append(pending.popleft())
+            used += cost
+        return batch
+
+    def _on_success(self) -> None:
+        with self._lock:
+            if self._batch_tokens < self.max_batch_tokens:
+                self._batch_tokens = min(self.max_batch_tokens, int(self._batch_tokens * 1.25) + 1)
+
+    def _on_failure(self, error: BaseException, attempt: int) -> float:
+        """Seconds to wait before retrying; raises when the error is fatal or retries are spent."""
+        status = _status_code(error)
+        if status in _FATAL_STATUS or attempt > self.max_retries:
+            raise error
+        delay = min(_MAX_BACKOFF_SECONDS, _MIN_BACKOFF_SECONDS * 2 ** (attempt - 1)) * (0.5 + random.random())
+        if _is_rate_limit(error):
+            delay = _retry_after(error) or delay
+            # Hold back every batch, not only this one
+            self.requests.pause(delay)
+            self.tokens.pause(delay)
+            EMBEDDING_RETRIES.inc(reason="rate_limited")
+        else:
+            with self._lock:
+                self._batch_tokens = max(1, self._batch_tokens // 2)
+            EMBEDDING_RETRIES.inc(reason="error")
+        logger.warning(f"Embedding batch failed (attempt {attempt}/{self.max_retries}, retrying in {delay:.1f}s): {error}")
+        return delay
+
+    def _acquire(self, tokens: int) -> None:
+        waited = self.requests.acquire() + self.tokens.acquire(tokens)
+        if waited:
+            EMBEDDING_RATE_LIMIT_WAIT_SECONDS.inc(waited)
+
+    async def _aacquire(self, tokens: int) -> None:
+        waited = await self.requests.acquire_async() + await self.tokens.acquire_async(tokens)
+        if waited:
+            EMBEDDING_RATE_LIMIT_WAIT_SECONDS.inc(waited)
+
+    def _needs_split(self, error: BaseException, tokens: int, size: int) -> bool:
+        return size > 1 and not _is_rate_limit(error) and tokens > self._batch_tokens
+
+    def _embed_batch(self, texts: List[str], counts: List[int], query: bool = False) -> List[List[float]]:
+        attempt = 0
+        while True:
+            tokens = sum(counts)
+            self._acquire(tokens)
+            try:
+                vectors = [self.inner.embed_query(texts[0])] if query else self.inner.embed_documents(texts)
+            except Exception as e:
+                attempt += 1
+                delay = self._on_failure(e, attempt)
+                if self._needs_split(e, tokens, len(texts)):
+                    mid = len(texts) // 2
+                    return self._embed_batch(texts[:mid], counts[:mid]) + self._embed_batch(texts[mid:], counts[mid:])
+                time.sleep(delay)
+                continue
+            self._on_success()
+            return vectors
+
+    async def _aembed_batch(self, texts: List[str], counts: List[int], query: bool = False) -> List[List[float]]:
+        attempt = 0
+        while True:
+            tokens = sum(counts)
+            await self._aacquire(tokens)
+            try:
+                vectors = [await self.inner.aembed_query(texts[0])] if query else await self.inner.aembed_documents(texts)
+            except Exception as e:
+                attempt += 1
+                delay = self._on_failure(e, attempt)
+                if self._needs_split(e, tokens, len(texts)):
+                    mid = len(texts) // 2
+                    first = await self._aembed_batch(texts[:mid], counts[:mid])
+                    return first + await self._aembed_batch(texts[mid:], counts[mid:])
+                await asyncio.sleep(delay)
+                continue
+            self._on_success()
+            return vectors
+
+    def _worker(
+        self,
+        texts: Sequence[str],
+        counts: Sequence[int],
+        pending: Deque[int],
+        results: List[Optional[List[float]]],
+        embed: Callable[[List[str], List[int]], List[List[float]]],
+    ) -> None:
+        while True:
+            with self._lock:
+                batch = self._take_batch(pending, counts)
+            if not batch:
+                return
+            try:
+                vectors = embed([texts[i] for i in batch], [counts[i] for i in batch])
+            except Exception:
+                # Stop the other workers from starting new batches
+                with self._lock:
+                    pending.clear()
+                raise
+            for i, vector in zip(batch, vectors):
+                results[i] = vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        counts = self._count_tokens(texts)
+        pending: Deque[int] = deque(range(len(texts)))
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        workers = min(self.concurrency, -(-len(texts) // self.max_batch_size))
+        if workers == 1:
+            self._worker(texts, counts, pending, results, self._embed_batch)
+            return results
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as pool:
+            futures = [
+                pool.submit(self._worker, texts, counts, pending, results, self._embed_batch)
+                for _ in range(workers)
+            ]
+            for future in futures:
+                future.result()
+        return results
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        counts = self._count_tokens(texts)
+        pending: Deque[int] = deque(range(len(texts)))
+        results: List[Optional[List[float]]] = [None] * len(texts)
+
+        async def worker() -> None:
+            # Single-threaded loop: no lock needed around the shared queue
+            while pending:
+                batch = self._take_batch(pending, counts)
+                try:
+                    vectors = await self._aembed_batch([texts[i] for i in batch], [counts[i] for i in batch])
+                except Exception:
+                    pending.clear()
+                    raise
+                for i, vector in zip(batch, vectors):
+                    results[i] = vector
+
+        workers = min(self.concurrency, -(-len(texts) // self.max_batch_size))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text], self._count_tokens([text]), query=True)[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self._aembed_batch([text], self._count_tokens([text]), query=True))[0]
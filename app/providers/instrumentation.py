@@ -0,0 +1,67 @@
+import time
+from typing import Any, Dict, List
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langchain_core.outputs import LLMResult
+
+from app.metrics import EMBEDDING_SECONDS, EMBEDDING_TEXTS, LLM_SECONDS, LLM_TOKENS, observe
+
+
+class InstrumentedEmbeddings(Embeddings):
+    """Embeddings wrapper recording provider call latency and volume.
+
+    Sits under the embedding cache, so only texts actually sent to the
+    provider are counted.
+    """
+
+    def __init__(self, inner: Embeddings) -> None:
+        self.inner = inner
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        EMBEDDING_TEXTS.inc(len(texts), kind="documents")
+        with observe(EMBEDDING_SECONDS, kind="documents"):
+            return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        EMBEDDING_TEXTS.inc(kind="query")
+        with observe(EMBEDDING_SECONDS, kind="query"):
+            return self.inner.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        EMBEDDING_TEXTS.inc(len(texts), kind="documents")
+        with observe(EMBEDDING_SECONDS, kind="documents"):
+            return await self.inner.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        EMBEDDING_TEXTS.inc(kind="query")
+        with observe(EMBEDDING_SECONDS, kind="query"):
+            return await self.inner.aembed_query(text)
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Records chat model latency and reported token usage, for invoke and stream alike."""
+
+    # Called on the caller's thread or loop; nothing here blocks
+    run_inline = True
+
+    def __init__(self) -> None:
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        start = self._started.pop(run_id, None)
+        if start is not None:
+            LLM_SECONDS.observe(time.perf_counter() - start)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    LLM_TOKENS.inc(int(usage.get("input_tokens") or 0), type="prompt")
+                    LLM_TOKENS.inc(int(usage.get("output_tokens") or 0), type="completion")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started.pop(run_id, None)
@@ -9,4 +9,6 @@ class OpenAIEmbeddingsProvider(EmbeddingsProvider):
         return OpenAIEmbeddings(
             model=settings.embedding_model,
             api_key=settings.openai_api_key,
+            # One API request per executor batch
+            chunk_size=max(settings.embedding_batch_size, 1),
         )
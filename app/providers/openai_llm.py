@@ -9,4 +9,6 @@ class OpenAIChatProvider(LLMProvider):
         return ChatOpenAI(
             model=settings.llm_model,
             api_key=settings.openai_api_key,
+            # Report token usage on the final chunk of streamed completions
+            stream_usage=True,
         )
\ No newline at end of file
@@ -6,6 +6,9 @@ from langchain_core.language_models.chat_models import BaseChatModel
 
 from app.config import Settings
 from app.providers.base import EmbeddingsProvider, LLMProvider
+from app.providers.embedding_cache import CachedEmbeddings, SQLiteEmbeddingStore
+from app.providers.embedding_executor import EmbeddingExecutor
+from app.providers.instrumentation import InstrumentedEmbeddings, LLMMetricsCallback
 from app.providers.openai_embeddings import OpenAIEmbeddingsProvider
 from app.providers.openai_llm import OpenAIChatProvider
 
@@ -21,13 +24,34 @@ LLM_PROVIDERS: Dict[str, LLMProvider] = {
 }
 
 
+def register_embeddings_provider(name: str, provider: EmbeddingsProvider) -> None:
+    """Make an embeddings provider selectable through EMBEDDING_PROVIDER."""
+    EMBEDDING_PROVIDERS[name.lower()] = provider
+
+
+def register_llm_provider(name: str, provider: LLMProvider) -> None:
+    """Make a chat model provider selectable through LLM_PROVIDER."""
+    LLM_PROVIDERS[name.lower()] = provider
+
+
 def get_embeddings(settings: Settings) -> Embeddings:
     provider_name = settings.embedding_provider.lower()
     logger.info(f"Creating embeddings provider: {provider_name}, model: {settings.embedding_model}")
     if provider_name not in EMBEDDING_PROVIDERS:
         logger.error(f"Unknown embedding provider: {provider_name}")
         raise ValueError(f"Unknown embedding provider: {provider_name}")
-    embeddings = EMBEDDING_PROVIDERS[provider_name].create(settings)
+    embeddings = InstrumentedEmbeddings(EMBEDDING_PROVIDERS[provider_name].create(settings))
+    if settings.embedding_executor_enabled:
+        # Under the cache: only texts that miss it are batched and rate limited
+        embeddings = EmbeddingExecutor.from_settings(embeddings, settings)
+    if settings.embedding_cache_enabled:
+        logger.info(f"Enabling embedding cache at {settings.embedding_cache_path}")
+        embeddings = CachedEmbeddings(
+            embeddings,
+            model=f"{provider_name}:{settings.embedding_model}",
+            store=SQLiteEmbeddingStore(settings.embedding_cache_path),
+            memory_size=settings.embedding_cache_memory_size,
+        )
     logger.info(f"Successfully created embeddings provider: {provider_name}")
     return embeddings
 
@@ -39,5 +63,6 @@ def get_llm(settings: Settings) -> BaseChatModel:
         logger.error(f"Unknown LLM provider: {provider_name}")
         raise ValueError(f"Unknown LLM provider: {provider_name}")
     llm = LLM_PROVIDERS[provider_name].create(settings)
+    llm.callbacks = [*(llm.callbacks or []), LLMMetricsCallback()]
     logger.info(f"Successfully created LLM provider: {provider_name}")
     return llm
@@ -0,0 +1,336 @@
+import asyncio
+import inspect
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from app.config import Settings, get_settings
+from app.ingestion.channel_index import ChannelIndex
+from app.ingestion.slack_client import (
+    AsyncSlackIngestionClient,
+    SlackIngestionClient,
+    SlackRateLimiter,
+    get_channel_index,
+    get_user_directory,
+)
+from app.pipelines.answer_cache import AnswerCache
+from app.providers.registry import get_embeddings, get_llm
+from app.storage.metadata import IngestionMetadata
+from app.vectorstore.collection_registry import CollectionRegistry
+from app.vectorstore.lexical_index import LexicalIndex
+from app.vectorstore.qdrant_store import AsyncQdrantStore, QdrantStore, qdrant_client_kwargs
+
+if TYPE_CHECKING:
+    from app.pipelines.retrieval import CrossEncoderReranker
+
+logger = logging.getLogger(__name__)
+
+
+def _qdrant_key(settings: Settings) -> Tuple:
+    return (settings.qdrant_url, settings.qdrant_port, settings.qdrant_path)
+
+
+def _embeddings_key(settings: Settings) -> Tuple:
+    return (settings.embedding_provider.lower(), settings.embedding_model)
+
+
+def _llm_key(settings: Settings) -> Tuple:
+    return (settings.llm_provider.lower(), settings.llm_model, settings.openai_temperature)
+
+
+# Resource kinds holding async clients; closed from ResourcePool.aclose
+_ASYNC_KINDS = ("async_qdrant_client", "async_slack_client")
+
+
+def _close_quietly(name: str, resource: Any) -> None:
+    """Best effort close of a pooled resource and any HTTP client it owns."""
+    targets = [resource]
+    for attr in ("root_client", "client"):
+        inner = getattr(resource, attr, None)
+        if inner is not None and inner is not resource:
+            targets.append(inner)
+    for target in targets:
+        close = getattr(target, "close", None)
+        if not callable(close):
+            continue
+        try:
+            close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled resource '{name}': {e}")
+
+
+class ResourcePool:
+    """Application-scoped cache of clients, providers and compiled chains.
+
+    Resources are created lazily on first use and reused for the lifetime of
+    the process, keyed by the settings that configure them (and by collection
+    for per-channel objects).
+    """
+
+    def __init__(self, settings: Optional[Settings] = None) -> None:
+        self.settings = settings or get_settings()
+        self._lock = threading.RLock()
+        self._resources: Dict[Tuple[str, Hashable], Any] = {}
+        self._closed = False
+
+    def get_or_create(self, kind: str, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached resource for (kind, key), building it once if missing."""
+        cache_key = (kind, key)
+        resource = self._resources.get(cache_key)
+        if resource is not None:
+            return resource
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Resource pool is closed")
+            resource = self._resources.get(cache_key)
+            if resource is None:
+                logger.info(f"Creating pooled resource '{kind}' for key {key}")
+                resource = factory()
+                self._resources[cache_key] = resource
+        return resource
+
+    def qdrant_client(self) -> QdrantClient:
+        settings = self.settings
+        return self.get_or_create(
+            "qdrant_client",
+            _qdrant_key(settings),
+            lambda: QdrantClient(**qdrant_client_kwargs(settings)),
+        )
+
+    def embeddings(self) -> Embeddings:
+        return self.get_or_create("embeddings", _embeddings_key(self.settings), lambda: get_embeddings(self.settings))
+
+    def llm(self) -> BaseChatModel:
+        return self.get_or_create("llm", _llm_key(self.settings), lambda: get_llm(self.settings))
+
+    def async_qdrant_client(self) -> AsyncQdrantClient:
+        settings = self.settings
+        return self.get_or_create(
+            "async_qdrant_client",
+            _qdrant_key(settings),
+            lambda: AsyncQdrantClient(**qdrant_client_kwargs(settings)),
+        )
+
+    def channel_index(self) -> ChannelIndex:
+        return self.get_or_create(
+            "channel_index",
+            self.settings.channel_index_path,
+            lambda: get_channel_index(self.settings),
+        )
+
+    def metadata(self) -> IngestionMetadata:
+        """Shared SQLite metadata store; its connection is safe to use across threads."""
+        return self.get_or_create(
+            "metadata",
+            self.settings.metadata_db_path,
+            lambda: IngestionMetadata(self.settings.metadata_db_path, self.settings.metadata_legacy_json_path),
+        )
+
+    def answer_cache(self) -> AnswerCache:
+        settings = self.settings
+        return self.get_or_create(
+            "answer_cache",
+            (settings.answer_cache_size, settings.answer_cache_ttl_seconds, settings.answer_cache_similarity_threshold),
+            lambda: AnswerCache.from_settings(settings),
+        )
+
+    def slack_rate_limiter(self) -> SlackRateLimiter:
+        """Per-method buckets shared by the sync and async Slack clients."""
+        return self.get_or_create(
+            "slack_rate_limiter",
+            self.settings.slack_bot_token,
+            lambda: SlackRateLimiter(self.settings.slack_rate_limits),
+        )
+
+    def slack_client(self) -> SlackIngestionClient:
+        return self.get_or_create(
+            "slack_client",
+            self.settings.slack_bot_token,
+            lambda: SlackIngestionClient(
+                self.settings,
+                channel_index=self.channel_index(),
+                rate_limiter=self.slack_rate_limiter(),
+                user_directory=get_user_directory(self.settings),
+            ),
+        )
+
+    def async_slack_client(self) -> AsyncSlackIngestionClient:
+        return self.get_or_create(
+            "async_slack_client",
+            self.settings.slack_bot_token,
+            lambda: AsyncSlackIngestionClient(
+                self.settings,
+                channel_index=self.channel_index(),
+                rate_limiter=self.slack_rate_limiter(),
+            ),
+        )
+
+    def collection_registry(self) -> CollectionRegistry:
+        return self.get_or_create("collection_registry", _qdrant_key(self.settings), CollectionRegistry)
+
+    def store(self) -> QdrantStore:
+        key = _qdrant_key(self.settings) + _embeddings_key(self.settings)
+        return self.get_or_create(
+            "store",
+            key,
+            lambda: QdrantStore(
+                self.settings,
+                self.embeddings(),
+                client=self.qdrant_client(),
+                registry=self.collection_registry(),
+                lexical=self.lexical_index(),
+            ),
+        )
+
+    def lexical_index(self) -> Optional[LexicalIndex]:
+        if not self.settings.hybrid_index_enabled:
+            return None
+        path = self.settings.hybrid_index_path
+        return self.get_or_create("lexical_index", path, lambda: LexicalIndex(path))
+
+    def reranker(self) -> "CrossEncoderReranker":
+        # Imported lazily: loading the cross-encoder is only paid on first use
+        from app.pipelines.retrieval import CrossEncoderReranker
+
+        model = self.settings.rerank_model
+        return self.get_or_create("reranker", model, lambda: CrossEncoderReranker(model))
+
+    def async_store(self) -> AsyncQdrantStore:
+        return self.get_or_create(
+            "async_store",
+            _qdrant_key(self.settings),
+            lambda: AsyncQdrantStore(
+                self.settings,
+                client=self.async_qdrant_client(),
+                registry=self.collection_registry(),
+            ),
+        )
+
+    def semaphore(self, name: str) -> asyncio.Semaphore:
+        """Per-dependency limit for in-flight async calls, sized from settings."""
+        limit = getattr(self.settings, f"{name}_max_concurrency")
+        return self.get_or_create("semaphore", name, lambda: asyncio.Semaphore(limit))
+
+    def vectorstore(self, collection_name: str, create: bool = False):
+        """Return the pooled vectorstore; reads require the collection, writes create it."""
+        store = self.store()
+        if create:
+            store.ensure_collection(collection_name)
+        else:
+            store.require_collection(collection_name)
+        key = _qdrant_key(self.settings) + _embeddings_key(self.settings) + (collection_name,)
+        return self.get_or_create("vectorstore", key, lambda: store.as_vectorstore(collection_name, create=create))
+
+    def chain(self, collection_name: str, factory: Callable[[BaseChatModel], Any]) -> Any:
+        """Return the compiled chain for a collection, built from the pooled LLM."""
+        key = _llm_key(self.settings) + (collection_name, getattr(factory, "__qualname__", repr(factory)))
+        return self.get_or_create("chain", key, lambda: factory(self.llm()))
+
+    def warm_up(self) -> None:
+        """Eagerly create the shared clients so the first request skips setup."""
+        logger.info("Warming up resource pool")
+        try:
+            self.qdrant_client()
+            self.embeddings()
+            self.llm()
+        except Exception as e:
+            logger.warning(f"Resource pool warm-up incomplete: {e}")
+
+    def health(self) -> Dict[str, str]:
+        """Check pooled dependencies; only touches resources that already exist."""
+        status: Dict[str, str] = {}
+        client = self._resources.get(("qdrant_client", _qdrant_key(self.settings)))
+        if client is None:
+            status["qdrant"] = "not_initialized"
+        else:
+            try:
+                client.get_collections()
+                status["qdrant"] = "ok"
+            except Exception as e:
+                logger.error(f"Qdrant health check failed: {e}")
+                status["qdrant"] = f"error: {e}"
+        for kind in ("embeddings", "llm"):
+            initialized = any(k == kind for k, _ in self._resources)
+            status[kind] = "ok" if initialized else "not_initialized"
+        return status
+
+    def embedding_cache_stats(self) -> Optional[Dict[str, int]]:
+        """Hit/miss counters of the pooled embeddings cache, if one is in use."""
+        embeddings = self._resources.get(("embeddings", _embeddings_key(self.settings)))
+        stats = getattr(embeddings, "stats", None)
+        return stats.to_dict() if stats is not None else None
+
+    def answer_cache_stats(self) -> Optional[Dict[str, int]]:
+        settings = self.settings
+        key = (settings.answer_cache_size, settings.answer_cache_ttl_seconds, settings.answer_cache_similarity_threshold)
+        cache = self._resources.get(("answer_cache", key))
+        return dict(cache.stats.to_dict(), entries=len(cache)) if cache is not None else None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            resources, self._resources = self._resources, {}
+        logger.info(f"Closing resource pool ({len(resources)} resources)")
+        for (kind, _), resource in resources.items():
+            if kind in ("qdrant_client", "embeddings", "llm", "metadata", "lexical_index"):
+                _close_quietly(kind, resource)
+
+    async def aclose(self) -> None:
+        """Close async clients on the running loop, then everything else."""
+        with self._lock:
+            pending = [
+                (kind, resource)
+                for (kind, _), resource in self._resources.items()
+                if kind in _ASYNC_KINDS or kind in ("embeddings", "llm")
+            ]
+        for kind, resource in pending:
+            target = resource if kind in _ASYNC_KINDS else getattr(resource, "root_async_client", None)
+            close = getattr(target, "close", None)
+            if not callable(close):
+                continue
+            try:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"Error closing pooled resource '{kind}': {e}")
+        self.close()
+
+
+_pool: Optional[ResourcePool] = None
+_pool_lock = threading.Lock()
+
+
+def init_pool(settings: Optional[Settings] = None) -> ResourcePool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ResourcePool(settings)
+        return _pool
+
+
+def get_pool() -> ResourcePool:
+    """Return the process-wide pool, creating it on demand outside FastAPI."""
+    return _pool if _pool is not None else init_pool()
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+async def aclose_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        await pool.aclose()
@@ -1,64 +1,298 @@
 import json
 import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterator, List, Optional
 
 logger = logging.getLogger(__name__)
 
 
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    channel TEXT PRIMARY KEY,
+    last_timestamp TEXT,
+    total_messages INTEGER NOT NULL DEFAULT 0,
+    last_updated TEXT,
+    has_pending INTEGER NOT NULL DEFAULT 0,
+    pending_floor TEXT,
+    pending_high TEXT,
+    pending_low TEXT,
+    generation INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS threads (
+    channel TEXT NOT NULL,
+    thread_ts TEXT NOT NULL,
+    latest_reply TEXT NOT NULL,
+    PRIMARY KEY (channel, thread_ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    channel TEXT NOT NULL,
+    force_full_refresh INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    duration_seconds REAL,
+    messages INTEGER NOT NULL DEFAULT 0,
+    embeddings INTEGER NOT NULL DEFAULT 0,
+    upserted INTEGER NOT NULL DEFAULT 0,
+    documents INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_by_channel ON jobs (channel, finished_at);
+"""
+
+
 class IngestionMetadata:
-    """Tracks ingestion metadata like last processed timestamp per channel."""
-    
-    def __init__(self, metadata_file: str = "ingestion_metadata.json"):
-        self.metadata_file = Path(metadata_file)
-        self.data: Dict[str, Dict] = self._load_metadata()
-    
-    def _load_metadata(self) -> Dict[str, Dict]:
-        """Load metadata from file."""
-        if not self.metadata_file.exists():
-            logger.info(f"Metadata file {self.metadata_file} doesn't exist, starting fresh")
-            return {}
-        
+    """Tracks ingestion state per channel in SQLite (WAL mode).
+
+    Each update touches only its channel's rows inside a transaction, so
+    concurrent ingests of different channels (threads or processes) do not
+    overwrite each other and a crash never leaves a half-written file.
+    """
+
+    def __init__(self, db_path: str = "ingestion_metadata.db", legacy_json_path: Optional[str] = "ingestion_metadata.json"):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(channels)")}
+        if "generation" not in columns:
+            self._conn.execute("ALTER TABLE channels ADD COLUMN generation INTEGER NOT NULL DEFAULT 0")
+        self._conn.commit()
+        if legacy_json_path:
+            self._import_legacy_json(Path(legacy_json_path))
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            with self._conn:
+                yield self._conn
+
+    def _import_legacy_json(self, path: Path) -> None:
+        """One-time migration from the old ingestion_metadata.json file."""
+        if not path.exists():
+            return
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM channels LIMIT 1").fetchone():
+                return
         try:
-            with open(self.metadata_file, 'r') as f:
+            with open(path, "r") as f:
                 data = json.load(f)
-                logger.info(f"Loaded metadata for {len(data)} channels")
-                return data
         except Exception as e:
-            logger.error(f"Error loading metadata file: {e}")
-            return {}
-    
-    def _save_metadata(self) -> None:
-        """Save metadata to file."""
-        try:
-            with open(self.metadata_file, 'w') as f:
-                json.dump(self.data, f, indent=2)
-                logger.debug(f"Saved metadata to {self.metadata_file}")
-        except Exception as e:
-            logger.error(f"Error saving metadata file: {e}")
-    
+            logger.error(f"Error reading legacy metadata file {path}: {e}")
+            return
+        with self._transaction() as conn:
+            for channel, state in data.items():
+                conn.execute(
+                    "INSERT OR IGNORE INTO channels (channel, last_timestamp, total_messages, last_updated) VALUES (?, ?, ?, ?)",
+                    (channel, state.get("last_timestamp"), state.get("total_messages", 0), state.get("last_updated")),
+                )
+                pending = state.get("pending_run")
+                if pending:
+                    conn.execute(
+                        "UPDATE channels SET has_pending = 1, pending_floor = ?, pending_high = ?, pending_low = ? WHERE channel = ?",
+                        (pending.get("floor"), pending.get("high"), pending.get("low"), channel),
+                    )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO threads (channel, thread_ts, latest_reply) VALUES (?, ?, ?)",
+                    [(channel, ts, latest) for ts, latest in state.get("threads", {}).items()],
+                )
+        logger.info(f"Migrated metadata for {len(data)} channels from {path} to {self.db_path}")
+
+    def _ensure_channel(self, conn: sqlite3.Connection, channel: str) -> None:
+        conn.execute("INSERT OR IGNORE INTO channels (channel) VALUES (?)", (channel,))
+
     def get_last_timestamp(self, channel: str) -> Optional[str]:
         """Get the last processed message timestamp for a channel."""
-        channel_data = self.data.get(channel, {})
-        last_ts = channel_data.get("last_timestamp")
+        with self._lock:
+            row = self._conn.execute("SELECT last_timestamp FROM channels WHERE channel = ?", (channel,)).fetchone()
+        last_ts = row["last_timestamp"] if row else None
         if last_ts:
             logger.info(f"Last processed timestamp for channel '{channel}': {last_ts}")
         else:
             logger.info(f"No previous ingestion found for channel '{channel}'")
         return last_ts
-    
-    def update_last_timestamp(self, channel: str, timestamp: str, message_count: int) -> None:
-        """Update the last processed timestamp for a channel."""
-        if channel not in self.data:
-            self.data[channel] = {}
-        
-        self.data[channel]["last_timestamp"] = timestamp
-        self.data[channel]["total_messages"] = self.data[channel].get("total_messages", 0) + message_count
-        self.data[channel]["last_updated"] = str(int(float(timestamp)))
-        
-        logger.info(f"Updated metadata for channel '{channel}': last_ts={timestamp}, new_messages={message_count}")
-        self._save_metadata()
-    
+
+    def get_pending_run(self, channel: str) -> Optional[Dict]:
+        """Return the checkpoint of an interrupted ingest run, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pending_floor, pending_high, pending_low FROM channels WHERE channel = ? AND has_pending = 1",
+                (channel,),
+            ).fetchone()
+        if not row:
+            return None
+        return {"floor": row["pending_floor"], "high": row["pending_high"], "low": row["pending_low"]}
+
+    def commit_batch(
+        self,
+        channel: str,
+        floor: Optional[str],
+        high: Optional[str],
+        low: Optional[str],
+        message_count: int,
+        thread_watermarks: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Atomically record a committed batch of an in-progress run.
+
+        Runs walk history newest-first, so everything in (low, high] is stored;
+        a resumed run only needs to fetch (floor, low). A resumed run starts
+        below the interrupted run's high, so a stored high is never lowered.
+        Thread watermarks for the batch are written in the same transaction.
+        With ``high`` unset only the thread watermarks are recorded.
+        """
+        with self._transaction() as conn:
+            self._ensure_channel(conn, channel)
+            conn.execute("UPDATE channels SET generation = generation + 1 WHERE channel = ?", (channel,))
+            if high is not None:
+                conn.execute(
+                    "UPDATE channels SET has_pending = 1, pending_floor = ?, pending_low = ?,"
+                    " pending_high = CASE WHEN has_pending = 1 AND CAST(pending_high AS REAL) > ? THEN pending_high ELSE ? END,"
+                    " total_messages = total_messages + ? WHERE channel = ?",
+                    (floor, low, float(high), high, message_count, channel),
+                )
+            if thread_watermarks:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO threads (channel, thread_ts, latest_reply) VALUES (?, ?, ?)",
+                    [(channel, ts, latest) for ts, latest in thread_watermarks.items()],
+                )
+        logger.debug(f"Committed batch for channel '{channel}': floor={floor}, low={low}, high={high}, messages={message_count}")
+
+    def complete_run(self, channel: str, high: Optional[str]) -> None:
+        """Finish a run: advance the watermark to its newest message and clear the checkpoint."""
+        with self._transaction() as conn:
+            self._ensure_channel(conn, channel)
+            conn.execute(
+                "UPDATE channels SET has_pending = 0, pending_floor = NULL, pending_high = NULL, pending_low = NULL,"
+                " generation = generation + 1 WHERE channel = ?",
+                (channel,),
+            )
+            if high:
+                conn.execute(
+                    "UPDATE channels SET last_timestamp = ?, last_updated = ?"
+                    " WHERE channel = ? AND (last_timestamp IS NULL OR CAST(last_timestamp AS REAL) < ?)",
+                    (high, str(int(float(high))), channel, float(high)),
+                )
+        logger.info(f"Completed ingest run for channel '{channel}': high={high}")
+
+    def clear_pending_run(self, channel: str) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE channels SET has_pending = 0, pending_floor = NULL, pending_high = NULL, pending_low = NULL WHERE channel = ?",
+                (channel,),
+            )
+
+    def get_thread_watermarks(self, channel: str) -> Dict[str, str]:
+        """Map of thread_ts -> latest_reply already ingested for a channel."""
+        with self._lock:
+            rows = self._conn.execute("SELECT thread_ts, latest_reply FROM threads WHERE channel = ?", (channel,)).fetchall()
+        return {row["thread_ts"]: row["latest_reply"] for row in rows}
+
+    def update_thread_watermarks(self, channel: str, watermarks: Dict[str, str]) -> None:
+        if watermarks:
+            self.commit_batch(channel, None, None, None, 0, thread_watermarks=watermarks)
+
+    def seed_watermarks(
+        self,
+        channel: str,
+        last_timestamp: Optional[str],
+        message_count: int,
+        thread_watermarks: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Record history stored out of band (e.g. from an export) in one transaction.
+
+        Watermarks only move forward, so seeding never makes an ingested
+        channel re-fetch what the API already delivered. The message count
+        is raised to ``message_count`` rather than added to, so re-seeding
+        the same history does not count it twice.
+        """
+        with self._transaction() as conn:
+            self._ensure_channel(conn, channel)
+            conn.execute(
+                "UPDATE channels SET total_messages = MAX(total_messages, ?), generation = generation + 1 WHERE channel = ?",
+                (message_count, channel),
+            )
+            if last_timestamp:
+                conn.execute(
+                    "UPDATE channels SET last_timestamp = ?, last_updated = ?"
+                    " WHERE channel = ? AND (last_timestamp IS NULL OR CAST(last_timestamp AS REAL) < ?)",
+                    (last_timestamp, str(int(float(last_timestamp))), channel, float(last_timestamp)),
+                )
+            if thread_watermarks:
+                conn.executemany(
+                    "INSERT INTO threads (channel, thread_ts, latest_reply) VALUES (?, ?, ?)"
+                    " ON CONFLICT (channel, thread_ts) DO UPDATE SET latest_reply = excluded.latest_reply"
+                    " WHERE CAST(excluded.latest_reply AS REAL) > CAST(threads.latest_reply AS REAL)",
+                    [(channel, ts, latest) for ts, latest in thread_watermarks.items()],
+                )
+        logger.info(
+            f"Seeded metadata for channel '{channel}': last_ts={last_timestamp}, messages={message_count}, "
+            f"threads={len(thread_watermarks or {})}"
+        )
+
     def get_channel_stats(self, channel: str) -> Dict:
-        """Get ingestion statistics for a channel."""
-        return self.data.get(channel, {})
+        """Get ingestion statistics for a channel (a single row read)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_timestamp, total_messages, last_updated FROM channels WHERE channel = ?", (channel,)
+            ).fetchone()
+        return dict(row) if row else {}
+
+    def list_channels(self) -> List[str]:
+        """Channels that have completed at least one ingest run."""
+        with self._lock:
+            rows = self._conn.execute("SELECT channel FROM channels WHERE last_timestamp IS NOT NULL ORDER BY channel").fetchall()
+        return [row["channel"] for row in rows]
+
+    def get_channel_generation(self, channel: str) -> int:
+        """Counter bumped by every committed batch and completed run.
+
+        Anything derived from a channel's stored content (e.g. cached answers)
+        is stale once the generation moves.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT generation FROM channels WHERE channel = ?", (channel,)).fetchone()
+        return row["generation"] if row else 0
+
+    def record_job(
+        self,
+        job_id: str,
+        channel: str,
+        status: str,
+        force_full_refresh: bool = False,
+        started_at: Optional[float] = None,
+        finished_at: Optional[float] = None,
+        messages: int = 0,
+        embeddings: int = 0,
+        upserted: int = 0,
+        documents: Optional[int] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        finished_at = finished_at or time.time()
+        duration = finished_at - started_at if started_at else None
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, channel, force_full_refresh, status, started_at, finished_at,"
+                " duration_seconds, messages, embeddings, upserted, documents, error)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, channel, int(force_full_refresh), status, started_at, finished_at, duration,
+                 messages, embeddings, upserted, documents, error),
+            )
+
+    def get_job_history(self, channel: str, limit: int = 10) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE channel = ? ORDER BY finished_at DESC LIMIT ?", (channel, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
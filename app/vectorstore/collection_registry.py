@@ -0,0 +1,74 @@
+import logging
+import threading
+from typing import Dict, Optional
+
+from langchain_core.embeddings import Embeddings
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+logger = logging.getLogger(__name__)
+
+
+# Known output dimensions, so creating a collection never needs a paid probe
+EMBEDDING_DIMENSIONS: Dict[str, int] = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+class CollectionNotIngestedError(ValueError):
+    """Raised when reading from a channel collection that does not exist yet."""
+
+    def __init__(self, collection_name: str) -> None:
+        super().__init__(f"Channel '{collection_name}' has not been ingested yet")
+        self.collection_name = collection_name
+
+
+class CollectionRegistry:
+    """In-process cache of known Qdrant collections and embedding dimensions."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._collections: Dict[str, Optional[int]] = {}
+        self._probed_dimensions: Dict[str, int] = {}
+
+    def is_known(self, collection_name: str) -> bool:
+        return collection_name in self._collections
+
+    def record(self, collection_name: str, vector_size: Optional[int] = None) -> None:
+        with self._lock:
+            self._collections[collection_name] = vector_size
+
+    def forget(self, collection_name: str) -> None:
+        with self._lock:
+            self._collections.pop(collection_name, None)
+
+    def exists(self, client: QdrantClient, collection_name: str) -> bool:
+        """Check existence, only going to Qdrant for collections not seen yet."""
+        if self.is_known(collection_name):
+            return True
+        if client.collection_exists(collection_name=collection_name):
+            self.record(collection_name)
+            return True
+        return False
+
+    async def aexists(self, client: AsyncQdrantClient, collection_name: str) -> bool:
+        if self.is_known(collection_name):
+            return True
+        if await client.collection_exists(collection_name=collection_name):
+            self.record(collection_name)
+            return True
+        return False
+
+    def vector_size(self, embedding_model: str, embeddings: Embeddings) -> int:
+        """Resolve the vector size for a model, probing at most once per process."""
+        size = EMBEDDING_DIMENSIONS.get(embedding_model) or self._probed_dimensions.get(embedding_model)
+        if size:
+            return size
+        with self._lock:
+            size = self._probed_dimensions.get(embedding_model)
+            if size is None:
+                logger.warning(f"Unknown dimension for embedding model '{embedding_model}', probing once")
+                size = len(embeddings.embed_query("hello"))
+                self._probed_dimensions[embedding_model] = size
+        return size
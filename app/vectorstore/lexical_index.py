@@ -0,0 +1,203 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Collection, Dict, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Identifier-like terms stay whole (INC-1234, db-01.prod, ERR_CONN_RESET, 10.0.0.1)
+_TERM_RE = re.compile(r"\w(?:[\w.\-:/]*\w)?")
+
+# Stay well below SQLite's bound-parameter limit
+_SQL_BATCH = 500
+
+
+def fts_query(text: str) -> str:
+    """OR of quoted terms, so user text never hits FTS5 query syntax.
+
+    A quoted identifier becomes a phrase of its sub-tokens, which keeps
+    ``INC-1234`` from matching every message that mentions ``1234``.
+    """
+    terms = dict.fromkeys(t.lower() for t in _TERM_RE.findall(text))
+    return " OR ".join(f'"{t}"' for t in terms)
+
+
+class LexicalIndex:
+    """BM25 keyword index (SQLite FTS5) mirroring the points written to Qdrant.
+
+    Each channel has its own FTS5 table, so a search only scans that
+    channel's rows and BM25 term statistics are per channel. Rows are keyed
+    by Qdrant point ID, so upserts, message deletes and prunes stay in step
+    with the vector store.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS channel_tables (
+                channel TEXT PRIMARY KEY,
+                table_id INTEGER NOT NULL UNIQUE
+            );
+            CREATE TABLE IF NOT EXISTS message_points (
+                channel TEXT NOT NULL,
+                message_ts TEXT NOT NULL,
+                point_id TEXT NOT NULL,
+                PRIMARY KEY (channel, message_ts, point_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS message_points_by_point ON message_points (point_id);
+            """
+        )
+        self._conn.commit()
+        # Channel -> table of channels seen so far; other processes add channels, so a miss is re-read
+        self._tables: Dict[str, str] = {}
+        self._split_legacy_table()
+
+    def _table(self, channel: str, create: bool = False) -> Optional[str]:
+        """The channel's FTS5 table; the caller holds the lock and, with ``create``, a transaction.
+
+        Channel names are user data, so tables are named by a numeric ID.
+        The ID is allocated and the table created with ``IF NOT EXISTS``
+        semantics, so processes sharing the database agree on one table.
+        """
+        table = self._tables.get(channel)
+        if table is not None:
+            return table
+        row = self._conn.execute("SELECT table_id FROM channel_tables WHERE channel = ?", (channel,)).fetchone()
+        if row is not None:
+            table = self._tables[channel] = f"points_{row[0]}"
+            return table
+        if not create:
+            return None
+        # One statement under the write lock, so concurrent writers cannot allocate the same ID
+        self._conn.execute(
+            "INSERT OR IGNORE INTO channel_tables (channel, table_id)"
+            " SELECT ?, COALESCE(MAX(table_id), 0) + 1 FROM channel_tables",
+            (channel,),
+        )
+        table_id = self._conn.execute("SELECT table_id FROM channel_tables WHERE channel = ?", (channel,)).fetchone()[0]
+        table = f"points_{table_id}"
+        self._conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(text, point_id UNINDEXED, metadata UNINDEXED)")
+        # Not cached until committed: a rolled back transaction takes the table with it
+        return table
+
+    def _split_legacy_table(self) -> None:
+        """One-time move of the single workspace-wide ``points`` table into per-channel tables."""
+        with self._lock, self._conn:
+            if not self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'points'").fetchone():
+                return
+            channels = [row[0] for row in self._conn.execute("SELECT DISTINCT channel FROM points")]
+            for channel in channels:
+                self._conn.execute(
+                    f"INSERT INTO {self._table(channel, create=True)} (text, point_id, metadata)"
+                    " SELECT text, point_id, metadata FROM points WHERE channel = ?",
+                    (channel,),
+                )
+            self._conn.execute("DROP TABLE points")
+        logger.info(f"Split the keyword index in {self.path} into {len(channels)} per-channel tables")
+
+    def _delete_ids(self, table: str, ids: Sequence[str]) -> None:
+        for i in range(0, len(ids), _SQL_BATCH):
+            chunk = list(ids[i:i + _SQL_BATCH])
+            placeholders = ",".join("?" * len(chunk))
+            self._conn.execute(f"DELETE FROM {table} WHERE point_id IN ({placeholders})", chunk)
+            self._conn.execute(f"DELETE FROM message_points WHERE point_id IN ({placeholders})", chunk)
+
+    def has_channel(self, channel: str) -> bool:
+        """Whether anything of the channel was ever indexed, by this or another process."""
+        with self._lock:
+            return self._table(channel) is not None
+
+    def upsert(self, channel: str, ids: Sequence[str], docs: Sequence[Document]) -> None:
+        if not docs:
+            return
+        ids = [str(i) for i in ids]
+        with self._lock, self._conn:
+            table = self._table(channel, create=True)
+            self._delete_ids(table, ids)
+            self._conn.executemany(
+                f"INSERT INTO {table} (text, point_id, metadata) VALUES (?, ?, ?)",
+                [(doc.page_content, pid, json.dumps(doc.metadata)) for pid, doc in zip(ids, docs)],
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO message_points (channel, message_ts, point_id) VALUES (?, ?, ?)",
+                [
+                    (channel, ts, pid)
+                    for pid, doc in zip(ids, docs)
+                    for ts in doc.metadata.get("message_ts") or [doc.metadata.get("ts", "")]
+                ],
+            )
+
+    def delete_points(self, channel: str, ids: Sequence[str]) -> None:
+        if not ids:
+            return
+        with self._lock, self._conn:
+            table = self._table(channel)
+            if table is not None:
+                self._delete_ids(table, [str(i) for i in ids])
+
+    def delete_messages(self, channel: str, message_ts: Sequence[str]) -> None:
+        """Drop every point (message or chunk) containing one of the given message ts."""
+        if not message_ts:
+            return
+        with self._lock, self._conn:
+            table = self._table(channel)
+            if table is None:
+                return
+            ids: List[str] = []
+            for i in range(0, len(message_ts), _SQL_BATCH):
+                chunk = list(message_ts[i:i + _SQL_BATCH])
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT DISTINCT point_id FROM message_points WHERE channel = ? AND message_ts IN ({placeholders})",
+                    (channel, *chunk),
+                ).fetchall()
+                ids.extend(row[0] for row in rows)
+            self._delete_ids(table, ids)
+
+    def prune(self, channel: str, keep_ids: Collection[str]) -> int:
+        """Drop the channel's points whose ID is not in ``keep_ids``."""
+        with self._lock, self._conn:
+            table = self._table(channel)
+            if table is None:
+                return 0
+            rows = self._conn.execute(f"SELECT point_id FROM {table}").fetchall()
+            stale = [row[0] for row in rows if row[0] not in keep_ids]
+            self._delete_ids(table, stale)
+        return len(stale)
+
+    def search(self, channel: str, query: str, k: int = 20) -> List[Document]:
+        """Top ``k`` BM25 matches in a channel, best first, as Documents with a ``_bm25`` score."""
+        match = fts_query(query)
+        if not match:
+            return []
+        with self._lock:
+            table = self._table(channel)
+            if table is None:
+                return []
+            rows = self._conn.execute(
+                f"SELECT text, point_id, metadata, bm25({table}) AS rank FROM {table}"
+                f" WHERE {table} MATCH ? ORDER BY rank LIMIT ?",
+                (match, k),
+            ).fetchall()
+        docs = []
+        for text, pid, metadata_json, rank in rows:
+            metadata = json.loads(metadata_json)
+            metadata["_id"] = pid
+            # FTS5 ranks are negated BM25 scores (lower is better)
+            metadata["_bm25"] = -rank
+            docs.append(Document(page_content=text, metadata=metadata))
+        return docs
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
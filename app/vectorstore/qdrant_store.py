@@ -1,39 +1,505 @@
-from typing import Optional
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Collection, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
 
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.models import (
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    MatchAny,
+    MatchValue,
+    PayloadSchemaType,
+    PointIdsList,
+    PointStruct,
+    Range,
+    Record,
+    ScoredPoint,
+)
 from langchain_community.vectorstores import Qdrant
+from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 
 from app.config import Settings
+from app.metrics import QDRANT_SECONDS, observe
+from app.vectorstore.collection_registry import CollectionNotIngestedError, CollectionRegistry
+from app.vectorstore.lexical_index import LexicalIndex
+from app.vectorstore.storage_profiles import StorageProfiles
+
+logger = logging.getLogger(__name__)
+
+
+CHANNEL_KEY = f"{Qdrant.METADATA_KEY}.channel"
+
+# Payload fields filtered on by searches, deletes and the shared layout
+PAYLOAD_INDEXES: Dict[str, PayloadSchemaType] = {
+    CHANNEL_KEY: PayloadSchemaType.KEYWORD,
+    f"{Qdrant.METADATA_KEY}.user": PayloadSchemaType.KEYWORD,
+    f"{Qdrant.METADATA_KEY}.users": PayloadSchemaType.KEYWORD,
+    f"{Qdrant.METADATA_KEY}.ts": PayloadSchemaType.KEYWORD,
+    f"{Qdrant.METADATA_KEY}.thread_ts": PayloadSchemaType.KEYWORD,
+    f"{Qdrant.METADATA_KEY}.message_ts": PayloadSchemaType.KEYWORD,
+    f"{Qdrant.METADATA_KEY}.timestamp": PayloadSchemaType.FLOAT,
+}
+
+
+def metadata_filter(
+    user: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    ts: Optional[str] = None,
+    thread_ts: Optional[str] = None,
+) -> Optional[Filter]:
+    """Filter on the metadata written at ingest time; ``None`` when nothing is set.
+
+    ``user`` also matches chunks the user took part in, ``ts`` matches the
+    message or the chunk containing it, and the datetime range applies to the
+    (first) message's numeric ``timestamp``.
+    """
+    must: List = []
+    should: List = []
+    if user:
+        should = [
+            FieldCondition(key=f"{Qdrant.METADATA_KEY}.user", match=MatchValue(value=user)),
+            FieldCondition(key=f"{Qdrant.METADATA_KEY}.users", match=MatchValue(value=user)),
+        ]
+    if since or until:
+        must.append(FieldCondition(
+            key=f"{Qdrant.METADATA_KEY}.timestamp",
+            range=Range(gte=since.timestamp() if since else None, lte=until.timestamp() if until else None),
+        ))
+    if ts:
+        must.append(FieldCondition(key=f"{Qdrant.METADATA_KEY}.message_ts", match=MatchValue(value=ts)))
+    if thread_ts:
+        must.append(FieldCondition(key=f"{Qdrant.METADATA_KEY}.thread_ts", match=MatchValue(value=thread_ts)))
+    if not must and not should:
+        return None
+    if should:
+        # Nested so the user alternatives do not mix with other "should" clauses
+        must.append(Filter(should=should))
+    return Filter(must=must)
+
+
+def _merge_filters(*filters: Optional[Filter]) -> Optional[Filter]:
+    must: List = []
+    for f in filters:
+        if f is not None:
+            must.extend(f.must or [])
+    return Filter(must=must) if must else None
+
+
+def qdrant_client_kwargs(settings: Settings) -> Dict:
+    """Client arguments for the configured Qdrant: a server, or embedded local mode."""
+    if settings.qdrant_path == ":memory:":
+        return {"location": ":memory:"}
+    if settings.qdrant_path:
+        return {"path": settings.qdrant_path}
+    return {"url": settings.qdrant_url, "port": settings.qdrant_port}
+
+
+def hit_to_document(hit: Union[ScoredPoint, Record], collection_name: str) -> Document:
+    """Convert a Qdrant hit (or scrolled point) using LangChain's payload layout into a Document."""
+    payload = hit.payload or {}
+    metadata = dict(payload.get(Qdrant.METADATA_KEY) or {})
+    metadata["_id"] = hit.id
+    metadata["_collection_name"] = collection_name
+    metadata["_score"] = getattr(hit, "score", None)
+    return Document(page_content=payload.get(Qdrant.CONTENT_KEY) or "", metadata=metadata)
+
+
+def normalize_scores(docs: List[Document]) -> List[Document]:
+    """Rank hits from several channels together, adding a 0-1 ``_norm_score``.
+
+    Every collection uses the same embedding model and cosine distance, so raw
+    scores are comparable; they are min-max scaled over the merged set rather
+    than per channel, which would lift the best hit of an unrelated channel to 1.
+    """
+    if not docs:
+        return docs
+    scores = [d.metadata.get("_score") or 0.0 for d in docs]
+    low, high = min(scores), max(scores)
+    span = high - low
+    for doc, score in zip(docs, scores):
+        doc.metadata["_norm_score"] = (score - low) / span if span else 1.0
+    return sorted(docs, key=lambda d: d.metadata["_norm_score"], reverse=True)
+
+
+class _CollectionLayout:
+    """Maps channels onto collections: one per channel, or one shared collection
+    whose points are told apart by an indexed ``metadata.channel`` payload field."""
+
+    def __init__(self, settings: Settings) -> None:
+        self.shared_collection = settings.shared_collection_name if settings.collection_layout == "shared" else None
+
+    def collection(self, channel: str) -> str:
+        return self.shared_collection or channel
+
+    def registry_key(self, channel: str) -> str:
+        # Channels inside the shared collection are tracked separately from the collection itself
+        return f"{self.shared_collection}/{channel}" if self.shared_collection else channel
+
+    def channel_filter(self, channels: Sequence[str]) -> Optional[Filter]:
+        if not self.shared_collection:
+            return None
+        match = MatchValue(value=channels[0]) if len(channels) == 1 else MatchAny(any=list(channels))
+        return Filter(must=[FieldCondition(key=CHANNEL_KEY, match=match)])
+
+    def scoped(self, channel: str, *conditions: FieldCondition) -> Filter:
+        """Filter for the given conditions, restricted to the channel in the shared layout."""
+        scope = self.channel_filter([channel])
+        return Filter(must=list(conditions) + (scope.must if scope else []))
 
 
 class QdrantStore:
-    def __init__(self, settings: Settings, embeddings: Embeddings) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        embeddings: Embeddings,
+        client: Optional[QdrantClient] = None,
+        registry: Optional[CollectionRegistry] = None,
+        lexical: Optional[LexicalIndex] = None,
+    ) -> None:
         self.settings = settings
         self.embeddings = embeddings
-        self.client = QdrantClient(url=settings.qdrant_url, port=settings.qdrant_port)
+        self.client = client or QdrantClient(**qdrant_client_kwargs(settings))
+        self.registry = registry or CollectionRegistry()
+        # Keyword index kept in step with every write, for hybrid retrieval
+        self.lexical = lexical
+        self.layout = _CollectionLayout(settings)
+        self.profiles = StorageProfiles(settings)
+        self._indexed: Set[str] = set()
+
+    def collection_exists(self, collection_name: str) -> bool:
+        """Whether the channel has stored points (its own collection, or its slice of the shared one)."""
+        layout = self.layout
+        if not layout.shared_collection:
+            return self.registry.exists(self.client, collection_name)
+        key = layout.registry_key(collection_name)
+        if self.registry.is_known(key):
+            return True
+        if not self.registry.exists(self.client, layout.shared_collection):
+            return False
+        found = self.client.count(
+            collection_name=layout.shared_collection, count_filter=layout.channel_filter([collection_name]), exact=False
+        ).count > 0
+        if found:
+            self.registry.record(key)
+        return found
+
+    def require_collection(self, collection_name: str) -> None:
+        """Read path: fail cleanly instead of creating an empty collection."""
+        if not self.collection_exists(collection_name):
+            raise CollectionNotIngestedError(collection_name)
 
     def ensure_collection(self, collection_name: str, vector_size: Optional[int] = None) -> None:
-        exists = self.client.collection_exists(collection_name=collection_name)
-        if not exists:
+        """Write path: create the collection on first write."""
+        target = self.layout.collection(collection_name)
+        if not self.registry.exists(self.client, target):
             if vector_size is None:
-                # best effort probe: many OpenAI embedding sizes are known, but
-                # we can lazily compute by embedding a trivial string.
-                vector_size = len(self.embeddings.embed_query("hello"))
-            self.client.create_collection(
-                collection_name=collection_name,
-                vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
+                vector_size = self.registry.vector_size(self.settings.embedding_model, self.embeddings)
+            profile = self.profiles.for_collection(target)
+            logger.info(f"Creating collection '{target}' with vector size {vector_size} and storage profile '{profile.name}'")
+            self.client.create_collection(collection_name=target, **profile.create_kwargs(vector_size))
+            self.registry.record(target, vector_size)
+        self.ensure_payload_indexes(target)
+
+    def ensure_payload_indexes(self, collection_name: str) -> None:
+        """Create the filter indexes once per collection and process (also on pre-existing collections)."""
+        if collection_name in self._indexed:
+            return
+        for field_name, schema in PAYLOAD_INDEXES.items():
+            self.client.create_payload_index(
+                collection_name=collection_name, field_name=field_name, field_schema=schema, wait=True
+            )
+        self._indexed.add(collection_name)
+
+    def upsert_documents(
+        self,
+        collection_name: str,
+        docs: Sequence[Document],
+        vectors: Sequence[List[float]],
+        ids: Optional[Sequence[str]] = None,
+    ) -> None:
+        """Upsert pre-embedded documents using LangChain's payload layout."""
+        if not docs:
+            return
+        ids = ids or [uuid.uuid4().hex for _ in docs]
+        points = [
+            PointStruct(
+                id=point_id,
+                vector=list(vector),
+                payload={Qdrant.CONTENT_KEY: doc.page_content, Qdrant.METADATA_KEY: doc.metadata},
+            )
+            for point_id, doc, vector in zip(ids, docs, vectors)
+        ]
+        with observe(QDRANT_SECONDS, operation="upsert"):
+            self.client.upsert(collection_name=self.layout.collection(collection_name), points=points, wait=True)
+        self.registry.record(self.layout.registry_key(collection_name))
+        if self.lexical is not None:
+            self.lexical.upsert(collection_name, ids, docs)
+
+    def delete_points(self, collection_name: str, ids: Sequence[str]) -> None:
+        if not ids or not self.collection_exists(collection_name):
+            return
+        with observe(QDRANT_SECONDS, operation="delete"):
+            self.client.delete(
+                collection_name=self.layout.collection(collection_name),
+                points_selector=PointIdsList(points=list(ids)),
+                wait=True,
             )
+        if self.lexical is not None:
+            self.lexical.delete_points(collection_name, ids)
 
-    def as_vectorstore(self, collection_name: str) -> Qdrant:
-        self.ensure_collection(collection_name)
+    def _messages_filter(self, collection_name: str, message_ts: Sequence[str]) -> Filter:
+        key = f"{Qdrant.METADATA_KEY}.message_ts"
+        return self.layout.scoped(collection_name, FieldCondition(key=key, match=MatchAny(any=list(message_ts))))
+
+    def _scroll(self, collection_name: str, scroll_filter: Optional[Filter], batch_size: int) -> Iterator[List[Document]]:
+        offset = None
+        while True:
+            with observe(QDRANT_SECONDS, operation="scroll"):
+                points, offset = self.client.scroll(
+                    collection_name=self.layout.collection(collection_name),
+                    scroll_filter=scroll_filter,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=False,
+                )
+            yield [hit_to_document(p, collection_name) for p in points]
+            if offset is None:
+                return
+
+    def find_messages(self, collection_name: str, message_ts: Sequence[str], batch_size: int = 256) -> List[Document]:
+        """Every point (message or chunk) that contains one of the given message ts."""
+        if not message_ts or not self.collection_exists(collection_name):
+            return []
+        scroll_filter = self._messages_filter(collection_name, message_ts)
+        return [doc for batch in self._scroll(collection_name, scroll_filter, batch_size) for doc in batch]
+
+    def iter_documents(self, collection_name: str, batch_size: int = 256) -> Iterator[List[Document]]:
+        """All of a channel's stored points, in batches, with their IDs as ``_id``."""
+        if not self.collection_exists(collection_name):
+            return
+        yield from self._scroll(collection_name, self.layout.channel_filter([collection_name]), batch_size)
+
+    def delete_messages(self, collection_name: str, message_ts: Sequence[str]) -> None:
+        """Delete every point (message or chunk) that contains one of the given message ts."""
+        if not message_ts or not self.collection_exists(collection_name):
+            return
+        with observe(QDRANT_SECONDS, operation="delete"):
+            self.client.delete(
+                collection_name=self.layout.collection(collection_name),
+                points_selector=FilterSelector(filter=self._messages_filter(collection_name, message_ts)),
+                wait=True,
+            )
+        if self.lexical is not None:
+            self.lexical.delete_messages(collection_name, message_ts)
+
+    def prune_points(self, collection_name: str, keep_ids: Collection[str], batch_size: int = 1000) -> int:
+        """Delete every point whose ID is not in ``keep_ids``; returns the number removed."""
+        if not self.collection_exists(collection_name):
+            return 0
+        stale: List = []
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.layout.collection(collection_name),
+                scroll_filter=self.layout.channel_filter([collection_name]),
+                limit=batch_size,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            stale.extend(p.id for p in points if str(p.id) not in keep_ids)
+            if offset is None:
+                break
+        for i in range(0, len(stale), batch_size):
+            self.delete_points(collection_name, stale[i:i + batch_size])
+        if self.lexical is not None:
+            # Also drops keyword rows whose points were already gone from Qdrant
+            self.lexical.prune(collection_name, keep_ids)
+        return len(stale)
+
+    def rebuild_lexical(self, collection_name: str, batch_size: int = 256) -> int:
+        """Refill the channel's keyword index from the stored payloads; returns the points indexed."""
+        if self.lexical is None:
+            raise ValueError("The keyword index is disabled (HYBRID_INDEX_ENABLED=false)")
+        seen: Set[str] = set()
+        for batch in self.iter_documents(collection_name, batch_size):
+            ids = [str(d.metadata["_id"]) for d in batch]
+            # Drop the hit fields added on read (_id, _score, ...)
+            docs = [
+                Document(page_content=d.page_content, metadata={k: v for k, v in d.metadata.items() if not k.startswith("_")})
+                for d in batch
+            ]
+            self.lexical.upsert(collection_name, ids, docs)
+            seen.update(ids)
+        self.lexical.prune(collection_name, seen)
+        return len(seen)
+
+    def search(self, collection_name: str, query_vector: List[float], k: int = 5) -> List[Document]:
+        self.require_collection(collection_name)
+        target = self.layout.collection(collection_name)
+        with observe(QDRANT_SECONDS, operation="search"):
+            hits = self.client.search(
+                collection_name=target,
+                query_vector=query_vector,
+                query_filter=self.layout.channel_filter([collection_name]),
+                search_params=self.profiles.search_params(target),
+                limit=k,
+                with_payload=True,
+            )
+        return [hit_to_document(hit, collection_name) for hit in hits]
+
+    def as_vectorstore(self, collection_name: str, create: bool = False) -> Qdrant:
+        """LangChain view of a per-channel collection (not channel-scoped in the shared layout)."""
+        if create:
+            self.ensure_collection(collection_name)
+        else:
+            self.require_collection(collection_name)
         return Qdrant(
             client=self.client,
-            collection_name=collection_name,
+            collection_name=self.layout.collection(collection_name),
             embeddings=self.embeddings,
         )
 
     def as_retriever(self, collection_name: str, k: int = 5):
         vs = self.as_vectorstore(collection_name)
-        return vs.as_retriever(search_kwargs={"k": k})
+        search_params = self.profiles.search_params(self.layout.collection(collection_name))
+        return vs.as_retriever(search_kwargs={"k": k, "search_params": search_params})
+
+
+class AsyncQdrantStore:
+    """Read-side counterpart of QdrantStore backed by AsyncQdrantClient."""
+
+    def __init__(
+        self,
+        settings: Settings,
+        client: Optional[AsyncQdrantClient] = None,
+        registry: Optional[CollectionRegistry] = None,
+    ) -> None:
+        self.settings = settings
+        self.client = client or AsyncQdrantClient(**qdrant_client_kwargs(settings))
+        self.registry = registry or CollectionRegistry()
+        self.layout = _CollectionLayout(settings)
+        self.profiles = StorageProfiles(settings)
+
+    async def collection_exists(self, collection_name: str) -> bool:
+        layout = self.layout
+        if not layout.shared_collection:
+            return await self.registry.aexists(self.client, collection_name)
+        key = layout.registry_key(collection_name)
+        if self.registry.is_known(key):
+            return True
+        if not await self.registry.aexists(self.client, layout.shared_collection):
+            return False
+        result = await self.client.count(
+            collection_name=layout.shared_collection, count_filter=layout.channel_filter([collection_name]), exact=False
+        )
+        if result.count > 0:
+            self.registry.record(key)
+        return result.count > 0
+
+    async def require_collection(self, collection_name: str) -> None:
+        if not await self.collection_exists(collection_name):
+            raise CollectionNotIngestedError(collection_name)
+
+    async def list_channels(self) -> List[str]:
+        """Names of every collection; in the per-channel layout a superset of the channels."""
+        response = await self.client.get_collections()
+        return sorted(c.name for c in response.collections)
+
+    async def existing_channels(self, channels: Sequence[str]) -> Tuple[List[str], List[str]]:
+        """Split channels into (ingested, missing)."""
+        found = await asyncio.gather(*(self.collection_exists(channel) for channel in channels))
+        present = [c for c, ok in zip(channels, found) if ok]
+        missing = [c for c, ok in zip(channels, found) if not ok]
+        return present, missing
+
+    async def search(
+        self,
+        collection_name: str,
+        query_vector: List[float],
+        k: int = 5,
+        query_filter: Optional[Filter] = None,
+        score_threshold: Optional[float] = None,
+        offset: int = 0,
+    ) -> List[Document]:
+        target = self.layout.collection(collection_name)
+        with observe(QDRANT_SECONDS, operation="search"):
+            hits = await self.client.search(
+                collection_name=target,
+                query_vector=query_vector,
+                query_filter=_merge_filters(query_filter, self.layout.channel_filter([collection_name])),
+                search_params=self.profiles.search_params(target),
+                score_threshold=score_threshold,
+                limit=k,
+                offset=offset,
+                with_payload=True,
+            )
+        return [hit_to_document(hit, collection_name) for hit in hits]
+
+    async def vectors(self, collection_name: str, ids: Sequence) -> Dict[str, List[float]]:
+        """Stored vectors of the given points, keyed by point ID string."""
+        if not ids:
+            return {}
+        with observe(QDRANT_SECONDS, operation="retrieve"):
+            points = await self.client.retrieve(
+                collection_name=self.layout.collection(collection_name),
+                ids=list(ids),
+                with_payload=False,
+                with_vectors=True,
+            )
+        return {str(p.id): p.vector for p in points if p.vector is not None}
+
+    async def search_many(
+        self,
+        channels: Sequence[str],
+        query_vector: List[float],
+        k: int = 5,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        query_filter: Optional[Filter] = None,
+        score_threshold: Optional[float] = None,
+        offset: int = 0,
+    ) -> List[Document]:
+        """Hits ``offset`` to ``offset + k`` across channels, ranked by normalized score.
+
+        Per-channel collections are searched in parallel (each search bounded
+        by ``semaphore``); the shared layout needs a single filtered search.
+        """
+        if not channels:
+            return []
+        if self.layout.shared_collection:
+            with observe(QDRANT_SECONDS, operation="search"):
+                hits = await self.client.search(
+                    collection_name=self.layout.shared_collection,
+                    query_vector=query_vector,
+                    query_filter=_merge_filters(query_filter, self.layout.channel_filter(channels)),
+                    search_params=self.profiles.search_params(self.layout.shared_collection),
+                    score_threshold=score_threshold,
+                    limit=k,
+                    offset=offset,
+                    with_payload=True,
+                )
+            docs = [hit_to_document(hit, self.layout.shared_collection) for hit in hits]
+            return normalize_scores(docs)
+
+        async def one(channel: str) -> List[Document]:
+            # Any of the first offset + k merged hits may come from this channel
+            kwargs = dict(k=offset + k, query_filter=query_filter, score_threshold=score_threshold)
+            if semaphore is None:
+                return await self.search(channel, query_vector, **kwargs)
+            async with semaphore:
+                return await self.search(channel, query_vector, **kwargs)
+
+        if len(channels) == 1:
+            docs = await self.search(
+                channels[0], query_vector, k=k, query_filter=query_filter, score_threshold=score_threshold, offset=offset
+            )
+            return normalize_scores(docs)
+        results = await asyncio.gather(*(one(channel) for channel in channels))
+        merged = sorted((doc for docs in results for doc in docs), key=lambda d: d.metadata["_score"], reverse=True)
+        return normalize_scores(merged[offset:offset + k])
@@ -0,0 +1,190 @@
+import math
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Any, Dict, Literal, Optional, Union
+
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CollectionParamsDiff,
+    Disabled,
+    Distance,
+    HnswConfigDiff,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+    VectorParamsDiff,
+)
+
+from app.config import Settings
+
+QuantizationConfig = Union[ScalarQuantization, BinaryQuantization]
+
+
+@dataclass(frozen=True)
+class StorageProfile:
+    """How a collection stores and searches its vectors.
+
+    ``None`` leaves a value to the Qdrant server default. Quantized vectors
+    are searched first and, with ``rescore``, the best ``limit * oversampling``
+    candidates are re-ranked against the original vectors.
+    """
+
+    name: str
+    quantization: Literal["none", "scalar", "binary"] = "none"
+    # Scalar only: clip outliers beyond this quantile before mapping to int8
+    quantile: Optional[float] = None
+    quantized_in_ram: bool = True
+    vectors_on_disk: bool = False
+    payload_on_disk: bool = False
+    hnsw_m: Optional[int] = None
+    hnsw_ef_construct: Optional[int] = None
+    hnsw_on_disk: bool = False
+    search_ef: Optional[int] = None
+    rescore: bool = True
+    oversampling: Optional[float] = None
+
+    def quantization_config(self) -> Optional[QuantizationConfig]:
+        if self.quantization == "scalar":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(
+                    type=ScalarType.INT8, quantile=self.quantile, always_ram=self.quantized_in_ram
+                )
+            )
+        if self.quantization == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=self.quantized_in_ram))
+        return None
+
+    def hnsw_config(self) -> HnswConfigDiff:
+        return HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct, on_disk=self.hnsw_on_disk)
+
+    def vector_params(self, size: int) -> VectorParams:
+        return VectorParams(
+            size=size,
+            distance=Distance.COSINE,
+            on_disk=self.vectors_on_disk,
+            hnsw_config=self.hnsw_config(),
+            quantization_config=self.quantization_config(),
+        )
+
+    def create_kwargs(self, vector_size: int) -> Dict[str, Any]:
+        """``create_collection`` arguments for a new collection on this profile."""
+        return {
+            "vectors_config": self.vector_params(vector_size),
+            "hnsw_config": self.hnsw_config(),
+            "quantization_config": self.quantization_config(),
+            "on_disk_payload": self.payload_on_disk,
+        }
+
+    def update_kwargs(self) -> Dict[str, Any]:
+        """``update_collection`` arguments that move an existing collection onto this profile."""
+        return {
+            # "" is the unnamed (default) vector
+            "vectors_config": {"": VectorParamsDiff(on_disk=self.vectors_on_disk, hnsw_config=self.hnsw_config())},
+            "hnsw_config": self.hnsw_config(),
+            "quantization_config": self.quantization_config() or Disabled.DISABLED,
+            "collection_params": CollectionParamsDiff(on_disk_payload=self.payload_on_disk),
+        }
+
+    def search_params(self) -> Optional[SearchParams]:
+        quantization = None
+        if self.quantization != "none":
+            quantization = QuantizationSearchParams(rescore=self.rescore, oversampling=self.oversampling)
+        if self.search_ef is None and quantization is None:
+            return None
+        return SearchParams(hnsw_ef=self.search_ef, quantization=quantization)
+
+    def estimated_ram_bytes(self, points: int, dimensions: int) -> int:
+        """Rough resident size of vectors and HNSW graph (payloads excluded)."""
+        original = points * dimensions * 4
+        quantized = {"scalar": points * dimensions, "binary": points * math.ceil(dimensions / 8)}.get(
+            self.quantization, 0
+        )
+        # Layer 0 holds up to 2 * m links of 4 bytes per point
+        graph = points * 2 * (self.hnsw_m or 16) * 4
+        ram = 0 if self.vectors_on_disk else original
+        if quantized and self.quantized_in_ram:
+            ram += quantized
+        if not self.hnsw_on_disk:
+            ram += graph
+        return ram
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+BUILTIN_PROFILES: Dict[str, StorageProfile] = {
+    # Server defaults: float32 vectors, graph and payloads all in RAM (explicit so re-profiling back resets HNSW)
+    "default": StorageProfile(name="default", hnsw_m=16, hnsw_ef_construct=100),
+    # Busy channels: int8 copies speed up search, originals stay in RAM for cheap rescoring
+    "small-hot": StorageProfile(
+        name="small-hot",
+        quantization="scalar",
+        quantile=0.99,
+        hnsw_m=16,
+        hnsw_ef_construct=128,
+        search_ef=128,
+        oversampling=1.5,
+    ),
+    # Large channels: int8 copies in RAM, originals and payloads on disk, read only to rescore
+    "large-cold": StorageProfile(
+        name="large-cold",
+        quantization="scalar",
+        quantile=0.99,
+        vectors_on_disk=True,
+        payload_on_disk=True,
+        hnsw_m=16,
+        hnsw_ef_construct=100,
+        search_ef=64,
+        oversampling=2.0,
+    ),
+    # Rarely queried channels: 1-bit vectors in RAM, everything else on disk
+    "archive": StorageProfile(
+        name="archive",
+        quantization="binary",
+        vectors_on_disk=True,
+        payload_on_disk=True,
+        hnsw_m=8,
+        hnsw_ef_construct=64,
+        hnsw_on_disk=True,
+        search_ef=64,
+        oversampling=3.0,
+    ),
+}
+
+_PROFILE_FIELDS = {f.name for f in fields(StorageProfile)} - {"name"}
+
+
+class StorageProfiles:
+    """Resolves the storage profile of each collection from settings.
+
+    Built-in profiles can be overridden or extended field by field through
+    ``STORAGE_PROFILES``; ``COLLECTION_STORAGE_PROFILES`` assigns profiles to
+    individual collections, the rest use ``STORAGE_PROFILE``.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self.profiles: Dict[str, StorageProfile] = dict(BUILTIN_PROFILES)
+        for name, overrides in settings.storage_profiles.items():
+            unknown = set(overrides) - _PROFILE_FIELDS
+            if unknown:
+                raise ValueError(f"Storage profile '{name}' has unknown fields: {', '.join(sorted(unknown))}")
+            base = self.profiles.get(name, StorageProfile(name=name))
+            self.profiles[name] = replace(base, **overrides)
+        self.default = self.get(settings.storage_profile)
+        self.assignments = {collection: self.get(name) for collection, name in settings.collection_storage_profiles.items()}
+        self._search_params = {name: profile.search_params() for name, profile in self.profiles.items()}
+
+    def get(self, name: str) -> StorageProfile:
+        try:
+            return self.profiles[name]
+        except KeyError:
+            raise ValueError(f"Unknown storage profile '{name}' (known: {', '.join(sorted(self.profiles))})") from None
+
+    def for_collection(self, collection_name: str) -> StorageProfile:
+        return self.assignments.get(collection_name, self.default)
+
+    def search_params(self, collection_name: str) -> Optional[SearchParams]:
+        return self._search_params[self.for_collection(collection_name).name]
@@ -0,0 +1,304 @@
+"""End-to-end offline benchmark: synthetic Slack channel -> ingest -> /qa.
+
+Slack, the embeddings API, the chat model and the tiktoken encodings are
+replaced by the fakes in benchmarks.fakes (no network access is needed),
+and Qdrant runs embedded (local path mode) unless
+--qdrant-url points at a server. Each channel size runs in its own
+subprocess so peak RSS is per size. Reports ingest throughput, peak memory
+and /qa latency percentiles; with --baseline, compares against a previous
+--output file and exits non-zero on regressions beyond --tolerance.
+
+Usage: python -m benchmarks.bench_e2e [--sizes 1000,10000,100000] [--queries 200]
+                                      [--output results.json] [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.fakes import TOPICS
+
+CHANNEL = "bench"
+DEFAULT_SIZES = "1000,10000,100000"
+
+# metric -> True when higher is better
+_COMPARED_METRICS = {
+    "ingest.messages_per_second": True,
+    "ingest.peak_rss_mb": False,
+    "qa.p50_ms": False,
+    "qa.p99_ms": False,
+}
+
+_CHILD_OPTIONS = (
+    "queries", "warmup", "concurrency", "top_k", "dimensions", "llm_latency_ms",
+    "slack_latency_ms", "rate_limit_every", "qdrant_url", "seed", "verbose",
+)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return round(ordered[rank], 2)
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _configure(workdir: str, args: argparse.Namespace) -> None:
+    """Point every setting at the fakes and at files under ``workdir``."""
+    env = {
+        "SLACK_BOT_TOKEN": "xoxb-benchmark",
+        "OPENAI_API_KEY": "sk-benchmark",
+        "EMBEDDING_PROVIDER": "fake",
+        "EMBEDDING_MODEL": f"fake-{args.dimensions}",
+        "LLM_PROVIDER": "fake",
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embedding_cache.db"),
+        "METADATA_DB_PATH": os.path.join(workdir, "ingestion_metadata.db"),
+        "METADATA_LEGACY_JSON_PATH": os.path.join(workdir, "ingestion_metadata.json"),
+        "HYBRID_INDEX_PATH": os.path.join(workdir, "lexical_index.db"),
+        "CHANNEL_INDEX_PATH": os.path.join(workdir, "channel_index.json"),
+        "USER_DIRECTORY_PATH": os.path.join(workdir, "user_directory.json"),
+        # Pacing is the fake client's job; the real tier limits would dominate
+        "SLACK_RATE_LIMITS": json.dumps({m: 1e9 for m in ("conversations.history", "conversations.replies", "conversations.list", "users.list")}),
+    }
+    if args.qdrant_url:
+        env["QDRANT_URL"] = args.qdrant_url
+    else:
+        env["QDRANT_PATH"] = os.path.join(workdir, "qdrant")
+    os.environ.update(env)
+
+    from app.config import get_settings
+    from app.processing.tokens import register_encoding
+    from app.providers.registry import register_embeddings_provider, register_llm_provider
+    from benchmarks.fakes import FakeChatProvider, FakeEmbeddingsProvider, fake_encoding
+
+    get_settings.cache_clear()
+    # tiktoken would download its BPE files on first use
+    for name in ("cl100k_base", "o200k_base"):
+        register_encoding(fake_encoding(name))
+    register_embeddings_provider("fake", FakeEmbeddingsProvider(args.dimensions))
+    register_llm_provider("fake", FakeChatProvider(args.llm_latency_ms))
+
+
+def _questions(count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(count):
+        topic, words = rng.choice(list(TOPICS.items()))
+        terms = rng.sample(words.split(), 2)
+        questions.append(f"What did we decide about the {topic} {terms[0]} and {terms[1]}?")
+    return questions
+
+
+def bench_ingest(size: int, args: argparse.Namespace) -> Dict:
+    from app.config import get_settings
+    from app.ingestion.slack_client import SlackIngestionClient, get_user_directory
+    from app.pipelines.ingest import ingest_channel
+    from app.resources import ResourcePool
+    from benchmarks.fakes import FakeWebClient, SyntheticWorkspace
+
+    settings = get_settings()
+    workspace = SyntheticWorkspace({CHANNEL: size}, seed=args.seed)
+    web_client = FakeWebClient(
+        workspace,
+        rate_limit_every=args.rate_limit_every,
+        latency_ms=args.slack_latency_ms,
+    )
+    pool = ResourcePool(settings)
+    pool.get_or_create(
+        "slack_client",
+        settings.slack_bot_token,
+        lambda: SlackIngestionClient(
+            settings,
+            channel_index=pool.channel_index(),
+            rate_limiter=pool.slack_rate_limiter(),
+            user_directory=get_user_directory(settings),
+            web_client=web_client,
+        ),
+    )
+    start = time.perf_counter()
+    try:
+        documents = ingest_channel(CHANNEL, pool=pool)
+        seconds = time.perf_counter() - start
+    finally:
+        # Embedded Qdrant locks its directory; release it for the QA phase
+        pool.close()
+
+    messages = workspace.message_count(CHANNEL)
+    return {
+        "messages": messages,
+        "documents": documents,
+        "seconds": round(seconds, 3),
+        "messages_per_second": round(messages / seconds, 1),
+        "slack_calls": web_client.calls,
+        "slack_rate_limited": web_client.rate_limited,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+async def bench_qa(args: argparse.Namespace) -> Dict:
+    import httpx
+
+    from app.config import get_settings
+    from app.resources import aclose_pool, init_pool
+    from main import app
+
+    init_pool(get_settings())
+    questions = _questions(args.queries + args.warmup, args.seed)
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def ask(client: httpx.AsyncClient, question: str, record: bool) -> None:
+        body = {"channel": CHANNEL, "query": question, "top_k": args.top_k, "use_cache": False}
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/qa", json=body)
+            elapsed = (time.perf_counter() - start) * 1000
+        response.raise_for_status()
+        if record:
+            latencies.append(elapsed)
+            for stage, ms in response.json().get("timings", {}).items():
+                stages.setdefault(stage, []).append(ms)
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for question in questions[:args.warmup]:
+                await ask(client, question, record=False)
+            start = time.perf_counter()
+            await asyncio.gather(*(ask(client, q, record=True) for q in questions[args.warmup:]))
+            wall = time.perf_counter() - start
+    finally:
+        await aclose_pool()
+
+    return {
+        "queries": len(latencies),
+        "concurrency": args.concurrency,
+        "requests_per_second": round(len(latencies) / wall, 1),
+        "p50_ms": _percentile(latencies, 50),
+        "p99_ms": _percentile(latencies, 99),
+        "stages_p50_ms": {stage: _percentile(values, 50) for stage, values in sorted(stages.items())},
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_size(size: int, args: argparse.Namespace) -> Dict:
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory(prefix="bench_e2e_") as workdir:
+        _configure(workdir, args)
+        ingest = bench_ingest(size, args)
+        qa = asyncio.run(bench_qa(args))
+    return {"channel_messages": size, "ingest": ingest, "qa": qa}
+
+
+def _metric(result: Dict, path: str) -> Optional[float]:
+    section, name = path.split(".")
+    return result.get(section, {}).get(name)
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> Dict:
+    """Per-size relative change of each tracked metric; flags changes worse than ``tolerance``."""
+    previous = {r["channel_messages"]: r for r in baseline.get("results", [])}
+    comparison = {"tolerance": tolerance, "regressions": [], "sizes": {}}
+    for result in current["results"]:
+        size = result["channel_messages"]
+        if size not in previous:
+            continue
+        deltas = {}
+        for path, higher_is_better in _COMPARED_METRICS.items():
+            new, old = _metric(result, path), _metric(previous[size], path)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            deltas[path] = {"baseline": old, "current": new, "change": round(change, 4)}
+            if (-change if higher_is_better else change) > tolerance:
+                comparison["regressions"].append(f"{size}: {path} {old} -> {new}")
+        comparison["sizes"][str(size)] = deltas
+    return comparison
+
+
+def _child_argv(args: argparse.Namespace) -> List[str]:
+    """The options a single-size run needs; results and comparison stay in the parent."""
+    argv = []
+    for name in _CHILD_OPTIONS:
+        value = getattr(args, name)
+        if value is not None and value is not False:
+            argv.append(f"--{name.replace('_', '-')}")
+            if value is not True:
+                argv.append(str(value))
+    return argv
+
+
+def _run_in_subprocess(size: int, args: argparse.Namespace) -> Dict:
+    with tempfile.NamedTemporaryFile(suffix=".json") as out:
+        cmd = [
+            sys.executable, "-m", "benchmarks.bench_e2e", *_child_argv(args),
+            "--single-size", str(size), "--result-file", out.name,
+        ]
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        with open(out.name) as f:
+            return json.load(f)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated channel sizes, e.g. 1000,10000,1000000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent /qa requests")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--dimensions", type=int, default=256, help="Fake embedding size")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated LLM call latency")
+    parser.add_argument("--slack-latency-ms", type=float, default=0.0, help="Simulated Slack API latency")
+    parser.add_argument("--rate-limit-every", type=int, default=50, help="Every Nth Slack call is rate limited (0: never)")
+    parser.add_argument("--qdrant-url", default=None, help="Use a Qdrant server instead of embedded local mode")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="Keep INFO logs")
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    parser.add_argument("--baseline", default=None, help="Compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression vs. the baseline")
+    parser.add_argument("--single-size", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single_size is not None:
+        result = run_size(args.single_size, args)
+        with open(args.result_file, "w") as f:
+            json.dump(result, f)
+        return
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    result = {
+        "benchmark": "e2e",
+        "qdrant": args.qdrant_url or "embedded",
+        "dimensions": args.dimensions,
+        "results": [_run_in_subprocess(size, args) for size in sizes],
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            result["comparison"] = compare(result, json.load(f), args.tolerance)
+
+    payload = json.dumps(result, indent=2)
+    print(payload)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+    if result.get("comparison", {}).get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Micro-benchmark for the Slack text normalizer.
+
+Usage: python -m benchmarks.bench_normalize [--messages N] [--output results.json]
+"""
+import argparse
+import json
+import random
+import re
+import time
+from typing import Callable, Dict, List
+
+from app.processing.normalize import SlackNormalizer
+
+_WORDS = (
+    "deploy service rollback incident ticket latency error retry cache queue "
+    "release hotfix database migration alert pager review merge branch build"
+).split()
+
+
+def _legacy_strip(text: str) -> str:
+    """The previous five-pass implementation, kept for comparison."""
+    text = re.sub(r"<@[A-Z0-9]+>", "", text)
+    text = re.sub(r"<#([A-Z0-9]+)\|[^>]+>", r"#\1", text)
+    text = re.sub(r"<([^>|]+)\|[^>]+>", r"\1", text)
+    text = re.sub(r"<([^>]+)>", r"\1", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
+def synthetic_messages(count: int, seed: int = 7) -> List[Dict]:
+    rng = random.Random(seed)
+    messages = []
+    for i in range(count):
+        parts = [rng.choice(_WORDS) for _ in range(rng.randint(3, 40))]
+        if rng.random() < 0.4:
+            parts.insert(rng.randrange(len(parts)), f"<@U{rng.randint(0, 999):06d}>")
+        if rng.random() < 0.2:
+            parts.append(f"<#C{rng.randint(0, 99):06d}|chan-{rng.randint(0, 99)}>")
+        if rng.random() < 0.3:
+            parts.append(f"<https://example.com/{rng.choice(_WORDS)}/{i}|link>")
+        if rng.random() < 0.05:
+            parts.append("```\nfor x in range(10):\n    print(x)\n```")
+        message = {"ts": f"{1700000000 + i}.000100", "text": "  ".join(parts)}
+        if rng.random() < 0.05:
+            message["attachments"] = [{"title": rng.choice(_WORDS), "text": " ".join(parts[:5])}]
+        messages.append(message)
+    return messages
+
+
+def _time(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(count: int, repeat: int) -> Dict:
+    messages = synthetic_messages(count)
+    texts = [m["text"] for m in messages]
+    normalizer = SlackNormalizer(
+        users={f"U{i:06d}": f"user{i}" for i in range(1000)},
+        channels={f"C{i:06d}": f"chan-{i}" for i in range(100)},
+    )
+    timings = {
+        "legacy_multi_pass": _time(lambda: [_legacy_strip(t) for t in texts], repeat),
+        "normalize_many_texts": _time(lambda: normalizer.normalize_many(texts), repeat),
+        "normalize_many_messages": _time(lambda: normalizer.normalize_many(messages), repeat),
+    }
+    return {
+        "benchmark": "normalize",
+        "messages": count,
+        "repeat": repeat,
+        "results": {
+            name: {"seconds": round(seconds, 4), "messages_per_second": round(count / seconds)}
+            for name, seconds in timings.items()
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    result = run(args.messages, args.repeat)
+    payload = json.dumps(result, indent=2)
+    print(payload)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Storage profile benchmark: recall, search latency and memory per profile.
+
+Loads the same synthetic channel (fake embeddings of benchmarks.fakes
+messages) into one collection per storage profile, waits for Qdrant to
+finish indexing, then runs the same queries against each. Recall@k is
+measured against an exact (brute-force, unquantized) search of the same
+collection; memory is the profile's estimated resident size of vectors and
+HNSW graph.
+
+Quantization, HNSW and on-disk settings only exist in a Qdrant server;
+--embedded runs the same code against local mode, which always searches
+exactly, as a smoke test.
+
+Usage: python -m benchmarks.bench_profiles [--points 100000] [--dimensions 1536]
+                                           [--profiles default,small-hot,large-cold,archive]
+                                           [--qdrant-url http://localhost] [--output results.json]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import CollectionStatus, PointStruct, QuantizationSearchParams, SearchParams
+
+from app.config import Settings
+from app.vectorstore.storage_profiles import BUILTIN_PROFILES, StorageProfile, StorageProfiles
+from benchmarks.bench_e2e import _percentile, _questions
+from benchmarks.fakes import FakeEmbeddings, SyntheticWorkspace
+
+CHANNEL = "bench"
+COLLECTION_PREFIX = "bench_profile_"
+
+# Ground truth: every point scored against the original float32 vectors
+_EXACT = SearchParams(exact=True, quantization=QuantizationSearchParams(ignore=True))
+
+
+def _load(client: QdrantClient, name: str, profile: StorageProfile, vectors: List[List[float]], batch_size: int) -> float:
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(collection_name=name, **profile.create_kwargs(len(vectors[0])))
+    start = time.perf_counter()
+    for i in range(0, len(vectors), batch_size):
+        points = [PointStruct(id=j, vector=vectors[j], payload={"i": j}) for j in range(i, min(i + batch_size, len(vectors)))]
+        client.upsert(collection_name=name, points=points, wait=False)
+    return time.perf_counter() - start
+
+
+def _wait_indexed(client: QdrantClient, name: str, timeout: float) -> float:
+    """Seconds until the optimizers are done, so searches hit the finished index."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if client.get_collection(name).status == CollectionStatus.GREEN:
+            break
+        time.sleep(0.5)
+    else:
+        print(f"warning: '{name}' still indexing after {timeout}s", file=sys.stderr)
+    return time.perf_counter() - start
+
+
+def bench_profile(
+    client: QdrantClient,
+    profile: StorageProfile,
+    vectors: List[List[float]],
+    queries: List[List[float]],
+    args: argparse.Namespace,
+) -> Dict:
+    name = COLLECTION_PREFIX + profile.name.replace("-", "_")
+    load_seconds = _load(client, name, profile, vectors, args.batch_size)
+    index_seconds = _wait_indexed(client, name, args.index_timeout)
+    params = profile.search_params()
+
+    def search(query: List[float], search_params: Optional[SearchParams]) -> List[int]:
+        hits = client.search(collection_name=name, query_vector=query, limit=args.top_k, search_params=search_params)
+        return [hit.id for hit in hits]
+
+    for query in queries[:args.warmup]:
+        search(query, params)
+    latencies: List[float] = []
+    recalls: List[float] = []
+    for query in queries[args.warmup:]:
+        expected = set(search(query, _EXACT))
+        start = time.perf_counter()
+        found = search(query, params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(expected.intersection(found)) / max(len(expected), 1))
+    if not args.keep:
+        client.delete_collection(name)
+
+    ram = profile.estimated_ram_bytes(len(vectors), len(vectors[0]))
+    return {
+        "profile": profile.to_dict(),
+        "load_seconds": round(load_seconds, 2),
+        "index_seconds": round(index_seconds, 2),
+        f"recall_at_{args.top_k}": round(sum(recalls) / len(recalls), 4),
+        "p50_ms": _percentile(latencies, 50),
+        "p99_ms": _percentile(latencies, 99),
+        "estimated_ram_mb": round(ram / 2 ** 20, 1),
+    }
+
+
+def _client(args: argparse.Namespace, workdir: str) -> QdrantClient:
+    if args.embedded:
+        return QdrantClient(path=workdir)
+    return QdrantClient(url=args.qdrant_url, port=args.qdrant_port, timeout=600)
+
+
+def _profiles(names: Sequence[str]) -> List[StorageProfile]:
+    # Honours STORAGE_PROFILES overrides and custom profiles from the environment
+    profiles = StorageProfiles(Settings())  # type: ignore[arg-type]
+    return [profiles.get(name) for name in names]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--dimensions", type=int, default=1536, help="Fake embedding size")
+    parser.add_argument("--profiles", default=",".join(BUILTIN_PROFILES), help="Comma-separated profile names")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=512, help="Points per upsert")
+    parser.add_argument("--index-timeout", type=float, default=600, help="Seconds to wait for indexing per profile")
+    parser.add_argument("--qdrant-url", default="http://localhost")
+    parser.add_argument("--qdrant-port", type=int, default=6333)
+    parser.add_argument("--embedded", action="store_true", help="Use embedded local mode (no profile effects)")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    profiles = _profiles([p.strip() for p in args.profiles.split(",") if p.strip()])
+    workspace = SyntheticWorkspace({CHANNEL: args.points}, seed=args.seed)
+    channel_id = workspace.ids[CHANNEL]
+    embeddings = FakeEmbeddings(args.dimensions)
+    vectors = embeddings.embed_documents([workspace.message(channel_id, i)["text"] for i in range(args.points)])
+    queries = embeddings.embed_documents(_questions(args.queries + args.warmup, args.seed))
+
+    with tempfile.TemporaryDirectory(prefix="bench_profiles_") as workdir:
+        client = _client(args, workdir)
+        try:
+            results = [bench_profile(client, profile, vectors, queries, args) for profile in profiles]
+        finally:
+            client.close()
+
+    result = {
+        "benchmark": "profiles",
+        "qdrant": "embedded" if args.embedded else f"{args.qdrant_url}:{args.qdrant_port}",
+        "points": args.points,
+        "dimensions": args.dimensions,
+        "top_k": args.top_k,
+        "results": results,
+    }
+    payload = json.dumps(result, indent=2)
+    print(payload)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+
+
+if __name__ == "__main__":
+    main()
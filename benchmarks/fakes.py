@@ -0,0 +1,327 @@
+"""Offline stand-ins for Slack, the embeddings API, the chat model and tiktoken.
+
+Everything here is deterministic for a given seed, so two benchmark runs see
+the same workspace, the same vectors and the same answers.
+"""
+import asyncio
+import math
+import random
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+import tiktoken
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.slack_response import SlackResponse
+
+from app.config import Settings
+
+TOPICS = {
+    "deploy": "release rollout canary pipeline build artifact staging production",
+    "incident": "outage pager alert latency error timeout postmortem rollback",
+    "database": "postgres migration index replica vacuum query lock schema",
+    "billing": "invoice customer refund subscription plan charge stripe renewal",
+    "hiring": "candidate interview offer onsite recruiter loop feedback role",
+    "oncall": "rotation handoff escalation runbook sev page shift coverage",
+}
+_TOPIC_WORDS = {topic: words.split() for topic, words in TOPICS.items()}
+_FILLER = "the a we should can please today after before check with on for this that it looks".split()
+# Words of the benchmark questions and the RAG prompt, so they count as one token each too
+_PROMPT_WORDS = "what did decide about and question context answer using only provided slack channel".split()
+
+# Workspace clock: message i of a channel is posted at BASE_TS + i seconds
+BASE_TS = 1_600_000_000
+
+
+def _ts(seconds: float) -> str:
+    return f"{seconds:.6f}"
+
+
+class SyntheticWorkspace:
+    """A Slack workspace whose messages are generated on demand from their index.
+
+    Channel ``name`` holds ``size`` top-level messages, one second apart; every
+    ``thread_every``-th message is a thread parent with ``replies_per_thread``
+    replies. Nothing is materialised, so a million-message channel costs no
+    memory until it is paged through.
+    """
+
+    def __init__(
+        self,
+        channels: Dict[str, int],
+        users: int = 200,
+        thread_every: int = 25,
+        replies_per_thread: int = 3,
+        seed: int = 7,
+    ) -> None:
+        self.sizes = dict(channels)
+        self.ids = {name: f"C{i:08d}" for i, name in enumerate(self.sizes)}
+        self.names = {cid: name for name, cid in self.ids.items()}
+        self.users = users
+        self.thread_every = thread_every
+        self.replies_per_thread = replies_per_thread
+        self.seed = seed
+
+    def message_count(self, name: str) -> int:
+        """Top-level messages plus thread replies in a channel."""
+        size = self.sizes[name]
+        parents = -(-size // self.thread_every) if self.thread_every else 0
+        return size + parents * self.replies_per_thread
+
+    def channel_records(self) -> List[Dict]:
+        return [
+            {"id": cid, "name": name, "is_private": False, "is_archived": False}
+            for name, cid in self.ids.items()
+        ]
+
+    def members(self) -> List[Dict]:
+        return [
+            {"id": f"U{i:08d}", "name": f"user{i}", "profile": {"display_name": f"user{i}"}}
+            for i in range(self.users)
+        ]
+
+    def _text(self, rng: random.Random) -> str:
+        topic = rng.choice(list(_TOPIC_WORDS))
+        words = [rng.choice(_TOPIC_WORDS[topic]) if rng.random() < 0.6 else rng.choice(_FILLER)
+                 for _ in range(rng.randint(6, 40))]
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words)), f"<@U{rng.randrange(self.users):08d}>")
+        if rng.random() < 0.1:
+            words.append(f"<https://example.com/{topic}/{rng.randrange(10_000)}|link>")
+        return f"{topic}: " + " ".join(words)
+
+    def message(self, channel_id: str, index: int) -> Dict:
+        rng = random.Random(f"{self.seed}:{channel_id}:{index}")
+        ts = _ts(BASE_TS + index)
+        message = {"type": "message", "ts": ts, "user": f"U{rng.randrange(self.users):08d}", "text": self._text(rng)}
+        if self.thread_every and index % self.thread_every == 0 and self.replies_per_thread:
+            message["thread_ts"] = ts
+            message["reply_count"] = self.replies_per_thread
+            message["latest_reply"] = _ts(BASE_TS + index + self.replies_per_thread / 10)
+        return message
+
+    def replies(self, channel_id: str, thread_ts: str) -> List[Dict]:
+        """The thread parent followed by its replies, oldest first (as conversations.replies returns them)."""
+        index = int(round(float(thread_ts) - BASE_TS))
+        parent = self.message(channel_id, index)
+        thread = [parent]
+        for j in range(1, parent.get("reply_count", 0) + 1):
+            rng = random.Random(f"{self.seed}:{channel_id}:{index}:{j}")
+            thread.append({
+                "type": "message",
+                "ts": _ts(BASE_TS + index + j / 10),
+                "thread_ts": thread_ts,
+                "user": f"U{rng.randrange(self.users):08d}",
+                "text": self._text(rng),
+            })
+        return thread
+
+    def index_range(self, channel_id: str, oldest: Optional[str], latest: Optional[str]) -> range:
+        """Indexes of the messages strictly between ``oldest`` and ``latest``."""
+        size = self.sizes[self.names[channel_id]]
+        lo = math.floor(float(oldest) - BASE_TS) + 1 if oldest else 0
+        hi = math.ceil(float(latest) - BASE_TS) - 1 if latest else size - 1
+        return range(max(lo, 0), min(hi, size - 1) + 1)
+
+
+class FakeWebClient:
+    """The subset of slack_sdk's WebClient the ingestion client calls, served from a SyntheticWorkspace.
+
+    Cursor pagination follows the Slack API. Every ``rate_limit_every``-th call
+    fails with a ``ratelimited`` error carrying ``Retry-After``, and each call
+    can be given an artificial ``latency_ms``.
+    """
+
+    def __init__(
+        self,
+        workspace: SyntheticWorkspace,
+        rate_limit_every: int = 0,
+        retry_after: int = 0,
+        latency_ms: float = 0.0,
+    ) -> None:
+        self.workspace = workspace
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.latency_ms = latency_ms
+        self.calls: Dict[str, int] = {}
+        self.rate_limited = 0
+        self._total_calls = 0
+
+    def _enter(self, method: str) -> None:
+        self._total_calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if self.rate_limit_every and self._total_calls % self.rate_limit_every == 0:
+            self.rate_limited += 1
+            response = SlackResponse(
+                client=self,
+                http_verb="POST",
+                api_url=f"https://slack.com/api/{method}",
+                req_args={},
+                data={"ok": False, "error": "ratelimited"},
+                headers={"Retry-After": str(self.retry_after)},
+                status_code=429,
+            )
+            raise SlackApiError("The request to the Slack API failed.", response)
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+    def conversations_list(self, limit: int = 100, cursor: Optional[str] = None, **_: Any) -> Dict:
+        self._enter("conversations.list")
+        records = self.workspace.channel_records()
+        offset = int(cursor or 0)
+        page = records[offset:offset + limit]
+        cursor = str(offset + len(page)) if offset + len(page) < len(records) else ""
+        return {"ok": True, "channels": page, "response_metadata": {"next_cursor": cursor}}
+
+    def users_list(self, limit: int = 100, cursor: Optional[str] = None, **_: Any) -> Dict:
+        self._enter("users.list")
+        members = self.workspace.members()
+        offset = int(cursor or 0)
+        page = members[offset:offset + limit]
+        cursor = str(offset + len(page)) if offset + len(page) < len(members) else ""
+        return {"ok": True, "members": page, "response_metadata": {"next_cursor": cursor}}
+
+    def conversations_history(
+        self,
+        channel: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        oldest: Optional[str] = None,
+        latest: Optional[str] = None,
+        **_: Any,
+    ) -> Dict:
+        self._enter("conversations.history")
+        indexes = self.workspace.index_range(channel, oldest, latest)
+        offset = int(cursor or 0)
+        # Newest first: the offset counts down from the top of the range
+        page_indexes = indexes[::-1][offset:offset + limit]
+        messages = [self.workspace.message(channel, i) for i in page_indexes]
+        more = offset + len(messages) < len(indexes)
+        return {
+            "ok": True,
+            "messages": messages,
+            "has_more": more,
+            "response_metadata": {"next_cursor": str(offset + len(messages)) if more else ""},
+        }
+
+    def conversations_replies(
+        self,
+        channel: str,
+        ts: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        oldest: Optional[str] = None,
+        **_: Any,
+    ) -> Dict:
+        self._enter("conversations.replies")
+        thread = self.workspace.replies(channel, ts)
+        parent, replies = thread[0], thread[1:]
+        if oldest:
+            replies = [r for r in replies if float(r["ts"]) > float(oldest)]
+        offset = int(cursor or 0)
+        page = replies[offset:offset + limit]
+        more = offset + len(page) < len(replies)
+        return {
+            "ok": True,
+            "messages": [parent] + page,
+            "has_more": more,
+            "response_metadata": {"next_cursor": str(offset + len(page)) if more else ""},
+        }
+
+
+def fake_encoding(name: str = "cl100k_base") -> tiktoken.Encoding:
+    """A real tiktoken encoding that needs no download.
+
+    Byte-level BPE whose merges spell out the synthetic vocabulary, so
+    workspace words are about one token each and anything else falls back
+    to bytes. ``<|endoftext|>`` is its only special token.
+    """
+    ranks = {bytes([i]): i for i in range(256)}
+    words = set(TOPICS) | {w for ws in _TOPIC_WORDS.values() for w in ws} | set(_FILLER) | set(_PROMPT_WORDS)
+    for word in sorted(words | {w.capitalize() for w in words}):
+        for piece in (word.encode(), b" " + word.encode()):
+            # Every substring, so partial merges can always grow into the whole word
+            for size in range(2, len(piece) + 1):
+                for start in range(len(piece) - size + 1):
+                    ranks.setdefault(piece[start:start + size], len(ranks))
+    return tiktoken.Encoding(
+        name=name,
+        pat_str=r"""'s|'t|'re|'ve|'m|'ll|'d| ?\w+| ?[^\s\w]+|\s+(?!\S)|\s+""",
+        mergeable_ranks=ranks,
+        special_tokens={"<|endoftext|>": len(ranks)},
+    )
+
+
+class FakeEmbeddings(Embeddings):
+    """Hashed bag-of-words vectors: texts sharing words land close together."""
+
+    def __init__(self, dimensions: int = 256) -> None:
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for word in text.lower().split():
+            h = zlib.crc32(word.encode())
+            vector[h % self.dimensions] += 1.0 if h & 1 << 31 else -1.0
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class FakeChatModel(BaseChatModel):
+    """Answers with a canned sentence after ``latency_ms``, reporting word-count token usage."""
+
+    latency_ms: float = 0.0
+    answer: str = "Based on the channel history, the team discussed this in the cited messages."
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        prompt_tokens = sum(len(str(m.content).split()) for m in messages)
+        completion_tokens = len(self.answer.split())
+        message = AIMessage(
+            content=self.answer,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return self._result(messages)
+
+
+class FakeEmbeddingsProvider:
+    def __init__(self, dimensions: int = 256) -> None:
+        self.dimensions = dimensions
+
+    def create(self, settings: Settings) -> Embeddings:
+        return FakeEmbeddings(self.dimensions)
+
+
+class FakeChatProvider:
+    def __init__(self, latency_ms: float = 0.0) -> None:
+        self.latency_ms = latency_ms
+
+    def create(self, settings: Settings) -> BaseChatModel:
+        return FakeChatModel(latency_ms=self.latency_ms)
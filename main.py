@@ -1,35 +1,104 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+import threading
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import Optional
 import uvicorn
 import os
+import json
 import logging
+import time
 
 # Setup logging first
-from app.logging_config import setup_logging
-setup_logging("INFO")
-
-from app.api.schemas import QARequest, QAResponse, SourceDoc, ChannelStatsResponse
 from app.config import get_settings
-from app.pipelines.ingest import ingest_channel
-from app.pipelines.qa import answer_question
-from app.ingestion.slack_client import SlackIngestionClient
-from app.storage.metadata import IngestionMetadata
+from app.logging_config import setup_logging, span
+setup_logging(get_settings().log_level, tracing=get_settings().tracing_enabled)
+
+from app.api.schemas import (
+    ChannelStatsResponse,
+    IngestJobResponse,
+    IngestRequest,
+    IngestResponse,
+    MultiChannelQARequest,
+    MultiChannelQAResponse,
+    QARequest,
+    QAResponse,
+    SearchRequest,
+    SearchResponse,
+    SourceDoc,
+)
+from app.metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, REGISTRY
+from app.pipelines.qa import aanswer_across_channels, aanswer_question, astream_answer
+from app.pipelines.search import asearch
+from app.pipelines.scheduler import IngestionJob, JobStatus, get_scheduler, shutdown_scheduler
+from app.resources import aclose_pool, get_pool, init_pool
+from app.vectorstore.collection_registry import CollectionNotIngestedError
 
 logger = logging.getLogger(__name__)
-app = FastAPI(title="Slack Channel Q&A", version="0.1.1")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    pool = init_pool(settings)
+    get_scheduler(settings)
+    if settings.pool_warm_up:
+        # Warm up off the event loop so startup is not blocked on remote services
+        threading.Thread(target=pool.warm_up, name="pool-warm-up", daemon=True).start()
+    yield
+    shutdown_scheduler()
+    await aclose_pool()
+
+
+app = FastAPI(title="Slack Channel Q&A", version="0.1.1", lifespan=lifespan)
+
+
+@app.middleware("http")
+async def record_request(request: Request, call_next):
+    """Request latency by route template, and the root span of each request's trace."""
+    start = time.perf_counter()
+    with span("http_request", method=request.method, path=request.url.path):
+        response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code),
+    )
+    return response
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Prometheus metrics in the text exposition format."""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
 
 
 @app.get("/health")
-def health() -> dict:
-    logger.info("Health check requested")
-    return {"status": "ok"}
+def health(deep: bool = False) -> dict:
+    logger.info(f"Health check requested, deep={deep}")
+    if not deep:
+        return {"status": "ok"}
+    pool = get_pool()
+    resources = pool.health()
+    status = "ok" if all(v in ("ok", "not_initialized") for v in resources.values()) else "degraded"
+    return {
+        "status": status,
+        "resources": resources,
+        "embedding_cache": pool.embedding_cache_stats(),
+        "answer_cache": pool.answer_cache_stats(),
+    }
 
 
 @app.get("/channels")
-def list_channels(include_private: bool = True) -> dict:
+async def list_channels(include_private: bool = True) -> dict:
     logger.info(f"Listing channels, include_private={include_private}")
     try:
-        client = SlackIngestionClient(get_settings())
-        names = client.list_channel_names(include_private=include_private)
+        pool = get_pool()
+        async with pool.semaphore("slack"):
+            names = await pool.async_slack_client().list_channel_names(include_private=include_private)
         logger.info(f"Found {len(names)} channels: {names}")
         return {"channels": names}
     except Exception as e:
@@ -37,24 +106,46 @@ def list_channels(include_private: bool = True) -> dict:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+async def _refresh_before_answer(request: QARequest) -> Optional[IngestionJob]:
+    """Schedule the ingest a QA request asked for, waiting on it per refresh_mode."""
+    if not request.refresh:
+        return None
+    logger.info(f"Scheduling ingestion for channel: {request.channel}, force_full_refresh: {request.force_full_refresh}")
+    scheduler = get_scheduler()
+    job = scheduler.submit(request.channel, force_full_refresh=request.force_full_refresh)
+    if request.refresh_mode == "wait":
+        timeout = request.refresh_timeout or get_settings().qa_refresh_timeout_seconds
+        finished = await scheduler.await_job(job, timeout=timeout)
+        if not finished:
+            logger.info(f"Ingest job {job.job_id} still running, answering from current data")
+        elif job.status == JobStatus.FAILED:
+            logger.error(f"Error during ingestion for channel '{request.channel}': {job.error}")
+            raise HTTPException(status_code=400, detail=job.error)
+        else:
+            logger.info(f"Ingested {job.documents} documents for channel: {request.channel}")
+    return job
+
+
 @app.post("/qa", response_model=QAResponse)
-def qa(request: QARequest) -> QAResponse:
-    logger.info(f"QA request for channel '{request.channel}', query: '{request.query}', refresh: {request.refresh}")
-    settings = get_settings()
+async def qa(request: QARequest) -> QAResponse:
+    logger.info(f"QA request for channel '{request.channel}', refresh: {request.refresh}")
 
-    if request.refresh:
-        try:
-            logger.info(f"Starting ingestion for channel: {request.channel}, force_full_refresh: {request.force_full_refresh}")
-            doc_count = ingest_channel(request.channel, force_full_refresh=request.force_full_refresh)
-            logger.info(f"Ingested {doc_count} documents for channel: {request.channel}")
-        except Exception as e:
-            logger.error(f"Error during ingestion for channel '{request.channel}': {e}")
-            raise HTTPException(status_code=400, detail=str(e))
+    job = await _refresh_before_answer(request)
 
     try:
         logger.info(f"Answering question for channel '{request.channel}' with top_k={request.top_k}")
-        result = answer_question(request.channel, request.query, k=request.top_k)
+        result = await aanswer_question(
+            request.channel,
+            request.query,
+            k=request.top_k,
+            use_cache=request.use_cache,
+            retrieval=request.retrieval,
+            rerank=request.rerank,
+        )
         logger.info(f"Generated answer with {len(result.get('sources', []))} sources")
+    except CollectionNotIngestedError as e:
+        logger.warning(f"QA requested for channel that is not ingested: '{request.channel}'")
+        raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
         logger.error(f"ValueError in QA for channel '{request.channel}': {e}")
         # Likely collection missing or channel not found
@@ -66,21 +157,162 @@ def qa(request: QARequest) -> QAResponse:
     return QAResponse(
         answer=result["answer"],
         sources=[SourceDoc(**s) for s in result["sources"]],
+        timings=result.get("timings", {}),
+        ingest_job_id=job.job_id if job else None,
+        ingest_status=job.status.value if job else None,
+        cache=result.get("cache"),
+        usage=result.get("usage", {}),
+        context=result.get("context", {}),
+    )
+
+
+@app.post("/qa/multi", response_model=MultiChannelQAResponse)
+async def qa_multi(request: MultiChannelQARequest) -> MultiChannelQAResponse:
+    """Answer from several channels (or all of them) with one embedding and one LLM call."""
+    logger.info(f"Cross-channel QA request for channels {request.channels}")
+    try:
+        result = await aanswer_across_channels(request.channels, request.query, k=request.top_k, use_cache=request.use_cache)
+    except CollectionNotIngestedError as e:
+        logger.warning(f"Cross-channel QA requested for channels that are not ingested: {request.channels}")
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        logger.error(f"ValueError in cross-channel QA: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Unexpected error in cross-channel QA: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return MultiChannelQAResponse(
+        answer=result["answer"],
+        sources=[SourceDoc(**s) for s in result["sources"]],
+        timings=result.get("timings", {}),
+        cache=result.get("cache"),
+        usage=result.get("usage", {}),
+        context=result.get("context", {}),
+        channels=result["channels"],
+        missing_channels=result["missing_channels"],
     )
 
 
+@app.post("/search", response_model=SearchResponse)
+async def search(request: SearchRequest) -> SearchResponse:
+    """Scored matching messages with metadata filters; no LLM call."""
+    logger.info(f"Search request for channels {request.channels}")
+    try:
+        result = await asearch(
+            request.query,
+            channels=request.channels,
+            k=request.top_k,
+            offset=request.offset,
+            score_threshold=request.score_threshold,
+            user=request.user,
+            since=request.since,
+            until=request.until,
+            ts=request.ts,
+            thread_ts=request.thread_ts,
+        )
+    except CollectionNotIngestedError as e:
+        logger.warning(f"Search requested for channels that are not ingested: {request.channels}")
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        logger.error(f"ValueError in search: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Unexpected error in search: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return SearchResponse(**result)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/qa/stream")
+async def qa_stream(request: QARequest) -> StreamingResponse:
+    """Server-Sent Events: sources, then answer tokens, then timings and token usage."""
+    logger.info(f"Streaming QA request for channel '{request.channel}', refresh: {request.refresh}")
+    job = await _refresh_before_answer(request)
+    events = astream_answer(
+        request.channel,
+        request.query,
+        k=request.top_k,
+        use_cache=request.use_cache,
+        retrieval=request.retrieval,
+        rerank=request.rerank,
+    )
+
+    # Retrieval runs before the response starts so its errors still map to status codes
+    try:
+        first = await events.__anext__()
+    except CollectionNotIngestedError as e:
+        logger.warning(f"QA requested for channel that is not ingested: '{request.channel}'")
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        logger.error(f"ValueError in QA for channel '{request.channel}': {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Unexpected error in QA for channel '{request.channel}': {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def body():
+        yield _sse(*first)
+        try:
+            async for event, data in events:
+                if event == "done" and job is not None:
+                    data = dict(data, ingest_job_id=job.job_id, ingest_status=job.status.value)
+                yield _sse(event, data)
+        except Exception as e:
+            logger.error(f"Error while streaming answer for channel '{request.channel}': {e}")
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/ingest", response_model=IngestResponse, status_code=202)
+async def ingest(request: IngestRequest) -> IngestResponse:
+    logger.info(
+        f"Ingest requested for channels {request.channels}, all_channels: {request.all_channels}, "
+        f"force_full_refresh: {request.force_full_refresh}"
+    )
+    channels = request.channels or []
+    if request.all_channels:
+        try:
+            pool = get_pool()
+            async with pool.semaphore("slack"):
+                records = await pool.async_slack_client().list_channels(include_private=True)
+        except Exception as e:
+            logger.error(f"Error listing channels for bulk ingest: {e}")
+            raise HTTPException(status_code=400, detail=str(e))
+        channels = [c["name"] for c in records if not c.get("is_archived")]
+    jobs = get_scheduler().submit_many(channels, force_full_refresh=request.force_full_refresh)
+    return IngestResponse(jobs=[IngestJobResponse(**job.to_dict()) for job in jobs])
+
+
+@app.get("/ingest/{job_id}", response_model=IngestJobResponse)
+def ingest_status(job_id: str) -> IngestJobResponse:
+    job = get_scheduler().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingest job not found: {job_id}")
+    return IngestJobResponse(**job.to_dict())
+
+
 @app.get("/channels/{channel}/stats", response_model=ChannelStatsResponse)
 def get_channel_stats(channel: str) -> ChannelStatsResponse:
     logger.info(f"Getting stats for channel: {channel}")
     try:
-        metadata = IngestionMetadata()
+        metadata = get_pool().metadata()
         stats = metadata.get_channel_stats(channel)
         logger.info(f"Channel '{channel}' stats: {stats}")
         return ChannelStatsResponse(
             channel=channel,
             last_timestamp=stats.get("last_timestamp"),
             total_messages=stats.get("total_messages", 0),
-            last_updated=stats.get("last_updated")
+            last_updated=stats.get("last_updated"),
+            recent_jobs=metadata.get_job_history(channel, limit=5),
         )
     except Exception as e:
         logger.error(f"Error getting stats for channel '{channel}': {e}")
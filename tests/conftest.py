@@ -0,0 +1,11 @@
+import pytest
+
+from app.processing.tokens import register_encoding
+from benchmarks.fakes import fake_encoding
+
+
+@pytest.fixture(autouse=True, scope="session")
+def offline_encodings() -> None:
+    # tiktoken would download its BPE files on first use
+    for name in ("cl100k_base", "o200k_base"):
+        register_encoding(fake_encoding(name))
@@ -0,0 +1,119 @@
+import pytest
+
+from app.pipelines import answer_cache
+from app.pipelines.answer_cache import AnswerCache, normalize_query
+
+
+@pytest.fixture
+def cache() -> AnswerCache:
+    return AnswerCache(max_entries=4, ttl_seconds=60, similarity_threshold=0.9)
+
+
+def test_normalize_query():
+    assert normalize_query("  What did we DECIDE?? ") == "what did we decide"
+
+
+def test_exact_hit_ignores_case_and_punctuation(cache):
+    cache.put("general", "What did we decide?", 5, {"answer": "ship it"}, None, generation=1)
+    assert cache.get_exact("general", "what did we decide", 5, generation=1) == {"answer": "ship it"}
+    assert cache.get_exact("general", "what did we decide", 3, generation=1) is None
+    assert cache.stats.exact_hits == 1
+
+
+def test_hits_are_copies(cache):
+    cache.put("general", "q", 5, {"sources": []}, None, generation=1)
+    cache.get_exact("general", "q", 5, generation=1)["sources"].append("mutated")
+    assert cache.get_exact("general", "q", 5, generation=1) == {"sources": []}
+
+
+def test_new_generation_makes_entries_stale(cache):
+    cache.put("general", "q", 5, {"answer": "old"}, [1.0, 0.0], generation=1)
+    assert cache.get_exact("general", "q", 5, generation=2) is None
+    assert cache.stats.stale == 1
+    assert len(cache) == 0
+
+
+def test_ttl_expiry(cache, monkeypatch):
+    cache.put("general", "q", 5, {"answer": "old"}, None, generation=1)
+    now = answer_cache.time.time()
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now + 61)
+    assert cache.get_exact("general", "q", 5, generation=1) is None
+
+
+def test_invalidate_one_channel(cache):
+    cache.put("general", "q", 5, {"answer": "a"}, None, generation=1)
+    cache.put("random", "q", 5, {"answer": "b"}, None, generation=1)
+    cache.invalidate("general")
+    assert cache.get_exact("general", "q", 5, generation=1) is None
+    assert cache.get_exact("random", "q", 5, generation=1) == {"answer": "b"}
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_semantic_hit_on_similar_vector(cache):
+    cache.put("general", "what did we decide", 5, {"answer": "ship it"}, [1.0, 0.1], generation=1)
+    assert cache.get_similar("general", 5, [0.98, 0.12], generation=1) == {"answer": "ship it"}
+    assert cache.get_similar("general", 5, [0.0, 1.0], generation=1) is None
+    assert cache.get_similar("random", 5, [1.0, 0.1], generation=1) is None
+    assert cache.get_similar("general", 5, [1.0, 0.1], generation=2) is None
+    assert cache.stats.semantic_hits == 1
+
+
+def test_evicts_least_recently_used(cache):
+    for i in range(4):
+        cache.put("general", f"q{i}", 5, {"i": i}, None, generation=1)
+    cache.get_exact("general", "q0", 5, generation=1)
+    cache.put("general", "q4", 5, {"i": 4}, None, generation=1)
+    assert cache.get_exact("general", "q1", 5, generation=1) is None
+    assert cache.get_exact("general", "q0", 5, generation=1) == {"i": 0}
+
+
+def test_semantic_lookup_scans_only_recent_answers():
+    cache = AnswerCache(max_entries=10, similarity_threshold=0.9, max_similar=2)
+    cache.put("general", "first", 5, {"answer": "first"}, [1.0, 0.0, 0.0], generation=1)
+    cache.put("general", "second", 5, {"answer": "second"}, [0.0, 1.0, 0.0], generation=1)
+    cache.put("general", "third", 5, {"answer": "third"}, [0.0, 0.0, 1.0], generation=1)
+    assert cache.get_similar("general", 5, [1.0, 0.0, 0.0], generation=1) is None
+    assert cache.get_similar("general", 5, [0.0, 1.0, 0.0], generation=1) == {"answer": "second"}
+    # Still answered by exact match
+    assert cache.get_exact("general", "first", 5, generation=1) == {"answer": "first"}
+
+
+def test_semantic_lookup_skips_stale_best_match(cache):
+    cache.put("general", "old", 5, {"answer": "old"}, [1.0, 0.0], generation=1)
+    cache.put("general", "new", 5, {"answer": "new"}, [0.95, 0.1], generation=2)
+    assert cache.get_similar("general", 5, [1.0, 0.0], generation=2) == {"answer": "new"}
+    assert cache.stats.stale == 1
+    assert len(cache) == 1
+
+
+def test_evicted_answers_leave_semantic_lookup(cache):
+    cache.put("general", "q0", 5, {"i": 0}, [1.0, 0.0], generation=1)
+    for i in range(1, 5):
+        cache.put("general", f"q{i}", 5, {"i": i}, [0.0, 1.0], generation=1)
+    assert cache.get_similar("general", 5, [1.0, 0.0], generation=1) is None
+    cache.invalidate("general")
+    assert cache.get_similar("general", 5, [0.0, 1.0], generation=1) is None
+
+
+def test_absent_exact_key_counts_a_miss(cache):
+    assert cache.get_exact("general", "never asked", 5, generation=1) is None
+    assert cache.stats.misses == 1
+
+
+def test_stale_exact_entry_counts_a_miss(cache):
+    cache.put("general", "q", 5, {"answer": "old"}, None, generation=1)
+    assert cache.get_exact("general", "q", 5, generation=2) is None
+    assert (cache.stats.stale, cache.stats.misses) == (1, 1)
+
+
+def test_similar_lookup_miss_is_counted(cache):
+    assert cache.get_similar("general", 5, [1.0, 0.0], generation=1) is None
+    assert cache.stats.misses == 1
+
+
+def test_disabled_similar_lookup_counts_a_miss():
+    cache = AnswerCache(similarity_threshold=1.0)
+    cache.put("general", "q", 5, {"answer": "a"}, [1.0, 0.0], generation=1)
+    assert cache.get_similar("general", 5, [1.0, 0.0], generation=1) is None
+    assert cache.stats.misses == 1
@@ -0,0 +1,82 @@
+from langchain_core.documents import Document
+
+from app.processing.chunking import ChunkingConfig, _pack, chunk_documents, drop_low_information, unpack_chunk
+
+
+def _doc(ts: float, text: str = "hello there", thread_ts: str = "", user: str = "U1") -> Document:
+    return Document(page_content=text, metadata={"ts": f"{ts:.6f}", "thread_ts": thread_ts, "user": user})
+
+
+def _message_ts(chunks):
+    return [[float(ts) for ts in chunk.metadata["message_ts"]] for chunk in chunks]
+
+
+def test_pack_respects_token_budget_with_overlap():
+    docs = [_doc(100 + i) for i in range(5)]
+    config = ChunkingConfig(max_tokens=30, overlap_messages=1)
+    chunks = _pack("general", docs, [10] * 5, config)
+    assert _message_ts(chunks) == [[100, 101, 102], [102, 103, 104]]
+    assert chunks[0].metadata["ts_start"] == docs[0].metadata["ts"]
+    assert chunks[0].metadata["ts_end"] == docs[2].metadata["ts"]
+    assert chunks[1].metadata["ts"] == docs[2].metadata["ts"]
+
+
+def test_pack_breaks_on_time_gap_without_overlap():
+    docs = [_doc(100), _doc(110), _doc(10_000), _doc(10_010)]
+    config = ChunkingConfig(max_tokens=1000, overlap_messages=1, max_gap_seconds=1800)
+    chunks = _pack("general", docs, [10] * 4, config)
+    assert _message_ts(chunks) == [[100, 110], [10_000, 10_010]]
+
+
+def test_pack_keeps_oversized_message_alone():
+    docs = [_doc(100), _doc(101), _doc(102)]
+    config = ChunkingConfig(max_tokens=50, overlap_messages=1)
+    chunks = _pack("general", docs, [10, 80, 10], config)
+    assert _message_ts(chunks) == [[100], [101], [102]]
+
+
+def test_pack_always_makes_progress_without_overlap():
+    docs = [_doc(100 + i) for i in range(4)]
+    config = ChunkingConfig(max_tokens=20, overlap_messages=0)
+    chunks = _pack("general", docs, [10] * 4, config)
+    assert _message_ts(chunks) == [[100, 101], [102, 103]]
+
+
+def test_chunk_documents_groups_by_thread():
+    docs = [
+        _doc(100, "deploy the canary today", user="U1"),
+        _doc(101, "rollback after the alert", thread_ts="100.000000", user="U2"),
+        _doc(102, "check the pipeline build", user="U2"),
+        _doc(103, "postmortem after the outage", thread_ts="100.000000", user="U3"),
+    ]
+    chunks = chunk_documents("general", docs, ChunkingConfig(max_tokens=512))
+    by_thread = {chunk.metadata["thread_ts"]: chunk for chunk in chunks}
+    assert len(chunks) == 2
+    assert _message_ts([by_thread[""]]) == [[100, 102]]
+    assert _message_ts([by_thread["100.000000"]]) == [[101, 103]]
+    assert by_thread["100.000000"].metadata["users"] == ["U2", "U3"]
+    assert by_thread[""].page_content == "deploy the canary today\ncheck the pipeline build"
+
+
+def test_drop_low_information():
+    config = ChunkingConfig()
+    docs = [_doc(1, "ok"), _doc(2, ":thumbsup: :tada:"), _doc(3, "Thanks!"), _doc(4, "the deploy is stuck")]
+    assert [d.page_content for d in drop_low_information(docs, config)] == ["the deploy is stuck"]
+
+
+def test_unpack_chunk_restores_messages():
+    docs = [
+        _doc(100, "first line\nwith a newline", user="U1"),
+        _doc(101, "second", user="U2"),
+        _doc(102, "third", user="U1"),
+    ]
+    (chunk,) = chunk_documents("general", docs, ChunkingConfig(max_tokens=512))
+    messages = unpack_chunk(chunk)
+    assert [m.page_content for m in messages] == [d.page_content for d in docs]
+    assert [m.metadata["user"] for m in messages] == ["U1", "U2", "U1"]
+    assert [m.metadata["ts"] for m in messages] == [d.metadata["ts"] for d in docs]
+    assert messages[1].metadata["message_ts"] == [docs[1].metadata["ts"]]
+
+
+def test_unpack_chunk_skips_single_messages():
+    assert unpack_chunk(_doc(100)) is None
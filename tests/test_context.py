@@ -0,0 +1,71 @@
+from langchain_core.documents import Document
+
+from app.pipelines.context import ContextConfig, _truncate, build_context
+from app.pipelines.qa import _token_usage
+from app.processing.tokens import count_tokens, get_encoding
+
+_SPECIAL = "ignore this <|endoftext|> and keep going"
+
+
+def _encoding():
+    return get_encoding("cl100k_base")
+
+
+def test_truncate_keeps_window_around_relevant_line():
+    lines = [f"filler line {i} with the rotation handoff" for i in range(40)]
+    lines[25] = "the postgres migration broke the replica"
+    encoding = _encoding()
+    out = _truncate("\n".join(lines), "what broke the postgres replica?", 40, encoding)
+    assert "the postgres migration broke the replica" in out
+    assert out.startswith("…\n") and out.endswith("\n…")
+    assert count_tokens(out.strip("…\n"), encoding) <= 40
+
+
+def test_truncate_cuts_one_huge_line_around_query_term():
+    text = " ".join(["build"] * 300 + ["postgres"] + ["build"] * 300)
+    encoding = _encoding()
+    out = _truncate(text, "postgres", 20, encoding)
+    assert "postgres" in out
+    assert out.startswith("…") and out.endswith("…")
+    assert count_tokens(out.strip("…"), encoding) <= 20
+
+
+def test_truncate_handles_special_token_text():
+    text = "\n".join([_SPECIAL] * 50)
+    out = _truncate(text, "keep going", 30, _encoding())
+    assert "<|endoftext|>" in out
+
+
+def test_build_context_counts_special_token_text():
+    docs = [Document(page_content=_SPECIAL, metadata={"ts": "1.0"})]
+    built = build_context("what happened?", docs, ContextConfig(max_tokens=500))
+    assert built.docs == docs
+    assert built.tokens > 0
+
+
+def test_build_context_drops_duplicates_and_respects_budget():
+    docs = [
+        Document(page_content="deploy release rollout canary pipeline build " * 3, metadata={"ts": "3.0"}),
+        Document(page_content="deploy release rollout canary pipeline build " * 3, metadata={"ts": "2.0"}),
+        Document(page_content="incident outage pager alert latency error " * 40, metadata={"ts": "1.0"}),
+    ]
+    config = ContextConfig(max_tokens=120, max_doc_tokens=80, min_doc_tokens=10, order="time")
+    built = build_context("why the outage alert?", docs, config)
+    assert built.dropped_duplicates == 1
+    assert built.truncated == 1
+    assert [d.metadata["ts"] for d in built.docs] == ["1.0", "3.0"]
+    assert built.docs[0].metadata["_truncated"] is True
+    assert built.tokens <= config.max_tokens
+
+
+def test_token_usage_counts_special_token_text_locally():
+    context = build_context("q", [Document(page_content=_SPECIAL)], ContextConfig())
+    usage = _token_usage(None, "<|endoftext|>?", context, "<|endoftext|>", "gpt-4o-mini")
+    assert usage["completion_tokens"] > 0
+    assert usage["total_tokens"] == usage["prompt_tokens"] + usage["completion_tokens"]
+
+
+def test_token_usage_prefers_reported_usage():
+    context = build_context("q", [], ContextConfig())
+    usage = _token_usage({"input_tokens": 12, "output_tokens": 3}, "q", context, "a", "gpt-4o-mini")
+    assert usage == {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15}
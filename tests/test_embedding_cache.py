@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from typing import Dict, List, Sequence
+
+import pytest
+
+from app.providers.embedding_cache import CachedEmbeddings, SQLiteEmbeddingStore
+from benchmarks.fakes import FakeEmbeddings
+
+
+class _RecordingStore(SQLiteEmbeddingStore):
+    """Records the thread of every SQLite call."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        self.threads: List[int] = []
+
+    def get_many(self, model: str, keys: Sequence[str]) -> Dict[str, List[float]]:
+        self.threads.append(threading.get_ident())
+        return super().get_many(model, keys)
+
+    def put_many(self, model, items) -> None:
+        self.threads.append(threading.get_ident())
+        super().put_many(model, items)
+
+
+class _CountingEmbeddings(FakeEmbeddings):
+    def __init__(self) -> None:
+        super().__init__(8)
+        self.embedded: List[str] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = _RecordingStore(str(tmp_path / "embeddings.db"))
+    yield store
+    store.close()
+
+
+def test_identical_texts_embedded_once(store):
+    inner = _CountingEmbeddings()
+    cached = CachedEmbeddings(inner, "fake", store)
+    first = cached.embed_documents(["deploy", "rollback", "deploy"])
+    assert inner.embedded == ["deploy", "rollback"]
+    assert first[0] == first[2]
+    assert cached.embed_documents(["rollback"]) == [first[1]]
+    assert cached.stats.memory_hits == 1
+
+
+def test_persistent_tier_survives_restart(store):
+    CachedEmbeddings(_CountingEmbeddings(), "fake", store).embed_documents(["deploy"])
+    inner = _CountingEmbeddings()
+    cached = CachedEmbeddings(inner, "fake", store)
+    cached.embed_documents(["deploy"])
+    assert inner.embedded == []
+    assert cached.stats.disk_hits == 1
+    # Vectors are cached per model
+    CachedEmbeddings(inner, "other", store).embed_documents(["deploy"])
+    assert inner.embedded == ["deploy"]
+
+
+def test_async_paths_keep_sqlite_off_the_event_loop(store):
+    cached = CachedEmbeddings(_CountingEmbeddings(), "fake", store)
+
+    async def run():
+        loop_thread = threading.get_ident()
+        vectors = await cached.aembed_documents(["deploy", "rollback"])
+        query = await cached.aembed_query("deploy")
+        return loop_thread, vectors, query
+
+    loop_thread, vectors, query = asyncio.run(run())
+    assert query == vectors[0]
+    assert store.threads and loop_thread not in store.threads
@@ -0,0 +1,106 @@
+import asyncio
+from typing import List
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from app.providers import embedding_executor
+from app.providers.embedding_executor import EmbeddingExecutor
+
+
+class _ApiError(Exception):
+    def __init__(self, status_code: int, retry_after: str = "") -> None:
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"status_code": status_code, "headers": {"retry-after": retry_after}})()
+
+
+class _Inner(Embeddings):
+    """Embeds "<i>" as [i]; fails batches larger than ``max_batch`` and the first ``errors`` calls."""
+
+    def __init__(self, max_batch: int = 1000, errors: List[Exception] = ()) -> None:
+        self.max_batch = max_batch
+        self.errors = list(errors)
+        self.calls: List[int] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(len(texts))
+        if self.errors:
+            raise self.errors.pop(0)
+        if len(texts) > self.max_batch:
+            raise _ApiError(400)
+        return [[float(t)] for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(embedding_executor, "_MIN_BACKOFF_SECONDS", 0.0)
+
+
+def _texts(n: int) -> List[str]:
+    return [str(i) for i in range(n)]
+
+
+def _executor(inner: Embeddings, **kwargs) -> EmbeddingExecutor:
+    kwargs.setdefault("requests_per_minute", 1_000_000)
+    kwargs.setdefault("tokens_per_minute", 100_000_000)
+    return EmbeddingExecutor(inner, **kwargs)
+
+
+def test_concurrent_batches_keep_input_order():
+    inner = _Inner()
+    executor = _executor(inner, max_batch_size=7, concurrency=4)
+    assert executor.embed_documents(_texts(100)) == [[float(i)] for i in range(100)]
+    assert max(inner.calls) <= 7
+    assert sum(inner.calls) == 100
+
+
+def test_batches_bounded_by_tokens():
+    inner = _Inner()
+    executor = _executor(inner, max_batch_size=100, max_batch_tokens=3, concurrency=1)
+    executor.embed_documents(_texts(9))
+    assert inner.calls == [3, 3, 3]
+
+
+def test_failed_batch_is_split_and_bound_shrinks():
+    inner = _Inner(max_batch=2)
+    executor = _executor(inner, max_batch_size=8, max_batch_tokens=8, concurrency=1)
+    assert executor.embed_documents(_texts(8)) == [[float(i)] for i in range(8)]
+    assert inner.calls[:3] == [8, 4, 2]
+    assert executor.batch_tokens < 8
+
+
+def test_rate_limited_batch_is_resent_whole():
+    inner = _Inner(errors=[_ApiError(429, retry_after="0.01")])
+    executor = _executor(inner, max_batch_size=8, concurrency=1)
+    assert executor.embed_documents(_texts(8)) == [[float(i)] for i in range(8)]
+    assert inner.calls == [8, 8]
+    assert executor.requests.pauses == 1
+    assert executor.batch_tokens == executor.max_batch_tokens
+
+
+def test_fatal_error_is_not_retried():
+    inner = _Inner(errors=[_ApiError(401)])
+    executor = _executor(inner, concurrency=1)
+    with pytest.raises(_ApiError):
+        executor.embed_documents(_texts(4))
+    assert inner.calls == [4]
+
+
+def test_gives_up_after_max_retries():
+    inner = _Inner(errors=[_ApiError(500)] * 10)
+    executor = _executor(inner, max_batch_size=1, concurrency=1, max_retries=2)
+    with pytest.raises(_ApiError):
+        executor.embed_documents(_texts(1))
+    assert inner.calls == [1, 1, 1]
+
+
+def test_async_split_keeps_order():
+    inner = _Inner(max_batch=3)
+    executor = _executor(inner, max_batch_size=5, max_batch_tokens=10, concurrency=2)
+    vectors = asyncio.run(executor.aembed_documents(_texts(20)))
+    assert vectors == [[float(i)] for i in range(20)]
+    assert asyncio.run(executor.aembed_query("7")) == [7.0]
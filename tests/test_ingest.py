@@ -0,0 +1,92 @@
+import pytest
+from qdrant_client import QdrantClient
+
+from app.config import Settings
+from app.pipelines.ingest import replace_messages
+from app.processing.chunking import ChunkingConfig, chunk_documents
+from app.processing.clean import messages_to_documents, point_id
+from app.vectorstore.qdrant_store import QdrantStore
+from benchmarks.fakes import FakeEmbeddings
+
+CHANNEL = "general"
+CHANNEL_ID = "C0001"
+TOPICS = ["deploy canary", "postgres migration", "invoice refund", "oncall rotation", "hiring loop", "pager alert"]
+
+
+def _messages():
+    return [
+        {"ts": f"{1_600_000_000 + i}.000000", "user": f"U{i}", "text": f"message {i} about the {topic}"}
+        for i, topic in enumerate(TOPICS)
+    ]
+
+
+@pytest.fixture
+def store():
+    embeddings = FakeEmbeddings(64)
+    store = QdrantStore(Settings(), embeddings, client=QdrantClient(location=":memory:"))
+    yield store
+    store.client.close()
+
+
+@pytest.fixture
+def config() -> ChunkingConfig:
+    # Two messages per chunk without overlap, so a neighbour lives in one chunk only: [0, 1], [2, 3], [4, 5]
+    return ChunkingConfig(max_tokens=25, overlap_messages=0, min_chars=1, drop_patterns=[])
+
+
+def _ingest(store: QdrantStore, docs, config: ChunkingConfig) -> None:
+    chunks = chunk_documents(CHANNEL, docs, config)
+    assert all(c.metadata["message_count"] == 2 for c in chunks)
+    store.ensure_collection(CHANNEL, vector_size=64)
+    vectors = store.embeddings.embed_documents([c.page_content for c in chunks])
+    store.upsert_documents(CHANNEL, chunks, vectors, ids=[point_id(CHANNEL_ID, c.metadata["ts"]) for c in chunks])
+
+
+def _stored(store: QdrantStore):
+    points, _ = store.client.scroll(CHANNEL, limit=100, with_payload=True)
+    return [p.payload["metadata"] for p in points], "\n".join(p.payload["page_content"] for p in points)
+
+
+def _search(store: QdrantStore, text: str):
+    return store.search(CHANNEL, store.embeddings.embed_query(text), k=1)[0].page_content
+
+
+def test_edit_keeps_neighbours_searchable(store, config):
+    messages = _messages()
+    _ingest(store, messages_to_documents(CHANNEL, messages), config)
+
+    edited = dict(messages[2], text="message 2 about the stripe renewal")
+    replacement = messages_to_documents(CHANNEL, [edited])
+    replace_messages(store, store.embeddings, CHANNEL, CHANNEL_ID, [edited["ts"]], replacement, config)
+
+    payloads, text = _stored(store)
+    stored_ts = {ts for meta in payloads for ts in meta["message_ts"]}
+    assert stored_ts == {m["ts"] for m in messages}
+    assert "invoice refund" not in text
+    assert "stripe renewal" in _search(store, "stripe renewal")
+    # The neighbour that shared the edited message's chunk is still found
+    assert "oncall rotation" in _search(store, "oncall rotation")
+
+
+def test_delete_keeps_neighbours_searchable(store, config):
+    messages = _messages()
+    _ingest(store, messages_to_documents(CHANNEL, messages), config)
+
+    replace_messages(store, store.embeddings, CHANNEL, CHANNEL_ID, [messages[3]["ts"]], [], config)
+
+    payloads, text = _stored(store)
+    stored_ts = {ts for meta in payloads for ts in meta["message_ts"]}
+    assert stored_ts == {m["ts"] for m in messages} - {messages[3]["ts"]}
+    assert "oncall rotation" not in text
+    assert "invoice refund" in _search(store, "invoice refund")
+
+
+def test_edit_of_unstored_message_is_added(store, config):
+    messages = _messages()
+    _ingest(store, messages_to_documents(CHANNEL, messages[:2]), config)
+
+    replacement = messages_to_documents(CHANNEL, [messages[4]])
+    replace_messages(store, store.embeddings, CHANNEL, CHANNEL_ID, [messages[4]["ts"]], replacement, config)
+
+    payloads, _ = _stored(store)
+    assert {ts for meta in payloads for ts in meta["message_ts"]} == {m["ts"] for m in messages[:2]} | {messages[4]["ts"]}
@@ -0,0 +1,115 @@
+import json
+import sqlite3
+
+import pytest
+from langchain_core.documents import Document
+from qdrant_client import QdrantClient
+
+from app.config import Settings
+from app.vectorstore.lexical_index import LexicalIndex, fts_query
+from app.vectorstore.qdrant_store import QdrantStore
+from benchmarks.fakes import FakeEmbeddings
+
+
+def _doc(ts: str, text: str) -> Document:
+    return Document(page_content=text, metadata={"ts": ts, "message_ts": [ts]})
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.db"))
+    yield index
+    index.close()
+
+
+def test_fts_query_quotes_terms():
+    assert fts_query('INC-1234 OR "drop" db-01.prod') == '"inc-1234" OR "or" OR "drop" OR "db-01.prod"'
+    assert fts_query("?!") == ""
+
+
+def test_search_is_scoped_to_the_channel(index):
+    index.upsert("ops", ["p1", "p2"], [_doc("1.0", "INC-1234 paged the db team"), _doc("2.0", "lunch plans")])
+    index.upsert("sales", ["p3"], [_doc("3.0", "INC-1234 came up with a customer")])
+    hits = index.search("ops", "INC-1234", k=5)
+    assert [d.metadata["_id"] for d in hits] == ["p1"]
+    assert hits[0].metadata["_bm25"] > 0
+    assert index.search("random", "INC-1234") == []
+    assert index.has_channel("ops") and not index.has_channel("random")
+
+
+def test_instances_sharing_a_database_see_each_others_channels(tmp_path, index):
+    # Another process (export worker, CLI) opened the same database before the channel existed
+    other = LexicalIndex(str(tmp_path / "lexical.db"))
+    try:
+        assert not other.has_channel("ops")
+        index.upsert("ops", ["p1"], [_doc("1.0", "INC-1234 paged the db team")])
+        assert other.has_channel("ops")
+        assert [d.metadata["_id"] for d in other.search("ops", "INC-1234")] == ["p1"]
+        other.upsert("ops", ["p2"], [_doc("2.0", "INC-1234 resolved")])
+        other.upsert("sales", ["p3"], [_doc("3.0", "INC-1234 came up with a customer")])
+        assert {d.metadata["_id"] for d in index.search("ops", "INC-1234")} == {"p1", "p2"}
+        assert [d.metadata["_id"] for d in index.search("sales", "INC-1234")] == ["p3"]
+    finally:
+        other.close()
+
+
+def test_term_statistics_are_per_channel(index):
+    # "deploy" is rare in ops but everywhere in releases; only ops' rows should shape its score
+    index.upsert("ops", ["o1", "o2"], [_doc("1.0", "deploy failed"), _doc("2.0", "pager noise")])
+    alone = index.search("ops", "deploy")[0].metadata["_bm25"]
+    index.upsert("releases", [f"r{i}" for i in range(50)], [_doc(str(i), "deploy deploy") for i in range(50)])
+    assert index.search("ops", "deploy")[0].metadata["_bm25"] == pytest.approx(alone)
+
+
+def test_upsert_replaces_and_deletes_follow_messages(index):
+    index.upsert("ops", ["p1", "p2"], [_doc("1.0", "old text"), Document(page_content="chunk text", metadata={"message_ts": ["2.0", "3.0"]})])
+    index.upsert("ops", ["p1"], [_doc("1.0", "new text")])
+    assert index.search("ops", "old") == []
+    index.delete_messages("ops", ["3.0"])
+    assert index.search("ops", "chunk") == []
+    assert index.prune("ops", {"other"}) == 1
+    assert index.search("ops", "new") == []
+
+
+def test_splits_legacy_workspace_table(tmp_path):
+    path = tmp_path / "lexical.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE VIRTUAL TABLE points USING fts5(text, channel UNINDEXED, point_id UNINDEXED, metadata UNINDEXED)")
+    conn.executemany(
+        "INSERT INTO points VALUES (?, ?, ?, ?)",
+        [("postgres replica lag", "ops", "p1", json.dumps({"ts": "1.0"})), ("postgres pricing", "sales", "p2", "{}")],
+    )
+    conn.commit()
+    conn.close()
+
+    index = LexicalIndex(str(path))
+    try:
+        assert [d.metadata["_id"] for d in index.search("ops", "postgres")] == ["p1"]
+        assert [d.metadata["_id"] for d in index.search("sales", "postgres")] == ["p2"]
+    finally:
+        index.close()
+    reopened = LexicalIndex(str(path))
+    try:
+        assert [d.metadata["_id"] for d in reopened.search("ops", "postgres")] == ["p1"]
+    finally:
+        reopened.close()
+
+
+def test_rebuild_from_qdrant_payloads(tmp_path):
+    embeddings = FakeEmbeddings(16)
+    store = QdrantStore(Settings(), embeddings, client=QdrantClient(location=":memory:"))
+    docs = [_doc("1.0", "INC-1234 paged the db team"), _doc("2.0", "lunch plans")]
+    ids = ["00000000-0000-0000-0000-000000000001", "00000000-0000-0000-0000-000000000002"]
+    store.ensure_collection("ops", vector_size=16)
+    store.upsert_documents("ops", docs, embeddings.embed_documents([d.page_content for d in docs]), ids=ids)
+
+    store.lexical = LexicalIndex(str(tmp_path / "lexical.db"))
+    try:
+        store.lexical.upsert("ops", ["stale"], [_doc("9.0", "INC-1234 stale row")])
+        assert store.rebuild_lexical("ops") == 2
+        hits = store.lexical.search("ops", "INC-1234")
+        assert [d.metadata["_id"] for d in hits] == [ids[0]]
+        assert hits[0].metadata["ts"] == "1.0" and "_score" not in hits[0].metadata
+    finally:
+        store.lexical.close()
+        store.client.close()
@@ -0,0 +1,79 @@
+import pytest
+
+from app.storage.metadata import IngestionMetadata
+
+
+@pytest.fixture
+def metadata(tmp_path):
+    metadata = IngestionMetadata(str(tmp_path / "metadata.db"), legacy_json_path=None)
+    yield metadata
+    metadata.close()
+
+
+def test_interrupted_run_resumes_from_checkpoint(tmp_path, metadata):
+    metadata.commit_batch("general", "100.0", "300.0", "250.0", 10, {"120.0": "260.0"})
+    metadata.close()
+
+    reopened = IngestionMetadata(str(tmp_path / "metadata.db"), legacy_json_path=None)
+    try:
+        assert reopened.get_pending_run("general") == {"floor": "100.0", "high": "300.0", "low": "250.0"}
+        assert reopened.get_thread_watermarks("general") == {"120.0": "260.0"}
+        assert reopened.get_last_timestamp("general") is None
+        assert reopened.get_channel_stats("general")["total_messages"] == 10
+    finally:
+        reopened.close()
+
+
+def test_complete_run_clears_checkpoint_and_advances_watermark(metadata):
+    metadata.commit_batch("general", None, "300.0", "250.0", 10)
+    metadata.complete_run("general", "300.0")
+    assert metadata.get_pending_run("general") is None
+    assert metadata.get_last_timestamp("general") == "300.0"
+    assert metadata.list_channels() == ["general"]
+
+
+def test_watermark_never_moves_backwards(metadata):
+    metadata.complete_run("general", "300.0")
+    metadata.complete_run("general", "200.0")
+    assert metadata.get_last_timestamp("general") == "300.0"
+
+
+def test_generation_moves_on_every_commit(metadata):
+    assert metadata.get_channel_generation("general") == 0
+    metadata.commit_batch("general", None, "300.0", "250.0", 1)
+    metadata.complete_run("general", "300.0")
+    assert metadata.get_channel_generation("general") == 2
+    assert metadata.get_channel_generation("random") == 0
+
+
+def test_channels_are_independent(metadata):
+    metadata.commit_batch("general", None, "300.0", "250.0", 5)
+    metadata.complete_run("random", "50.0")
+    assert metadata.get_pending_run("random") is None
+    assert metadata.get_pending_run("general") is not None
+    assert metadata.get_last_timestamp("general") is None
+
+
+def test_seeded_thread_watermarks_only_move_forward(metadata):
+    metadata.update_thread_watermarks("general", {"100.0": "150.0"})
+    metadata.seed_watermarks("general", "120.0", 3, {"100.0": "140.0", "110.0": "115.0"})
+    assert metadata.get_thread_watermarks("general") == {"100.0": "150.0", "110.0": "115.0"}
+    assert metadata.get_last_timestamp("general") == "120.0"
+
+
+def test_reseeding_does_not_double_count_messages(metadata):
+    metadata.seed_watermarks("general", "120.0", 30)
+    metadata.seed_watermarks("general", "120.0", 30)
+    assert metadata.get_channel_stats("general")["total_messages"] == 30
+
+
+def test_resumed_run_keeps_the_interrupted_runs_high(metadata):
+    metadata.commit_batch("general", "100.0", "300.0", "250.0", 10)
+    # The resumed run fetches (100.0, 250.0) and sees its own, lower, high
+    metadata.commit_batch("general", "100.0", "240.0", "200.0", 5)
+    assert metadata.get_pending_run("general") == {"floor": "100.0", "high": "300.0", "low": "200.0"}
+    metadata.complete_run("general", metadata.get_pending_run("general")["high"])
+    assert metadata.get_last_timestamp("general") == "300.0"
+    # A new run after completion starts from its own high
+    metadata.commit_batch("general", "300.0", "350.0", "320.0", 3)
+    assert metadata.get_pending_run("general")["high"] == "350.0"
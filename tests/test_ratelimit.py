@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from app import ratelimit
+from app.ratelimit import TokenBucket
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> _Clock:
+    clock = _Clock()
+    monkeypatch.setattr(ratelimit, "time", clock)
+    return clock
+
+
+def test_burst_up_to_capacity_then_waits(clock):
+    bucket = TokenBucket(rate_per_minute=60, capacity=2)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(1.0)
+    assert bucket.waited_seconds == pytest.approx(1.0)
+
+
+def test_refills_at_rate(clock):
+    bucket = TokenBucket(rate_per_minute=120, capacity=1)
+    bucket.acquire()
+    clock.now += 0.5
+    assert bucket.acquire() == 0
+
+
+def test_large_reservation_goes_negative(clock):
+    bucket = TokenBucket(rate_per_minute=60, capacity=1)
+    assert bucket.acquire(4) == pytest.approx(3.0)
+    # The next caller queues behind the whole reservation
+    assert bucket.acquire() == pytest.approx(1.0)
+
+
+def test_pause_holds_back_every_caller(clock):
+    bucket = TokenBucket(rate_per_minute=6000, capacity=100)
+    bucket.pause(5)
+    assert bucket.acquire() == pytest.approx(5.0)
+    assert bucket.pauses == 1
+    assert bucket.acquire() == 0
+
+
+def test_acquire_async(clock, monkeypatch):
+    async def sleep(seconds: float) -> None:
+        clock.sleep(seconds)
+
+    monkeypatch.setattr(ratelimit.asyncio, "sleep", sleep)
+    bucket = TokenBucket(rate_per_minute=60, capacity=1)
+    assert asyncio.run(bucket.acquire_async()) == 0
+    assert asyncio.run(bucket.acquire_async()) == pytest.approx(1.0)
+    assert clock.now == pytest.approx(1001.0)
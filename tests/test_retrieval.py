@@ -0,0 +1,44 @@
+import pytest
+from langchain_core.documents import Document
+
+from app.pipelines.retrieval import mmr, rrf_fuse
+
+
+def _doc(point_id: str, text: str = "") -> Document:
+    return Document(page_content=text or point_id, metadata={"_id": point_id})
+
+
+def test_rrf_fuse_rewards_agreement():
+    dense = [_doc("a"), _doc("b"), _doc("c")]
+    keyword = [_doc("c"), _doc("d"), _doc("a")]
+    fused = rrf_fuse([dense, keyword], k=60)
+    assert [d.metadata["_id"] for d in fused] == ["a", "c", "b", "d"]
+    assert fused[0].metadata["_rrf"] == pytest.approx(1 / 61 + 1 / 63)
+    assert fused[-1].metadata["_rrf"] == pytest.approx(1 / 62)
+
+
+def test_rrf_fuse_keeps_first_ranking_metadata():
+    dense = [Document(page_content="dense", metadata={"_id": "a", "source": "dense"})]
+    keyword = [Document(page_content="keyword", metadata={"_id": "a", "source": "keyword"})]
+    fused = rrf_fuse([dense, keyword])
+    assert len(fused) == 1
+    assert fused[0].metadata["source"] == "dense"
+
+
+def test_mmr_skips_near_duplicates():
+    docs = [_doc("a"), _doc("a2"), _doc("b")]
+    vectors = {"a": [1.0, 0.0], "a2": [0.99, 0.01], "b": [0.6, 0.8]}
+    picked = mmr(docs, [1.0, 0.0], vectors, k=2, lambda_mult=0.3)
+    assert [d.metadata["_id"] for d in picked] == ["a", "b"]
+
+
+def test_mmr_with_full_relevance_is_similarity_order():
+    docs = [_doc("b"), _doc("a"), _doc("c")]
+    vectors = {"a": [1.0, 0.0], "b": [0.7, 0.7], "c": [0.0, 1.0]}
+    picked = mmr(docs, [1.0, 0.0], vectors, k=3, lambda_mult=1.0)
+    assert [d.metadata["_id"] for d in picked] == ["a", "b", "c"]
+
+
+def test_mmr_drops_docs_without_vectors():
+    picked = mmr([_doc("a"), _doc("missing")], [1.0, 0.0], {"a": [1.0, 0.0]}, k=5)
+    assert [d.metadata["_id"] for d in picked] == ["a"]
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from app.pipelines.scheduler import IngestionScheduler, JobStatus
+
+
+class _Ingest:
+    """ingest_fn that records each run and blocks until released."""
+
+    def __init__(self) -> None:
+        self.runs = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, channel, force_full_refresh=False, progress=None):
+        self.runs.append(force_full_refresh)
+        self.started.set()
+        assert self.release.wait(5)
+        return 1
+
+
+@pytest.fixture
+def ingest():
+    ingest = _Ingest()
+    yield ingest
+    ingest.release.set()
+
+
+def test_full_refresh_queued_behind_running_job(ingest):
+    scheduler = IngestionScheduler(max_workers=2, ingest_fn=ingest)
+    try:
+        running = scheduler.submit("general")
+        assert ingest.started.wait(5)
+        full = scheduler.submit("general", force_full_refresh=True)
+        assert full is not running and full.force_full_refresh
+        # Later requests join the pending full refresh
+        assert scheduler.submit("general") is full
+        ingest.release.set()
+        assert scheduler.wait(full, timeout=5)
+        assert running.status == full.status == JobStatus.SUCCEEDED
+        assert ingest.runs == [False, True]
+    finally:
+        scheduler.shutdown(wait=True)
+
+
+def test_full_refresh_joins_a_running_full_refresh(ingest):
+    scheduler = IngestionScheduler(max_workers=2, ingest_fn=ingest)
+    try:
+        running = scheduler.submit("general", force_full_refresh=True)
+        assert ingest.started.wait(5)
+        assert scheduler.submit("general", force_full_refresh=True) is running
+        ingest.release.set()
+        assert scheduler.wait(running, timeout=5)
+        assert ingest.runs == [True]
+    finally:
+        scheduler.shutdown(wait=True)
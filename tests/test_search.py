@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from qdrant_client.http.models import Distance, VectorParams
+
+from app.config import Settings
+from app.pipelines.search import resolve_channels
+from app.resources import ResourcePool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    settings = Settings(QDRANT_PATH=":memory:", METADATA_DB_PATH=str(tmp_path / "metadata.db"), METADATA_LEGACY_JSON_PATH=None)
+    pool = ResourcePool(settings)
+    yield pool
+    pool.metadata().close()
+
+
+async def _create(pool: ResourcePool, *names: str) -> None:
+    for name in names:
+        await pool.async_store().client.create_collection(name, vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+
+
+def test_all_channels_skips_collections_that_are_not_channels(pool):
+    asyncio.run(_create(pool, "general", "random", "bench_profile_default"))
+    pool.metadata().complete_run("general", "100.0")
+    pool.metadata().complete_run("gone", "100.0")
+    assert asyncio.run(resolve_channels(pool, None)) == (["general"], [])
+
+
+def test_empty_channel_selection_is_rejected(pool):
+    with pytest.raises(ValueError, match="at least one channel") as error:
+        asyncio.run(resolve_channels(pool, []))
+    assert type(error.value) is ValueError
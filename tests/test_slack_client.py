@@ -0,0 +1,81 @@
+import pytest
+from slack_sdk.errors import SlackApiError
+
+from app.config import Settings
+from app.ingestion.channel_index import ChannelIndex
+from app.ingestion.slack_client import SlackIngestionClient
+from app.ingestion.user_directory import UserDirectory
+from benchmarks.fakes import FakeWebClient, SyntheticWorkspace
+
+
+@pytest.fixture
+def workspace() -> SyntheticWorkspace:
+    return SyntheticWorkspace({"general": 10, "random": 10}, users=5)
+
+
+class _NoUsersScope(FakeWebClient):
+    def users_list(self, **kwargs):
+        self._enter("users.list")
+        raise SlackApiError("missing_scope", {"ok": False, "error": "missing_scope", "needed": "users:read"})
+
+
+class _NoMembers(FakeWebClient):
+    def users_list(self, **kwargs):
+        self._enter("users.list")
+        return {"ok": True, "members": [], "response_metadata": {"next_cursor": ""}}
+
+
+def _client(tmp_path, web: FakeWebClient, **index_kwargs) -> SlackIngestionClient:
+    return SlackIngestionClient(
+        Settings(SLACK_BOT_TOKEN="xoxb-test"),
+        channel_index=ChannelIndex(str(tmp_path / "channels.json"), **index_kwargs),
+        user_directory=UserDirectory(str(tmp_path / "users.json")),
+        web_client=web,
+    )
+
+
+def test_channel_lookup_uses_the_index(tmp_path, workspace):
+    web = FakeWebClient(workspace)
+    client = _client(tmp_path, web)
+    assert client.get_channel_id("general") == workspace.ids["general"]
+    assert client.get_channel_id("random") == workspace.ids["random"]
+    assert web.calls["conversations.list"] == 1
+
+
+def test_unknown_channel_is_not_relisted_within_miss_ttl(tmp_path, workspace):
+    web = FakeWebClient(workspace)
+    client = _client(tmp_path, web)
+    assert client.get_channel_id("missing") is None
+    assert client.get_channel_id("missing") is None
+    # The first lookup built the index; nothing was walked again
+    assert web.calls["conversations.list"] == 1
+
+
+def test_unknown_channel_is_rechecked_after_miss_ttl(tmp_path, workspace):
+    web = FakeWebClient(workspace)
+    client = _client(tmp_path, web, miss_ttl_seconds=0)
+    client.get_channel_id("missing")
+    workspace.ids["missing"] = "C99999999"
+    assert client.get_channel_id("missing") == "C99999999"
+    assert web.calls["conversations.list"] == 2
+
+
+def test_user_names_are_cached(tmp_path, workspace):
+    web = FakeWebClient(workspace)
+    client = _client(tmp_path, web)
+    assert len(client.user_names()) == 5
+    client.user_names()
+    assert web.calls["users.list"] == 1
+
+
+@pytest.mark.parametrize("web_class", [_NoUsersScope, _NoMembers])
+def test_failed_user_refresh_waits_for_ttl(tmp_path, workspace, web_class):
+    web = web_class(workspace)
+    client = _client(tmp_path, web)
+    assert client.user_names() == {}
+    assert client.user_names() == {}
+    assert web.calls["users.list"] == 1
+    # The failed attempt is persisted, so a restart does not retry either
+    restarted = _client(tmp_path, web)
+    assert restarted.user_names() == {}
+    assert web.calls["users.list"] == 1
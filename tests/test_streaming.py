@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+
+from app.pipelines.streaming import staged
+
+
+def test_items_come_out_in_source_order():
+    out = list(staged(range(50), [lambda x: x * 2, lambda x: x + 1], queue_size=2))
+    assert out == [x * 2 + 1 for x in range(50)]
+
+
+def test_stage_error_reaches_consumer():
+    def fail_on_three(x):
+        if x == 3:
+            raise RuntimeError("boom")
+        return x
+
+    results = []
+    with pytest.raises(RuntimeError, match="boom"):
+        for item in staged(range(10), [fail_on_three]):
+            results.append(item)
+    assert results == [0, 1, 2]
+
+
+def test_source_error_reaches_consumer():
+    def source():
+        yield 1
+        raise ValueError("bad page")
+
+    with pytest.raises(ValueError, match="bad page"):
+        list(staged(source(), [lambda x: x]))
+
+
+def test_closing_early_stops_workers():
+    produced = []
+
+    def source():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    before = threading.active_count()
+    gen = staged(source(), [lambda x: x], queue_size=2)
+    assert next(gen) == 0
+    gen.close()
+    # Bounded queues: the source cannot run far ahead of the consumer
+    assert len(produced) < 20
+    deadline = time.monotonic() + 5
+    while threading.active_count() > before and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert threading.active_count() <= before